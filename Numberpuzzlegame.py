@@ -1,16 +1,17 @@
 import pygame
 import sys
 import random
+import argparse
 from typing import List, Tuple, Optional
 
-# Initialize pygame
-pygame.init()
+from puzzle_solver import SolverWorker, SIZE, build_pattern_dbs, pattern_db_ready, goal_board, random_board, tile_bits, pack, unpack, tile_at, slide
 
 # Constants
 WINDOW_SIZE = 600
-GRID_SIZE = 4
-TILE_SIZE = WINDOW_SIZE // GRID_SIZE
+GRID_SIZE = 4  # default rows and columns
 FPS = 60
+WALK_MOVES_PER_CELL = 60  # random-walk shuffle length per cell
+AUTO_SOLVE_DELAY = 150  # milliseconds between auto-solve moves
 
 # Colors
 WHITE = (255, 255, 255)
@@ -19,40 +20,60 @@ GRAY = (200, 200, 200)
 BLUE = (0, 120, 255)
 GREEN = (0, 200, 100)
 RED = (255, 50, 50)
-
-# Set up the display
-screen = pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE))
-pygame.display.set_caption('15-Puzzle Game')
-clock = pygame.time.Clock()
+YELLOW = (255, 210, 0)
 
 class Puzzle:
-    def __init__(self):
-        self.tiles = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-        self.empty_pos = (GRID_SIZE - 1, GRID_SIZE - 1)  # Bottom-right corner
+    def __init__(self, rows: int = GRID_SIZE, cols: int = GRID_SIZE, shuffle_mode: str = 'permutation'):
+        self.rows = rows
+        self.cols = cols
+        self.shuffle_mode = shuffle_mode
+        self.tile_size = WINDOW_SIZE // max(rows, cols)
+        # Packed board (see puzzle_solver.pack), the blank's cell, and how many
+        # tiles are off their goal cell so check_solved is a comparison
+        self.bits = tile_bits(rows * cols)
+        self.state = 0
+        self.blank = rows * cols - 1  # Bottom-right corner
+        self.misplaced = 0
         self.moves = 0
         self.solved = False
-        self.font = pygame.font.SysFont('Arial', TILE_SIZE // 3)
+        self.font = pygame.font.SysFont('Arial', max(self.tile_size // 3, 12))
         self.initialize_puzzle()
 
+    @property
+    def empty_pos(self) -> Tuple[int, int]:
+        return divmod(self.blank, self.cols)
+
+    @property
+    def tiles(self) -> List[List[int]]:
+        flat = self.flat_tiles()
+        return [flat[row * self.cols:(row + 1) * self.cols] for row in range(self.rows)]
+
     def initialize_puzzle(self):
-        # Create solved puzzle first
-        for row in range(GRID_SIZE):
-            for col in range(GRID_SIZE):
-                self.tiles[row][col] = row * GRID_SIZE + col + 1
-        
-        # Set the last tile as empty (0 represents empty)
-        self.tiles[GRID_SIZE-1][GRID_SIZE-1] = 0
+        # Create solved puzzle first (0 represents empty, in the last cell)
+        self.set_board(goal_board(self.rows, self.cols))
         
-        # Shuffle the puzzle with valid moves
+        # Shuffle the puzzle
         self.shuffle_puzzle()
 
+    def set_board(self, board: List[int]):
+        self.state = pack(board, self.bits)
+        self.blank = board.index(0)
+        self.misplaced = sum(1 for cell, tile in enumerate(board) if tile and tile != cell + 1)
+        self.check_solved()
+
     def shuffle_puzzle(self):
-        # Make many random valid moves to shuffle
-        for _ in range(1000):
-            possible_moves = self.get_possible_moves()
-            if possible_moves:
-                move = random.choice(possible_moves)
-                self.move_tile(move)
+        if self.shuffle_mode == 'walk':
+            # Make many random valid moves to shuffle
+            for _ in range(WALK_MOVES_PER_CELL * self.rows * self.cols):
+                possible_moves = self.get_possible_moves()
+                if possible_moves:
+                    move = random.choice(possible_moves)
+                    self.move_tile(move)
+        else:
+            # Draw a random solvable arrangement directly (small boards can draw the goal)
+            self.set_board(random_board(self.rows, self.cols))
+            while self.solved:
+                self.set_board(random_board(self.rows, self.cols))
 
         self.moves = 0
         self.solved = False
@@ -64,7 +85,7 @@ class Puzzle:
         # Check adjacent tiles that can move into empty space
         for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
             new_row, new_col = empty_row + dr, empty_col + dc
-            if 0 <= new_row < GRID_SIZE and 0 <= new_col < GRID_SIZE:
+            if 0 <= new_row < self.rows and 0 <= new_col < self.cols:
                 moves.append((new_row, new_col))
         
         return moves
@@ -77,9 +98,11 @@ class Puzzle:
         if (abs(row - empty_row) == 1 and col == empty_col) or \
            (abs(col - empty_col) == 1 and row == empty_row):
             # Swap tile with empty space
-            self.tiles[empty_row][empty_col] = self.tiles[row][col]
-            self.tiles[row][col] = 0
-            self.empty_pos = (row, col)
+            cell = row * self.cols + col
+            tile = tile_at(self.state, cell, self.bits)
+            self.misplaced += (cell == tile - 1) - (self.blank == tile - 1)
+            self.state = slide(self.state, self.blank, cell, self.bits)
+            self.blank = cell
             self.moves += 1
             
             # Check if puzzle is solved
@@ -89,25 +112,20 @@ class Puzzle:
         return False
 
     def check_solved(self):
-        # Check if all tiles are in order
-        for row in range(GRID_SIZE):
-            for col in range(GRID_SIZE):
-                if row == GRID_SIZE - 1 and col == GRID_SIZE - 1:
-                    if self.tiles[row][col] != 0:
-                        self.solved = False
-                        return
-                elif self.tiles[row][col] != row * GRID_SIZE + col + 1:
-                    self.solved = False
-                    return
-        
-        self.solved = True
-
-    def draw(self, surface):
-        for row in range(GRID_SIZE):
-            for col in range(GRID_SIZE):
-                value = self.tiles[row][col]
-                rect = pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, 
-                                 TILE_SIZE, TILE_SIZE)
+        # All tiles in order; the blank is then in the last cell
+        self.solved = self.misplaced == 0
+
+    def flat_tiles(self) -> List[int]:
+        return unpack(self.state, self.rows * self.cols, self.bits)
+
+    def draw(self, surface, hint: Optional[Tuple[int, int]] = None, status: str = ''):
+        size = self.tile_size
+        width, height = self.cols * size, self.rows * size
+        for row in range(self.rows):
+            for col in range(self.cols):
+                value = tile_at(self.state, row * self.cols + col, self.bits)
+                rect = pygame.Rect(col * size, row * size, 
+                                 size, size)
                 
                 if value == 0:  # Empty tile
                     pygame.draw.rect(surface, BLACK, rect)
@@ -120,15 +138,22 @@ class Puzzle:
                     text = self.font.render(str(value), True, WHITE)
                     text_rect = text.get_rect(center=rect.center)
                     surface.blit(text, text_rect)
+
+                if (row, col) == hint:
+                    pygame.draw.rect(surface, YELLOW, rect, 6)
         
         # Draw move counter
         move_text = self.font.render(f"Moves: {self.moves}", True, WHITE)
         surface.blit(move_text, (10, 10))
 
+        if status:
+            status_text = self.font.render(status, True, YELLOW)
+            surface.blit(status_text, (10, height - status_text.get_height() - 10))
+
         # Draw solved message
         if self.solved:
-            solved_rect = pygame.Rect(WINDOW_SIZE//4, WINDOW_SIZE//3, 
-                                    WINDOW_SIZE//2, WINDOW_SIZE//3)
+            solved_rect = pygame.Rect(width//4, height//3, 
+                                    width//2, height//3)
             pygame.draw.rect(surface, GREEN, solved_rect)
             pygame.draw.rect(surface, WHITE, solved_rect, 3)
             
@@ -142,8 +167,53 @@ class Puzzle:
             surface.blit(restart_text, restart_rect)
 
 def main():
-    puzzle = Puzzle()
+    parser = argparse.ArgumentParser(description='Sliding puzzle game')
+    parser.add_argument('--rows', type=int, default=GRID_SIZE)
+    parser.add_argument('--cols', type=int, default=None, help='defaults to --rows')
+    parser.add_argument('--shuffle', choices=['permutation', 'walk'], default='permutation')
+    parser.add_argument('--build-pdb', action='store_true',
+                        help='build the 4x4 pattern databases before starting if they are missing')
+    args = parser.parse_args()
+    rows = args.rows
+    cols = args.cols or rows
+    if rows < 2 or cols < 2:
+        parser.error('the board needs at least 2 rows and 2 columns')
+    if args.build_pdb and not pattern_db_ready():
+        build_pattern_dbs(verbose=True)
+    # Without the tables 4x4 hints fall back to a weaker heuristic
+    pdb_note = 'No pattern database: try --build-pdb' if rows == cols == SIZE and not pattern_db_ready() else ''
+
+    pygame.init()
+    puzzle = Puzzle(rows, cols, args.shuffle)
+    screen = pygame.display.set_mode((cols * puzzle.tile_size, rows * puzzle.tile_size))
+    pygame.display.set_caption(f'{rows * cols - 1}-Puzzle Game')
+    clock = pygame.time.Clock()
+
     running = True
+    # H shows the next move of a solution, S plays it out. Solutions are
+    # optimal when a short search finds one and suboptimal otherwise (see
+    # puzzle_solver.solve_board), so a hint takes seconds at most.
+    # Solving runs in a worker process so the window stays responsive.
+    solver = None
+    solution = []
+    auto_solve = False
+    next_auto_move = 0
+
+    def request_solution():
+        nonlocal solver
+        if solver is None:
+            solver = SolverWorker()
+        solver.start(puzzle.flat_tiles(), rows, cols)
+
+    def play(pos: Tuple[int, int]):
+        # Keep the solution when the player follows it, drop it otherwise
+        nonlocal solution, auto_solve
+        if puzzle.move_tile(pos):
+            if solution and solution[0] == pos:
+                solution = solution[1:]
+            else:
+                solution = []
+                auto_solve = False
 
     while running:
         for event in pygame.event.get():
@@ -153,35 +223,58 @@ def main():
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:  # Restart game
                     puzzle.initialize_puzzle()
+                    solution = []
+                    auto_solve = False
+                elif event.key in (pygame.K_h, pygame.K_s) and not puzzle.solved:
+                    auto_solve = event.key == pygame.K_s
+                    if not solution:
+                        request_solution()
                 
                 # Move tiles with arrow keys
                 empty_row, empty_col = puzzle.empty_pos
-                if event.key == pygame.K_UP and empty_row < GRID_SIZE - 1:
-                    puzzle.move_tile((empty_row + 1, empty_col))
+                if event.key == pygame.K_UP and empty_row < rows - 1:
+                    play((empty_row + 1, empty_col))
                 elif event.key == pygame.K_DOWN and empty_row > 0:
-                    puzzle.move_tile((empty_row - 1, empty_col))
-                elif event.key == pygame.K_LEFT and empty_col < GRID_SIZE - 1:
-                    puzzle.move_tile((empty_row, empty_col + 1))
+                    play((empty_row - 1, empty_col))
+                elif event.key == pygame.K_LEFT and empty_col < cols - 1:
+                    play((empty_row, empty_col + 1))
                 elif event.key == pygame.K_RIGHT and empty_col > 0:
-                    puzzle.move_tile((empty_row, empty_col - 1))
+                    play((empty_row, empty_col - 1))
             
             elif event.type == pygame.MOUSEBUTTONDOWN and not puzzle.solved:
                 # Get mouse position and convert to grid coordinates
                 mouse_x, mouse_y = pygame.mouse.get_pos()
-                col = mouse_x // TILE_SIZE
-                row = mouse_y // TILE_SIZE
+                col = mouse_x // puzzle.tile_size
+                row = mouse_y // puzzle.tile_size
                 
                 # Try to move the clicked tile
-                puzzle.move_tile((row, col))
+                play((row, col))
+
+        if solver is not None and solver.busy:
+            # A solution for a board that changed meanwhile is dropped
+            moves = solver.poll(puzzle.flat_tiles())
+            if moves is not None:
+                solution = moves
+        if auto_solve and solution and pygame.time.get_ticks() >= next_auto_move:
+            play(solution[0])
+            next_auto_move = pygame.time.get_ticks() + AUTO_SOLVE_DELAY
+        if puzzle.solved:
+            auto_solve = False
 
         # Draw everything
         screen.fill(BLACK)
-        puzzle.draw(screen)
+        if solver is not None and solver.busy:
+            status = 'Solving...'
+        else:
+            status = pdb_note if solution else ''
+        puzzle.draw(screen, solution[0] if solution else None, status)
         pygame.display.flip()
         clock.tick(FPS)
 
+    if solver is not None:
+        solver.shutdown()
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
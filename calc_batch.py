@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import itertools
+import threading
+import multiprocessing
+from typing import List, Tuple, Iterator, Optional
+
+from calc_engine import (CalcError, MODES, DEFAULT_PRECISION, CACHE_SIZE, Backend, ExpressionCache, evaluate,
+                         make_backend)
+
+# Headless evaluation of calculator expressions, one per line, from a file or
+# stdin. Lines are read lazily in chunks and the chunks evaluated across a
+# process pool; each result line is written as soon as every line before it
+# is done, so the output follows the input and can be piped onwards while
+# the input is still arriving. Blank lines stay blank and errors are written
+# as "error: message", one output line per input line. Each worker keeps its
+# own cache of results, which pays off on inputs that repeat large powers
+# and products.
+
+# Constants
+CHUNK_LINES = 256
+CHUNKS_PER_WORKER = 4  # chunks handed out ahead of the output
+
+def calculate(line: str, backend: Backend, cache: Optional[ExpressionCache] = None) -> str:
+    text = line.strip()
+    if not text:
+        return ''
+    try:
+        return backend.format(evaluate(text, backend, cache))
+    except CalcError as e:
+        return f"error: {e}"
+
+def read_chunks(lines: Iterator[str], size: int) -> Iterator[List[str]]:
+    while True:
+        chunk = list(itertools.islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+_backend: Optional[Backend] = None
+_cache: Optional[ExpressionCache] = None
+
+def _init_worker(mode: str, precision: int, cache_size: int):
+    global _backend, _cache
+    _backend = make_backend(mode, precision)
+    _cache = ExpressionCache(cache_size) if cache_size else None
+
+def _calculate_chunk(chunk: List[str]) -> Tuple[List[str], int, int]:
+    # The results, and the cache hits and misses they took
+    if _cache is None:
+        return [calculate(line, _backend) for line in chunk], 0, 0
+    hits, misses = _cache.hits, _cache.misses
+    results = [calculate(line, _backend, _cache) for line in chunk]
+    return results, _cache.hits - hits, _cache.misses - misses
+
+def run_batch(lines: Iterator[str], workers: int, mode: str = 'float', precision: int = DEFAULT_PRECISION,
+              chunk_lines: int = CHUNK_LINES, echo: bool = False, output=sys.stdout,
+              cache_size: int = CACHE_SIZE, counters: Optional[ExpressionCache] = None) -> int:
+    # Returns the number of lines evaluated. At most CHUNKS_PER_WORKER chunks
+    # per worker are in flight, so a stream of any length runs in bounded
+    # memory. The workers' cache hits and misses are added to counters.
+    count = 0
+    counters = counters if counters is not None else ExpressionCache(0)
+
+    def write(chunk: List[str], results: List[str]):
+        if echo:
+            output.write(''.join(f"{line.rstrip()}\t{result}\n" for line, result in zip(chunk, results)))
+        else:
+            output.write(''.join(f"{result}\n" for result in results))
+        output.flush()
+
+    chunks = read_chunks(lines, chunk_lines)
+    if workers <= 1:
+        _init_worker(mode, precision, cache_size)
+        for chunk in chunks:
+            results, hits, misses = _calculate_chunk(chunk)
+            write(chunk, results)
+            counters.hits += hits
+            counters.misses += misses
+            count += len(chunk)
+        return count
+    # A writer thread waits for the chunks in order, so results go out as
+    # soon as they are ready even while the next line is still being read.
+    # The queue bounds the chunks in flight.
+    in_flight = queue.Queue(workers * CHUNKS_PER_WORKER)
+
+    failures = []
+
+    def write_results():
+        # Keeps draining after a failure so the reader never blocks
+        nonlocal count
+        while True:
+            item = in_flight.get()
+            if item is None:
+                return
+            if failures:
+                continue
+            chunk, result = item
+            try:
+                results, hits, misses = result.get()
+                write(chunk, results)
+                counters.hits += hits
+                counters.misses += misses
+                count += len(chunk)
+            except Exception as e:
+                failures.append(e)
+
+    writer = threading.Thread(target=write_results)
+    with multiprocessing.Pool(workers, _init_worker, (mode, precision, cache_size)) as pool:
+        writer.start()
+        try:
+            for chunk in chunks:
+                if failures:
+                    break  # stop reading; leaving the block terminates the pool
+                in_flight.put((chunk, pool.apply_async(_calculate_chunk, (chunk,))))
+        finally:
+            in_flight.put(None)
+            writer.join()
+    if failures:
+        raise failures[0]
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate calculator expressions, one per line')
+    parser.add_argument('input', nargs='?', help='expressions, one per line (default: stdin)')
+    parser.add_argument('--output', help='write results here instead of stdout')
+    parser.add_argument('--mode', choices=MODES, default='float')
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION, help='significant digits in decimal mode')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk', type=int, default=CHUNK_LINES,
+                        help='lines per task sent to a worker (1 answers typed lines at once)')
+    parser.add_argument('--echo', action='store_true', help='write each expression before its result')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='results cached per worker (0 for none)')
+    args = parser.parse_args()
+
+    source = open(args.input, 'r', encoding='utf-8') if args.input else sys.stdin
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    counters = ExpressionCache(0)
+    start = time.perf_counter()
+    try:
+        count = run_batch(source, args.workers, args.mode, args.precision, args.chunk, args.echo, output,
+                          args.cache_size, counters)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(f"{count} expressions in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} expressions/s, "
+          f"{args.workers} workers, {counters.hits} cache hits / {counters.misses} misses)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
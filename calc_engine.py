@@ -0,0 +1,919 @@
+import os
+import sys
+import re
+import time
+import random
+import decimal
+import argparse
+import operator
+from decimal import Decimal
+from fractions import Fraction
+from collections import OrderedDict
+from typing import List, Tuple, Optional
+
+# Arithmetic for the calculator without eval(). Text is split into tokens, a
+# Pratt parser builds a small AST of tuples, and the AST is compiled to a flat
+# list of stack instructions. Only numbers, + - * / // % ** and brackets
+# exist, so there is nothing else to reach, and ** refuses results that would
+# take too long to build. Precedence follows Python: -2**2 is -4, 2**-1 is 0.5.
+# A Backend decides what the numbers are: Python's ints and floats by
+# default, or decimals, fractions or whole numbers.
+
+# Constants
+MAX_INT_BITS = 1 << 20  # about 315,000 digits
+MAX_LITERAL_DIGITS = 4300  # Python's limit for converting ints to and from text
+SIGNIFICANT_DIGITS = 12  # for numbers too long to show in full
+DEFAULT_PRECISION = 28
+LITERAL_LIMIT = 10 ** MAX_LITERAL_DIGITS
+CACHE_SIZE = 512  # results of up to MAX_INT_BITS each
+HISTORY_SIZE = 1000
+HISTORY_PATH = os.path.join(os.path.expanduser('~'), '.stylish_calculator_history')
+
+# Token kinds
+NUMBER = 'number'
+OPERATOR = 'operator'
+OPEN = '('
+CLOSE = ')'
+END = 'end'
+
+# Binding powers: higher binds tighter
+BINARY_POWER = {'+': 10, '-': 10, '*': 20, '/': 20, '//': 20, '%': 20, '**': 40}
+PREFIX_POWER = 30
+RIGHT_ASSOCIATIVE = {'**'}
+
+# Opcodes
+PUSH = 0
+NEGATE = 1
+BINARY = 2
+
+class CalcError(ValueError):
+    pass
+
+# Optional spaces, then a number, an operator or a bracket. The exponent
+# is there for results like 1e+20 fed back in.
+TOKEN = re.compile(r' *(?:([0-9]+\.?[0-9]*(?:[eE][-+]?[0-9]+)?|\.[0-9]+(?:[eE][-+]?[0-9]+)?)'
+                   r'|(\*\*|//|[-+*/%])|([()]))')
+
+def tokenize(text: str) -> List[Tuple[str, str, int]]:
+    # (kind, text, offset) tuples ending with an END token
+    tokens = []
+    append = tokens.append
+    match = TOKEN.match
+    i = 0
+    n = len(text.rstrip(' '))
+    while i < n:
+        m = match(text, i)
+        if m is None:
+            i = len(text) - len(text[i:].lstrip(' '))
+            raise CalcError(f"Unexpected {text[i]!r} at {i}")
+        number, op, bracket = m.groups()
+        if number is not None:
+            append((NUMBER, number, m.start(1)))
+        elif op is not None:
+            append((OPERATOR, op, m.start(2)))
+        else:
+            append((bracket, bracket, m.start(3)))
+        i = m.end()
+    append((END, '', n))
+    return tokens
+
+class Parser:
+    # Nodes: ('num', value), ('neg', node), ('pos', node) and (op, left, right)
+
+    def __init__(self, tokens: List[Tuple[str, str, int]], backend: 'Backend'):
+        self.tokens = tokens
+        self.backend = backend
+        self.index = 0
+
+    def parse(self) -> tuple:
+        try:
+            node = self.expression(0)
+        except RecursionError:
+            raise CalcError("Expression is nested too deeply") from None
+        kind, value, offset = self.tokens[self.index]
+        if kind != END:
+            raise CalcError(f"Unexpected {value!r} at {offset}")
+        return node
+
+    def expression(self, right_power: int) -> tuple:
+        left = self.prefix()
+        tokens = self.tokens
+        while True:
+            kind, value, _ = tokens[self.index]
+            if kind != OPERATOR:
+                return left
+            power = BINARY_POWER[value]
+            if power <= right_power:
+                return left
+            self.index += 1
+            right = self.expression(power - 1 if value in RIGHT_ASSOCIATIVE else power)
+            left = (value, left, right)
+
+    def prefix(self) -> tuple:
+        kind, value, offset = self.tokens[self.index]
+        self.index += 1
+        if kind == NUMBER:
+            return ('num', self.backend.read(value))
+        if kind == OPERATOR and value in '+-':
+            return ('neg' if value == '-' else 'pos', self.expression(PREFIX_POWER))
+        if kind == OPEN:
+            node = self.expression(0)
+            kind, value, offset = self.tokens[self.index]
+            if kind != CLOSE:
+                raise CalcError(f"')' expected at {offset}")
+            self.index += 1
+            return node
+        if kind == END:
+            raise CalcError("Unexpected end of expression")
+        raise CalcError(f"Unexpected {value!r} at {offset}")
+
+def parse(text: str, backend: Optional['Backend'] = None) -> tuple:
+    return Parser(tokenize(text), backend or FLOAT).parse()
+
+def power(base, exponent):
+    # ** that refuses to build giant ints or to leave the real numbers
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and base not in (0, 1, -1):
+        if (base.bit_length() - 1) * exponent > MAX_INT_BITS:
+            raise CalcError("Result too large")
+    result = base ** exponent
+    if isinstance(result, complex):
+        raise CalcError("Result is not a real number")
+    return result
+
+def multiply(left, right):
+    if isinstance(left, int) and isinstance(right, int) and left.bit_length() + right.bit_length() > MAX_INT_BITS + 1:
+        raise CalcError("Result too large")
+    return left * right
+
+BINARY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': multiply,
+    '/': operator.truediv,
+    '//': operator.floordiv,
+    '%': operator.mod,
+    '**': power,
+}
+
+def arithmetic_error(error: Exception) -> CalcError:
+    # What to show for an exception raised while computing
+    if isinstance(error, CalcError):
+        return error
+    if isinstance(error, ZeroDivisionError):
+        return CalcError("Division by zero")
+    if isinstance(error, (OverflowError, MemoryError, decimal.Overflow)):
+        return CalcError("Result too large")
+    return CalcError("Invalid operation")
+
+# Results are shown exactly up to MAX_LITERAL_DIGITS digits. Longer ones are
+# formatted without converting them to decimal text, which takes seconds for
+# the largest: approximate() divides down to a quotient of about 128 bits and
+# scales it by a power of two in Decimal.
+APPROXIMATE = decimal.Context(prec=SIGNIFICANT_DIGITS + 10, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+def approximate(numerator: int, denominator: int = 1) -> Decimal:
+    shift = denominator.bit_length() - abs(numerator).bit_length() + 128
+    if shift >= 0:
+        quotient = (numerator << shift) // denominator
+    else:
+        quotient = numerator // (denominator << -shift)
+    return APPROXIMATE.multiply(Decimal(quotient), APPROXIMATE.power(Decimal(2), -shift))
+
+def significant(value: Decimal) -> str:
+    # SIGNIFICANT_DIGITS digits, in scientific notation when large or small
+    return format(value, f'.{SIGNIFICANT_DIGITS}g')
+
+def format_int(value: int) -> str:
+    if -LITERAL_LIMIT < value < LITERAL_LIMIT:
+        return str(value)
+    return '\u2248' + significant(approximate(value))
+
+class Backend:
+    # Python's numbers, as eval() gives them: whole numbers are exact ints,
+    # anything with a point or an exponent is a binary float
+    name = 'float'
+
+    def __init__(self):
+        self.key = self.name  # backends with equal keys compute alike
+        self.operators = BINARY_OPERATORS
+        self.negate = operator.neg
+
+    def read(self, literal: str):
+        # A literal's value; CalcError if it has none
+        if len(literal) > MAX_LITERAL_DIGITS:
+            raise CalcError("Number too long")
+        try:
+            return self.number(literal)
+        except (ArithmeticError, ValueError) as e:
+            raise arithmetic_error(e) from None
+
+    def number(self, literal: str):
+        if '.' in literal or 'e' in literal or 'E' in literal:
+            return float(literal)
+        return int(literal)
+
+    def format(self, value) -> str:
+        # Text for the display, approximated when too long to convert
+        if isinstance(value, int):
+            return format_int(value)
+        return str(value)
+
+    def source(self, value) -> Optional[str]:
+        # Text that reads back as value, to carry on from a result; None when
+        # there is none or it is too long to read back
+        if isinstance(value, int):
+            return str(value) if -LITERAL_LIMIT < value < LITERAL_LIMIT else None
+        text = str(value)
+        return None if text in ('inf', '-inf', 'nan') else text
+
+class DecimalBackend(Backend):
+    # Decimal floating point with a chosen number of significant digits, so
+    # 0.1+0.2 is 0.3. // and % truncate towards zero, as Decimal does.
+    name = 'decimal'
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        self.precision = precision
+        self.key = (self.name, precision)
+        self.context = decimal.Context(prec=precision, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN,
+                                       traps=[decimal.InvalidOperation, decimal.DivisionByZero, decimal.Overflow])
+        context = self.context
+        self.operators = {
+            '+': context.add,
+            '-': context.subtract,
+            '*': context.multiply,
+            '/': context.divide,
+            '//': context.divide_int,
+            '%': context.remainder,
+            '**': context.power,
+        }
+        # -x would round in the thread's context
+        self.negate = context.minus
+
+    def number(self, literal: str):
+        return self.context.create_decimal(literal)
+
+    def format(self, value) -> str:
+        return str(value)
+
+    def source(self, value) -> Optional[str]:
+        text = str(value)
+        return text if len(text) <= MAX_LITERAL_DIGITS else None
+
+def fraction_multiply(left: Fraction, right: Fraction) -> Fraction:
+    if (left.numerator.bit_length() + right.numerator.bit_length() > MAX_INT_BITS + 1
+            or left.denominator.bit_length() + right.denominator.bit_length() > MAX_INT_BITS + 1):
+        raise CalcError("Result too large")
+    return left * right
+
+def fraction_power(base: Fraction, exponent: Fraction) -> Fraction:
+    if exponent.denominator != 1:
+        raise CalcError("Exact powers need whole exponents")
+    exponent = exponent.numerator
+    bits = max(base.numerator.bit_length(), base.denominator.bit_length())
+    if (bits - 1) * abs(exponent) > MAX_INT_BITS:
+        raise CalcError("Result too large")
+    return base ** exponent
+
+class FractionBackend(Backend):
+    # Exact rationals: 0.1 is 1/10 and 1/3 stays 1/3. A result that is not
+    # whole reads back in brackets, so (1/3)**2 carries on as it should.
+    name = 'fraction'
+
+    def __init__(self):
+        self.key = self.name
+        self.operators = dict(BINARY_OPERATORS)
+        self.operators.update({
+            '*': fraction_multiply,
+            '//': lambda left, right: Fraction(left // right),
+            '**': fraction_power,
+        })
+        self.negate = operator.neg
+
+    def number(self, literal: str):
+        exponent = literal.lower().partition('e')[2]
+        if exponent and abs(int(exponent)) > MAX_LITERAL_DIGITS:
+            raise CalcError("Result too large")
+        return Fraction(literal)
+
+    def format(self, value) -> str:
+        numerator, denominator = value.numerator, value.denominator
+        if denominator == 1:
+            return format_int(numerator)
+        if -LITERAL_LIMIT < numerator < LITERAL_LIMIT and denominator < LITERAL_LIMIT:
+            return f"{numerator}/{denominator}"
+        return '\u2248' + significant(approximate(numerator, denominator))
+
+    def source(self, value) -> Optional[str]:
+        numerator, denominator = value.numerator, value.denominator
+        if not -LITERAL_LIMIT < numerator < LITERAL_LIMIT or denominator >= LITERAL_LIMIT:
+            return None
+        return str(numerator) if denominator == 1 else f"({numerator}/{denominator})"
+
+def integer_power(base: int, exponent: int) -> int:
+    if exponent < 0:
+        raise CalcError("Whole numbers only")
+    return power(base, exponent)
+
+class IntegerBackend(Backend):
+    # Whole numbers of any size; / rounds down like //
+    name = 'integer'
+
+    def __init__(self):
+        self.key = self.name
+        self.operators = dict(BINARY_OPERATORS)
+        self.operators.update({'/': operator.floordiv, '**': integer_power})
+        self.negate = operator.neg
+
+    def number(self, literal: str):
+        if not literal.isdigit():
+            raise CalcError("Whole numbers only")
+        return int(literal)
+
+BACKENDS = {
+    'float': Backend,
+    'decimal': DecimalBackend,
+    'fraction': FractionBackend,
+    'integer': IntegerBackend,
+}
+
+MODES = list(BACKENDS)
+
+def make_backend(name: str, precision: int = DEFAULT_PRECISION) -> Backend:
+    if name == 'decimal':
+        return DecimalBackend(precision)
+    return BACKENDS[name]()
+
+FLOAT = Backend()
+
+# Memoized operators. An expression's value only depends on its AST, and a
+# node's value only on its operator and its operands' values, so the cache
+# numbers values rather than whole trees: a node is keyed by the backend,
+# the operator and its operands' values, with the operands of + and * in a
+# fixed order. The same subexpression then hits wherever it turns up, in
+# the live preview, on '=' or in another expression, at a cost per node
+# rather than per tree.
+# Looking a result up costs a hash of both operands, more than the
+# operation itself for floats, decimals of a fixed precision and
+# machine-sized numbers, and about as much as adding or multiplying a long
+# number by a short one. Only powers and operations between two long
+# numbers go through the cache, which also keeps long chains like a
+# factorial from flushing it.
+COMMUTATIVE = {'+', '*'}
+SMALL_INT = 1 << 64
+
+def cheap(value) -> bool:
+    kind = type(value)
+    if kind is int:
+        return -SMALL_INT < value < SMALL_INT
+    if kind is Fraction:
+        return -SMALL_INT < value.numerator < SMALL_INT and value.denominator < SMALL_INT
+    return True
+
+def value_key(value):
+    # Equal only for values that behave and print alike: 1 == 1.0 and
+    # 0.0 == -0.0, but they are not interchangeable
+    kind = type(value)
+    if kind is int:
+        return value
+    if kind is float:
+        return value.hex()
+    if kind is Fraction:
+        return (value.numerator, value.denominator)
+    return value.as_tuple()
+
+class ExpressionCache:
+    # Bounded LRU of operator results with hit and miss counts. Errors are
+    # not kept: the checks that raise them are cheap.
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def apply(self, backend: Backend, op: str, left, right):
+        if op != '**' and (cheap(left) or cheap(right)):
+            return backend.operators[op](left, right)
+        left_key, right_key = value_key(left), value_key(right)
+        if op in COMMUTATIVE and hash(right_key) < hash(left_key):
+            left_key, right_key = right_key, left_key
+        key = (backend.key, op, left_key, right_key)
+        entries = self.entries
+        result = entries.get(key, entries)
+        if result is not entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = backend.operators[op](left, right)
+        entries[key] = result
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0.0
+        return f"cache {self.hits} hits / {self.misses} misses ({rate:.0f}%), {len(self.entries)} kept"
+
+class Program:
+    # Postfix instructions for one expression: (PUSH, value), (NEGATE, None)
+    # or (BINARY, operator)
+
+    def __init__(self, code: List[tuple], backend: Backend):
+        self.code = code
+        self.backend = backend
+
+    def run(self, cache: Optional[ExpressionCache] = None):
+        backend = self.backend
+        operators = backend.operators
+        negate = backend.negate
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        try:
+            for op, arg in self.code:
+                if op == PUSH:
+                    push(arg)
+                elif op == NEGATE:
+                    stack[-1] = negate(stack[-1])
+                elif cache is None:
+                    right = pop()
+                    stack[-1] = operators[arg](stack[-1], right)
+                else:
+                    right = pop()
+                    stack[-1] = cache.apply(backend, arg, stack[-1], right)
+        except (ArithmeticError, MemoryError, ValueError) as e:
+            raise arithmetic_error(e) from None
+        return stack[0]
+
+def compile_ast(node: tuple, backend: Optional[Backend] = None) -> Program:
+    # Without recursion, so a pasted sum of thousands of terms compiles.
+    # Nodes are visited in reverse postfix order (operator, right, left) and
+    # the instructions flipped at the end.
+    code = []
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        kind = node[0]
+        if kind == 'num':
+            code.append((PUSH, node[1]))
+        elif kind == 'neg':
+            code.append((NEGATE, None))
+            pending.append(node[1])
+        elif kind == 'pos':
+            pending.append(node[1])
+        else:
+            code.append((BINARY, kind))
+            pending.append(node[1])
+            pending.append(node[2])
+    code.reverse()
+    return Program(code, backend or FLOAT)
+
+def compile_expression(text: str, backend: Optional[Backend] = None) -> Program:
+    return compile_ast(parse(text, backend), backend)
+
+def evaluate(text: str, backend: Optional[Backend] = None, cache: Optional[ExpressionCache] = None):
+    # Raises CalcError for anything that is not a finished, valid expression
+    return compile_expression(text, backend).run(cache)
+
+# Live preview. The display shows the value of the text typed so far after
+# every key, and evaluate() costs time in proportion to the whole text.
+# LivePreview instead runs an operator-precedence (shunting-yard) parse one
+# character at a time and keeps the parse state after every character.
+# States are immutable and share their stacks as linked lists ((item, rest)
+# pairs), so a key derives one new state from the last and backspace drops
+# the last one. Operators are applied as soon as precedence allows, so a
+# state only holds the pending ones: a few in a flat expression, more inside
+# brackets. A key costs time in proportion to those, however long the text.
+
+# Parse states: (operands, operators, number, expect_operand, depth), where
+# number is the literal being typed ('' if none) and depth counts open
+# brackets. Operands are values, or the CalcError computing them raised;
+# operators are binary operators, 'neg', 'pos' and '('.
+START = (None, None, '', True, 0)
+DEAD = None  # no text starting like this is valid
+
+def operator_power(op: str) -> int:
+    if op == '(':
+        return -1
+    if op == 'neg' or op == 'pos':
+        return PREFIX_POWER
+    return BINARY_POWER[op]
+
+def apply_operator(op: str, operands: tuple, backend: Backend, cache: Optional[ExpressionCache]) -> tuple:
+    if op == 'neg' or op == 'pos':
+        value, rest = operands
+        if op == 'pos' or isinstance(value, CalcError):
+            return operands
+        function, arguments = backend.negate, (value,)
+    else:
+        right, (left, rest) = operands
+        if isinstance(left, CalcError):
+            return (left, rest)
+        if isinstance(right, CalcError):
+            return (right, rest)
+        if cache is not None:
+            function, arguments = cache.apply, (backend, op, left, right)
+        else:
+            function, arguments = backend.operators[op], (left, right)
+    try:
+        return (function(*arguments), rest)
+    except (ArithmeticError, MemoryError, ValueError) as e:
+        return (arithmetic_error(e), rest)
+
+def finish_number(state: tuple, backend: Backend) -> Optional[tuple]:
+    # Push the literal being typed as an operand; DEAD if it is incomplete
+    operands, operators, number, _, depth = state
+    if not number:
+        return state
+    if number == '.' or number[-1] in 'eE+-':
+        return DEAD
+    try:
+        value = backend.read(number)
+    except CalcError as e:
+        value = e
+    return ((value, operands), operators, '', False, depth)
+
+def feed(state: Optional[tuple], key: str, backend: Backend,
+         cache: Optional[ExpressionCache] = None) -> Optional[tuple]:
+    # The state after one more key: a character, or ** or // as a whole
+    if state is DEAD:
+        return DEAD
+    operands, operators, number, expect_operand, depth = state
+    if len(key) == 1 and key in '0123456789':
+        if number or expect_operand:
+            return (operands, operators, number + key, True, depth)
+        return DEAD
+    if key == '.':
+        if not number:
+            return (operands, operators, key, True, depth) if expect_operand else DEAD
+        if '.' in number or 'e' in number or 'E' in number:
+            return DEAD
+        return (operands, operators, number + key, True, depth)
+    if key == 'e' or key == 'E':
+        if not number or number == '.' or 'e' in number or 'E' in number:
+            return DEAD
+        return (operands, operators, number + key, True, depth)
+    if (key == '+' or key == '-') and number and number[-1] in 'eE':
+        return (operands, operators, number + key, True, depth)
+
+    state = finish_number(state, backend)
+    if state is DEAD:
+        return DEAD
+    operands, operators, _, expect_operand, depth = state
+    if key == ' ':
+        return state
+    if key == '(':
+        return (operands, ('(', operators), '', True, depth + 1) if expect_operand else DEAD
+    if key == ')':
+        if expect_operand or depth == 0:
+            return DEAD
+        while operators[0] != '(':
+            operands = apply_operator(operators[0], operands, backend, cache)
+            operators = operators[1]
+        return (operands, operators[1], '', False, depth - 1)
+    if key not in BINARY_POWER:
+        return DEAD
+    if expect_operand:
+        if key == '+' or key == '-':
+            return (operands, ('neg' if key == '-' else 'pos', operators), '', True, depth)
+        return DEAD
+    # Apply what binds at least as tightly; ** is right associative
+    power = BINARY_POWER[key] + (key in RIGHT_ASSOCIATIVE)
+    while operators is not None and operator_power(operators[0]) >= power:
+        operands = apply_operator(operators[0], operands, backend, cache)
+        operators = operators[1]
+    return (operands, (key, operators), '', True, depth)
+
+def state_value(state: Optional[tuple], backend: Backend, cache: Optional[ExpressionCache] = None):
+    # What evaluate() gives for the text that led to state
+    if state is not DEAD:
+        state = finish_number(state, backend)
+    if state is DEAD:
+        raise CalcError("Invalid expression")
+    operands, operators, _, expect_operand, depth = state
+    if expect_operand or depth:
+        raise CalcError("Unfinished expression")
+    while operators is not None:
+        operands = apply_operator(operators[0], operands, backend, cache)
+        operators = operators[1]
+    value = operands[0]
+    if isinstance(value, CalcError):
+        raise value
+    return value
+
+class LivePreview:
+    # The display text with a parse state and a preview per character:
+    # states[i] and previews[i] belong to text[:i]. A preview is the value of
+    # the longest valid prefix, which the display keeps showing while an
+    # operator or bracket is left open (None before there is one).
+
+    def __init__(self, backend: Optional[Backend] = None, cache: Optional[ExpressionCache] = None):
+        self.backend = backend or FLOAT
+        self.cache = cache
+        self.text = ''
+        self.states = [START]
+        self.previews = [None]
+
+    @property
+    def preview(self):
+        return self.previews[-1]
+
+    def value(self):
+        return state_value(self.states[-1], self.backend, self.cache)
+
+    def append(self, chars: str):
+        for char in chars:
+            text = self.text
+            if char in '*/' and text.endswith(char) and not text.endswith(char * 2):
+                # The second half of ** or //
+                state = feed(self.states[-2], char * 2, self.backend, self.cache)
+            else:
+                state = feed(self.states[-1], char, self.backend, self.cache)
+            self.text = text + char
+            self.states.append(state)
+            try:
+                self.previews.append(state_value(state, self.backend, self.cache))
+            except CalcError:
+                self.previews.append(self.previews[-1])
+
+    def backspace(self):
+        if self.text:
+            self.text = self.text[:-1]
+            self.states.pop()
+            self.previews.pop()
+
+    def set_text(self, text: str):
+        # Keep the states of the common prefix and feed the rest, as for a
+        # paste or a result replacing the text
+        keep = 0
+        limit = min(len(text), len(self.text))
+        while keep < limit and text[keep] == self.text[keep]:
+            keep += 1
+        del self.states[keep + 1:]
+        del self.previews[keep + 1:]
+        self.text = self.text[:keep]
+        self.append(text[keep:])
+
+    def clear(self):
+        self.set_text('')
+
+class HistoryTape:
+    # Finished calculations kept across runs, one "mode TAB expression TAB
+    # result" line each. The file is read only when the entries are first
+    # wanted and new entries are appended without reading it, so a long tape
+    # costs nothing at launch. Reading keeps the last size entries and
+    # rewrites the file once it holds twice that.
+
+    def __init__(self, path: str = HISTORY_PATH, size: int = HISTORY_SIZE):
+        self.path = path
+        self.size = size
+        self._entries = None
+
+    @property
+    def entries(self) -> List[Tuple[str, str, str]]:
+        if self._entries is None:
+            self._entries = self.load()
+        return self._entries
+
+    def load(self) -> List[Tuple[str, str, str]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+        entries = [tuple(line.rstrip('\n').split('\t')) for line in lines if line.count('\t') == 2]
+        entries = entries[-self.size:]
+        if len(lines) > 2 * self.size:
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.writelines('\t'.join(entry) + '\n' for entry in entries)
+            except OSError:
+                pass
+        return entries
+
+    def append(self, mode: str, expression: str, result: str):
+        entry = (mode, expression, result)
+        if self._entries is not None:
+            self._entries.append(entry)
+            del self._entries[:-self.size]
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\t'.join(entry) + '\n')
+        except OSError:
+            pass  # no tape, e.g. on a read-only home directory
+
+class Session:
+    # The calculator's keys without a window: press() takes a keypad key,
+    # 'mode' to switch to the next backend, or 'up' and 'down' to step
+    # through the history tape, and returns the expression and result to
+    # display, None for either that stays as it is. The preview and '='
+    # share one cache.
+
+    def __init__(self, mode: str = 'float', precision: int = DEFAULT_PRECISION,
+                 history: Optional[HistoryTape] = None, cache: Optional[ExpressionCache] = None):
+        self.precision = precision
+        self.backend = make_backend(mode, precision)
+        self.history = history
+        self.cache = cache if cache is not None else ExpressionCache()
+        self.recalled = None  # tape index of a recalled expression
+        self.expression = ''
+        # Parse state per typed character, so each key only updates the tail
+        self.live = LivePreview(self.backend, self.cache)
+
+    def press(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        if key == 'up' or key == 'down':
+            return self.recall(-1 if key == 'up' else 1)
+        self.recalled = None
+        if key == 'C':
+            self.expression = ''
+            self.live.clear()
+            return '', '0'
+        if key == '\u232b':
+            self.expression = self.expression[:-1]
+            self.live.backspace()
+            if not self.expression:
+                return '', '0'
+            return self.expression, self.preview_text()
+        if key == '=':
+            try:
+                result = self.live.value()
+            except CalcError:
+                self.expression = ''
+                self.live.clear()
+                return None, 'Error'
+            shown = self.backend.format(result)
+            if self.history is not None:
+                self.history.append(self.backend.name, self.expression, shown)
+            # Carry on from the result if it reads back in this mode
+            self.expression = self.backend.source(result) or ''
+            self.live.set_text(self.expression)
+            return '', shown
+        if key == 'mode':
+            name = MODES[(MODES.index(self.backend.name) + 1) % len(MODES)]
+            self.backend = make_backend(name, self.precision)
+            self.live = LivePreview(self.backend, self.cache)
+            self.live.append(self.expression)
+            if not self.expression:
+                return '', '0'
+            return self.expression, self.preview_text() or 'Error'
+        self.expression += key
+        self.live.append(key)
+        return self.expression, self.preview_text()
+
+    def recall(self, step: int) -> Tuple[Optional[str], Optional[str]]:
+        # Older (step -1) or newer (+1) expressions from the tape, then an
+        # empty one after the newest
+        if self.history is None:
+            return None, None
+        entries = self.history.entries
+        index = len(entries) if self.recalled is None else self.recalled
+        index = max(0, min(len(entries), index + step))
+        self.recalled = index
+        self.expression = entries[index][1] if index < len(entries) else ''
+        self.live.set_text(self.expression)
+        return self.expression, self.preview_text() or '0'
+
+    def preview_text(self) -> Optional[str]:
+        # The value of the longest valid prefix; None while there is none
+        preview = self.live.preview
+        return None if preview is None else self.backend.format(preview)
+
+    def mode_text(self) -> str:
+        if self.backend.name == 'decimal':
+            return f"DECIMAL {self.precision}"
+        return self.backend.name.upper()
+
+def random_expression(tokens: int, rng: random.Random) -> str:
+    # A long calculator-style expression: numbers joined by the keypad's
+    # operators, never dividing by zero
+    parts = [str(rng.randint(1, 999))]
+    for _ in range(tokens // 2):
+        parts.append(rng.choice('+-*/%'))
+        if rng.random() < 0.2:
+            parts.append(f"{rng.randint(1, 99)}.{rng.randint(0, 99)}")
+        else:
+            parts.append(str(rng.randint(1, 999)))
+    return ''.join(parts)
+
+def keystroke_latency(press, text: str, backspace: bool = False) -> Tuple[float, float]:
+    # Type text one key at a time, or delete it again with backspace, calling
+    # press(typed, key) after each key as the display does; returns mean and
+    # worst seconds per key
+    total = 0.0
+    worst = 0.0
+    keys = range(len(text) - 1, -1, -1) if backspace else range(1, len(text) + 1)
+    for i in keys:
+        typed = text[:i]
+        key = '\u232b' if backspace else text[i - 1]
+        start = time.perf_counter()
+        try:
+            press(typed, key)
+        except Exception:
+            pass
+        spent = time.perf_counter() - start
+        total += spent
+        worst = max(worst, spent)
+    return total / len(text), worst
+
+def press_live(live: LivePreview):
+    def press(typed: str, key: str):
+        if key == '\u232b':
+            live.backspace()
+        else:
+            live.append(key)
+        return live.preview
+    return press
+
+def benchmark(tokens: int, seed: Optional[int] = None):
+    text = random_expression(tokens, random.Random(seed))
+    expected = eval(text)
+    got = evaluate(text)
+    if got != expected and abs(got - expected) > 1e-9 * abs(expected):
+        print(f"warning: engine gives {got}, eval gives {expected}")
+    live = LivePreview()
+    cache = ExpressionCache()
+    presses = (('eval', lambda typed, key: eval(typed)),
+               ('engine', lambda typed, key: evaluate(typed)),
+               ('live', press_live(live)),
+               ('cached', press_live(LivePreview(cache=cache))))
+    for backspace in (False, True):
+        for name, press in presses:
+            mean, worst = keystroke_latency(press, text, backspace)
+            print(f"{name:>6}: {len(text)} {'deletes' if backspace else 'keys'}, "
+                  f"{1e6 * mean:.1f} us mean / {1e6 * worst:.1f} us worst per key")
+        if not backspace and live.preview != got:
+            print(f"warning: live preview gives {live.preview}, engine gives {got}")
+    # '=' after typing, with the preview's cache and without
+    for name, run_cache in (('engine', None), ('cached', cache)):
+        start = time.perf_counter()
+        evaluate(text, FLOAT, run_cache)
+        print(f"{name:>6}: '=' in {1e6 * (time.perf_counter() - start):.1f} us")
+    print(cache.stats())
+
+# Cases that are slow in some backend: giant powers, and long chains whose
+# exact values keep growing
+TIMING_CASES = [
+    ('huge exponent', '7**300000'),
+    ('power tower', '9**9**9'),
+    ('harmonic sum', '+'.join(f"1/{k}" for k in range(1, 2001))),
+    ('factorial', '*'.join(str(k) for k in range(1, 3001))),
+    ('compounding', '1' + '*1.0001' * 5000),
+]
+
+def time_backends(precision: int = DEFAULT_PRECISION):
+    # Evaluation and formatting time per backend for each timing case
+    for case, text in TIMING_CASES:
+        for name in BACKENDS:
+            backend = make_backend(name, precision)
+            start = time.perf_counter()
+            try:
+                value = evaluate(text, backend)
+                evaluated = time.perf_counter()
+                shown = backend.format(value)
+                backend.source(value)
+            except CalcError as e:
+                evaluated = time.perf_counter()
+                shown = f"error: {e}"
+            formatted = time.perf_counter()
+            if len(shown) > 32:
+                shown = shown[:29] + '...'
+            print(f"{case:>13} {name:>8}: evaluate {1000 * (evaluated - start):8.2f} ms, "
+                  f"format {1000 * (formatted - evaluated):7.2f} ms  {shown}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Calculator expression engine')
+    parser.add_argument('expression', nargs='?', help='expression to evaluate')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='compare per-keystroke latency with eval on a long expression')
+    parser.add_argument('--tokens', type=int, default=500, help='benchmark expression length in tokens')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--timing', action='store_true', help='time huge powers and long chains in every mode')
+    parser.add_argument('--mode', choices=MODES, default='float')
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION, help='significant digits in decimal mode')
+    parser.add_argument('--stats', action='store_true', help='print the cache counters after the result')
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.tokens, args.seed)
+    elif args.timing:
+        time_backends(args.precision)
+    elif args.expression is not None:
+        backend = make_backend(args.mode, args.precision)
+        cache = ExpressionCache()
+        try:
+            print(backend.format(evaluate(args.expression, backend, cache)))
+        except CalcError as e:
+            parser.exit(1, f"error: {e}\n")
+        finally:
+            if args.stats:
+                print(cache.stats(), file=sys.stderr)
+    else:
+        parser.error('give an expression, --benchmark or --timing')
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,69 @@
+import time
+import queue
+import argparse
+import threading
 import tkinter as tk
 from tkinter import font
 
+from calc_engine import Session, HistoryTape, MODES, DEFAULT_PRECISION, HISTORY_PATH
+
+# Constants
+POLL_MS = 20
+BUSY_SECONDS = 0.25  # show that a result is on its way after this long
+
 class StylishCalculator:
-    def __init__(self, root):
+    def __init__(self, root, mode='float', precision=DEFAULT_PRECISION, history=None, show_stats=False):
         self.root = root
         self.root.title("Stylish Calculator")
         self.root.geometry("400x600")
         self.root.resizable(False, False)
         self.root.configure(bg="#1e1e2e")
         
-        self.expression = ""
+        # The history tape is only read when Up is first pressed
+        self.session = Session(mode, precision, history)
+        self.show_stats = show_stats
         self.result_var = tk.StringVar()
         self.result_var.set("0")
         
+        # Keys are worked through in order on a worker thread, which owns the
+        # session, so a huge result never blocks the window. poll() shows
+        # what comes back.
+        self.keys = queue.Queue()
+        self.updates = queue.Queue()
+        self.pending = 0
+        self.waiting_since = 0.0
+        self.shown = "0"
+        
         self.create_widgets()
+        threading.Thread(target=self.work, daemon=True).start()
+        self.root.after(POLL_MS, self.poll)
     
     def create_widgets(self):
         # Display frame
         display_frame = tk.Frame(self.root, bg="#1e1e2e", height=150)
         display_frame.pack(fill="both", padx=20, pady=20)
         
+        # Numeric mode, click to change
+        self.mode_var = tk.StringVar()
+        self.mode_var.set(self.status_text())
+        mode_font = font.Font(family="Segoe UI", size=11, weight="bold")
+        mode_display = tk.Label(
+            display_frame,
+            textvariable=self.mode_var,
+            font=mode_font,
+            bg="#1e1e2e",
+            fg="#89b4fa",
+            anchor="w",
+            padx=10,
+            cursor="hand2"
+        )
+        mode_display.pack(fill="x")
+        mode_display.bind("<Button-1>", lambda event: self.on_button_click('mode'))
+        
+        # Up and Down step through earlier calculations
+        self.root.bind("<Up>", lambda event: self.on_button_click('up'))
+        self.root.bind("<Down>", lambda event: self.on_button_click('down'))
+        
         # Result display
         result_font = font.Font(family="Segoe UI", size=36, weight="bold")
         result_display = tk.Label(
@@ -108,37 +152,54 @@ class StylishCalculator:
             buttons_frame.grid_columnconfigure(j, weight=1)
     
     def on_button_click(self, char):
-        if char == 'C':
-            self.expression = ""
-            self.result_var.set("0")
-            self.expr_var.set("")
-        
-        elif char == '⌫':
-            self.expression = self.expression[:-1]
-            self.expr_var.set(self.expression)
-            if not self.expression:
-                self.result_var.set("0")
-        
-        elif char == '=':
-            try:
-                result = eval(self.expression)
-                self.result_var.set(str(result))
-                self.expression = str(result)
-                self.expr_var.set("")
-            except:
-                self.result_var.set("Error")
-                self.expression = ""
-        
-        else:
-            self.expression += str(char)
-            self.expr_var.set(self.expression)
-            try:
-                preview = eval(self.expression)
-                self.result_var.set(str(preview))
-            except:
-                pass
+        if not self.pending:
+            self.waiting_since = time.perf_counter()
+        self.pending += 1
+        self.keys.put(char)
+    
+    def work(self):
+        while True:
+            char = self.keys.get()
+            expression, result = self.session.press(char)
+            self.updates.put((expression, result, self.status_text()))
+    
+    def status_text(self):
+        if self.show_stats:
+            return f"{self.session.mode_text()}   {self.session.cache.stats()}"
+        return self.session.mode_text()
+    
+    def poll(self):
+        # Show finished keys; None leaves a display as it is
+        try:
+            while True:
+                expression, result, mode = self.updates.get_nowait()
+                self.pending -= 1
+                self.waiting_since = time.perf_counter()
+                if expression is not None:
+                    self.expr_var.set(expression)
+                if result is not None:
+                    self.shown = result
+                self.mode_var.set(mode)
+        except queue.Empty:
+            pass
+        if self.pending and time.perf_counter() - self.waiting_since > BUSY_SECONDS:
+            self.result_var.set("\u2026")
+        elif self.result_var.get() != self.shown:
+            self.result_var.set(self.shown)
+        self.root.after(POLL_MS, self.poll)
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description='Stylish calculator')
+    parser.add_argument('--mode', choices=MODES, default='float', help='numeric mode at start')
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION, help='significant digits in decimal mode')
+    parser.add_argument('--history', default=HISTORY_PATH, help='file that keeps the calculation history')
+    parser.add_argument('--no-history', action='store_true', help='neither read nor write a history')
+    parser.add_argument('--stats', action='store_true', help='show the cache counters next to the mode')
+    args = parser.parse_args()
+    history = None if args.no_history else HistoryTape(args.history)
     root = tk.Tk()
-    calculator = StylishCalculator(root)
-    root.mainloop()
\ No newline at end of file
+    calculator = StylishCalculator(root, args.mode, args.precision, history, args.stats)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
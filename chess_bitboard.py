@@ -0,0 +1,781 @@
+import random
+from typing import List, Tuple, Optional
+
+# Bitboard position representation and move generation for the chess game.
+# Squares are numbered a1 = 0 ... h8 = 63. The GUI board is a grid of
+# (row, col) with row 0 holding the black back rank, so
+# square = (7 - row) * 8 + col.
+
+# Colors
+WHITE, BLACK = 0, 1
+COLOR_NAMES = ('white', 'black')
+
+# Piece types
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_TYPES = {'Pawn': PAWN, 'Knight': KNIGHT, 'Bishop': BISHOP,
+               'Rook': ROOK, 'Queen': QUEEN, 'King': KING}
+PIECE_CLASS_NAMES = ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')
+
+# A piece on the mailbox is encoded as color << 3 | piece type
+NO_PIECE = -1
+
+# Castling rights
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+
+# Move encoding: from | to << 6 | promotion << 12 | flag << 16
+# (promotion is a piece type, 0 means no promotion since PAWN == 0)
+FLAG_NORMAL, FLAG_EN_PASSANT, FLAG_CASTLE, FLAG_DOUBLE_PUSH = 0, 1, 2, 3
+
+FULL = 0xFFFFFFFFFFFFFFFF
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_2 = RANK_1 << 8
+RANK_4 = RANK_1 << 24
+RANK_5 = RANK_1 << 32
+RANK_7 = RANK_1 << 48
+RANK_8 = RANK_1 << 56
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+
+
+def square(row: int, col: int) -> int:
+    return (7 - row) * 8 + col
+
+
+def row_col(sq: int) -> Tuple[int, int]:
+    return 7 - (sq >> 3), sq & 7
+
+
+def encode_move(from_sq: int, to_sq: int, promotion: int = 0, flag: int = FLAG_NORMAL) -> int:
+    return from_sq | (to_sq << 6) | (promotion << 12) | (flag << 16)
+
+
+def move_from(move: int) -> int:
+    return move & 63
+
+
+def move_to(move: int) -> int:
+    return (move >> 6) & 63
+
+
+def move_promotion(move: int) -> int:
+    return (move >> 12) & 7
+
+
+def move_flag(move: int) -> int:
+    return move >> 16
+
+
+def square_name(sq: int) -> str:
+    return 'abcdefgh'[sq & 7] + str((sq >> 3) + 1)
+
+
+def move_to_uci(move: int) -> str:
+    promotion = (move >> 12) & 7
+    return square_name(move & 63) + square_name((move >> 6) & 63) + ('', 'n', 'b', 'r', 'q')[promotion]
+
+
+def iter_bits(bb: int):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+# Precomputed leaper attack tables
+
+def _leaper_table(offsets: List[Tuple[int, int]]) -> List[int]:
+    table = []
+    for sq in range(64):
+        rank, file = sq >> 3, sq & 7
+        bb = 0
+        for dr, df in offsets:
+            r, f = rank + dr, file + df
+            if 0 <= r < 8 and 0 <= f < 8:
+                bb |= 1 << (r * 8 + f)
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table([(2, 1), (1, 2), (-1, 2), (-2, 1),
+                                (-2, -1), (-1, -2), (1, -2), (2, -1)])
+KING_ATTACKS = _leaper_table([(1, 0), (-1, 0), (0, 1), (0, -1),
+                              (1, 1), (1, -1), (-1, 1), (-1, -1)])
+PAWN_ATTACKS = [_leaper_table([(1, -1), (1, 1)]), _leaper_table([(-1, -1), (-1, 1)])]
+
+
+# Line masks for hyperbola quintessence (the slider's own square excluded)
+
+def _line_mask(sq: int, dr: int, df: int) -> int:
+    bb = 0
+    for sign in (1, -1):
+        r, f = (sq >> 3) + dr * sign, (sq & 7) + df * sign
+        while 0 <= r < 8 and 0 <= f < 8:
+            bb |= 1 << (r * 8 + f)
+            r, f = r + dr * sign, f + df * sign
+    return bb
+
+
+FILE_MASKS = [_line_mask(sq, 1, 0) for sq in range(64)]
+DIAGONAL_MASKS = [_line_mask(sq, 1, 1) for sq in range(64)]
+ANTI_DIAGONAL_MASKS = [_line_mask(sq, 1, -1) for sq in range(64)]
+SQUARE_BITS = [1 << sq for sq in range(64)]
+SWAPPED_BITS = [1 << ((sq ^ 56)) for sq in range(64)]
+
+
+def _first_rank_attacks() -> List[int]:
+    # FIRST_RANK_ATTACKS[file * 64 + inner occupancy] -> attacked files of rank 1
+    table = []
+    for file in range(8):
+        for inner in range(64):
+            occ = inner << 1
+            bb = 0
+            for step in (1, -1):
+                f = file + step
+                while 0 <= f < 8:
+                    bb |= 1 << f
+                    if occ & (1 << f):
+                        break
+                    f += step
+            table.append(bb)
+    return table
+
+
+FIRST_RANK_ATTACKS = _first_rank_attacks()
+
+
+def _line_attacks(occ: int, sq: int, mask: int) -> int:
+    # Hyperbola quintessence: o - 2r along the line, mirrored with a byte swap
+    forward = occ & mask
+    reverse = int.from_bytes(forward.to_bytes(8, 'little'), 'big')
+    forward = (forward - SQUARE_BITS[sq]) & FULL
+    reverse = (reverse - SWAPPED_BITS[sq]) & FULL
+    forward ^= int.from_bytes(reverse.to_bytes(8, 'little'), 'big')
+    return forward & mask
+
+
+def rank_attacks(occ: int, sq: int) -> int:
+    shift = sq & 56
+    return FIRST_RANK_ATTACKS[((sq & 7) << 6) | ((occ >> (shift + 1)) & 63)] << shift
+
+
+def bishop_attacks(occ: int, sq: int) -> int:
+    return _line_attacks(occ, sq, DIAGONAL_MASKS[sq]) | _line_attacks(occ, sq, ANTI_DIAGONAL_MASKS[sq])
+
+
+def rook_attacks(occ: int, sq: int) -> int:
+    return _line_attacks(occ, sq, FILE_MASKS[sq]) | rank_attacks(occ, sq)
+
+
+def queen_attacks(occ: int, sq: int) -> int:
+    return bishop_attacks(occ, sq) | rook_attacks(occ, sq)
+
+
+def piece_attacks(ptype: int, color: int, sq: int, occ: int) -> int:
+    if ptype == PAWN:
+        return PAWN_ATTACKS[color][sq]
+    if ptype == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if ptype == BISHOP:
+        return bishop_attacks(occ, sq)
+    if ptype == ROOK:
+        return rook_attacks(occ, sq)
+    if ptype == QUEEN:
+        return queen_attacks(occ, sq)
+    return KING_ATTACKS[sq]
+
+
+def _line_tables():
+    # LINE[a * 64 + b]: the full line through two aligned squares (0 if not aligned)
+    # BETWEEN[a * 64 + b]: the squares strictly between them
+    line = [0] * 4096
+    between = [0] * 4096
+    for a in range(64):
+        for b in range(64):
+            if a == b:
+                continue
+            for masks, attack in ((FILE_MASKS, rook_attacks), (DIAGONAL_MASKS, bishop_attacks),
+                                  (ANTI_DIAGONAL_MASKS, bishop_attacks)):
+                if masks[a] >> b & 1:
+                    line[a * 64 + b] = masks[a] | (1 << a)
+                    between[a * 64 + b] = attack(1 << b, a) & attack(1 << a, b)
+            if a >> 3 == b >> 3:
+                line[a * 64 + b] = RANK_1 << (a & 56)
+                between[a * 64 + b] = rank_attacks(1 << b, a) & rank_attacks(1 << a, b)
+    return line, between
+
+
+LINE, BETWEEN = _line_tables()
+
+# Castling rights lost when a piece leaves or is captured on a square
+CASTLING_MASK = [0xF] * 64
+CASTLING_MASK[0] ^= WHITE_QUEENSIDE
+CASTLING_MASK[7] ^= WHITE_KINGSIDE
+CASTLING_MASK[4] ^= WHITE_KINGSIDE | WHITE_QUEENSIDE
+CASTLING_MASK[56] ^= BLACK_QUEENSIDE
+CASTLING_MASK[63] ^= BLACK_KINGSIDE
+CASTLING_MASK[60] ^= BLACK_KINGSIDE | BLACK_QUEENSIDE
+
+# (right, king from, king to, rook from, rook to, squares that must be empty)
+CASTLING_MOVES = [
+    (WHITE_KINGSIDE, 4, 6, 7, 5, (1 << 5) | (1 << 6)),
+    (WHITE_QUEENSIDE, 4, 2, 0, 3, (1 << 1) | (1 << 2) | (1 << 3)),
+    (BLACK_KINGSIDE, 60, 62, 63, 61, (1 << 61) | (1 << 62)),
+    (BLACK_QUEENSIDE, 60, 58, 56, 59, (1 << 57) | (1 << 58) | (1 << 59)),
+]
+CASTLING_ROOKS = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Zobrist keys, from a fixed seed so hashes agree across processes and runs
+_zobrist_rng = random.Random(0x5EED)
+ZOBRIST_PIECES = [_zobrist_rng.getrandbits(64) for _ in range(16 * 64)]  # [piece code * 64 + sq]
+ZOBRIST_CASTLING = [_zobrist_rng.getrandbits(64) for _ in range(16)]
+ZOBRIST_EP_FILE = [_zobrist_rng.getrandbits(64) for _ in range(8)]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+
+
+class Position:
+    def __init__(self):
+        self.pieces = [[0] * 6, [0] * 6]  # pieces[color][piece type] -> bitboard
+        self.occupied = [0, 0]
+        self.all = 0
+        self.mailbox = [NO_PIECE] * 64
+        self.side = WHITE
+        self.castling = 0
+        self.ep_square = -1
+        self.halfmove = 0
+        self.fullmove = 1
+        # attack_counts[color][sq]: how many pieces of color attack sq,
+        # maintained incrementally by put_piece/remove_piece once enabled
+        self.attack_counts = None
+        # Undo records: (move, captured piece, castling, en passant square, halfmove clock, hash)
+        self.history = []
+        # Zobrist hash, updated incrementally by put_piece/remove_piece/make_move
+        self.hash = 0
+
+    @classmethod
+    def starting(cls) -> 'Position':
+        pos = cls()
+        back_rank = [ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK]
+        for file in range(8):
+            pos.put_piece(WHITE, back_rank[file], file)
+            pos.put_piece(WHITE, PAWN, 8 + file)
+            pos.put_piece(BLACK, PAWN, 48 + file)
+            pos.put_piece(BLACK, back_rank[file], 56 + file)
+        pos.castling = WHITE_KINGSIDE | WHITE_QUEENSIDE | BLACK_KINGSIDE | BLACK_QUEENSIDE
+        pos.hash = pos.compute_hash()
+        return pos
+
+    @classmethod
+    def from_board(cls, board, turn: str = 'white') -> 'Position':
+        # Build a position from ChessGame's List[List[Optional[Piece]]] grid
+        pos = cls()
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece is not None:
+                    color = WHITE if piece.color == 'white' else BLACK
+                    pos.put_piece(color, PIECE_TYPES[piece.__class__.__name__], square(row, col))
+        pos.side = WHITE if turn == 'white' else BLACK
+
+        def unmoved(row, col, name):
+            piece = board[row][col]
+            return piece is not None and piece.__class__.__name__ == name and not piece.has_moved
+
+        if unmoved(7, 4, 'King'):
+            if unmoved(7, 7, 'Rook'):
+                pos.castling |= WHITE_KINGSIDE
+            if unmoved(7, 0, 'Rook'):
+                pos.castling |= WHITE_QUEENSIDE
+        if unmoved(0, 4, 'King'):
+            if unmoved(0, 7, 'Rook'):
+                pos.castling |= BLACK_KINGSIDE
+            if unmoved(0, 0, 'Rook'):
+                pos.castling |= BLACK_QUEENSIDE
+        pos.hash = pos.compute_hash()
+        return pos
+
+    @classmethod
+    def from_fen(cls, fen: str) -> 'Position':
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        pos = cls()
+        rows = fields[0].split('/')
+        if len(rows) != 8:
+            raise ValueError(f"Invalid FEN board: {fields[0]!r}")
+        for row, text in enumerate(rows):
+            col = 0
+            for char in text:
+                if char.isdigit():
+                    col += int(char)
+                else:
+                    ptype = 'pnbrqk'.find(char.lower())
+                    if ptype < 0 or col > 7:
+                        raise ValueError(f"Invalid FEN board: {fields[0]!r}")
+                    pos.put_piece(WHITE if char.isupper() else BLACK, ptype, square(row, col))
+                    col += 1
+            if col != 8:
+                raise ValueError(f"Invalid FEN board: {fields[0]!r}")
+        pos.side = WHITE if fields[1] == 'w' else BLACK
+        for char, right in zip('KQkq', (WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+            if char in fields[2]:
+                pos.castling |= right
+        if fields[3] != '-':
+            pos.ep_square = (int(fields[3][1]) - 1) * 8 + 'abcdefgh'.index(fields[3][0])
+        if len(fields) >= 6:
+            pos.halfmove = int(fields[4])
+            pos.fullmove = int(fields[5])
+        pos.hash = pos.compute_hash()
+        return pos
+
+    def fen(self) -> str:
+        rows = []
+        for row in str(self).split('\n'):
+            text = ''
+            empty = 0
+            for char in row:
+                if char == '.':
+                    empty += 1
+                else:
+                    if empty:
+                        text += str(empty)
+                        empty = 0
+                    text += char
+            if empty:
+                text += str(empty)
+            rows.append(text)
+        castling = ''.join(char for char, right in zip('KQkq', (WHITE_KINGSIDE, WHITE_QUEENSIDE,
+                                                               BLACK_KINGSIDE, BLACK_QUEENSIDE))
+                           if self.castling & right) or '-'
+        ep = square_name(self.ep_square) if self.ep_square >= 0 else '-'
+        return f"{'/'.join(rows)} {'wb'[self.side]} {castling} {ep} {self.halfmove} {self.fullmove}"
+
+    def copy(self) -> 'Position':
+        pos = Position.__new__(Position)
+        pos.pieces = [self.pieces[0][:], self.pieces[1][:]]
+        pos.occupied = self.occupied[:]
+        pos.all = self.all
+        pos.mailbox = self.mailbox[:]
+        pos.side = self.side
+        pos.castling = self.castling
+        pos.ep_square = self.ep_square
+        pos.halfmove = self.halfmove
+        pos.fullmove = self.fullmove
+        pos.history = self.history[:]
+        pos.hash = self.hash
+        if self.attack_counts is None:
+            pos.attack_counts = None
+        else:
+            pos.attack_counts = [self.attack_counts[0][:], self.attack_counts[1][:]]
+        return pos
+
+    def compute_hash(self) -> int:
+        key = 0
+        for sq in iter_bits(self.all):
+            key ^= ZOBRIST_PIECES[self.mailbox[sq] * 64 + sq]
+        key ^= ZOBRIST_CASTLING[self.castling]
+        if self._ep_capturable():
+            key ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+        if self.side == BLACK:
+            key ^= ZOBRIST_SIDE
+        return key
+
+    def _ep_capturable(self) -> bool:
+        # The en passant square only counts towards the hash when a capture is possible
+        return self.ep_square >= 0 and bool(PAWN_ATTACKS[self.side ^ 1][self.ep_square]
+                                            & self.pieces[self.side][PAWN])
+
+    def enable_attack_map(self):
+        self.attack_counts = [[0] * 64, [0] * 64]
+        for sq in iter_bits(self.all):
+            piece = self.mailbox[sq]
+            self._count_attacks(piece >> 3, piece_attacks(piece & 7, piece >> 3, sq, self.all), 1)
+
+    def _count_attacks(self, color: int, targets: int, delta: int):
+        counts = self.attack_counts[color]
+        while targets:
+            low = targets & -targets
+            counts[low.bit_length() - 1] += delta
+            targets ^= low
+
+    def _sliders_through(self, sq: int) -> List[Tuple[int, int, int]]:
+        # Sliders whose rays reach sq, as (color, square, piece type)
+        white, black = self.pieces
+        occ = self.all
+        sliders = ((bishop_attacks(occ, sq) & (white[BISHOP] | white[QUEEN] | black[BISHOP] | black[QUEEN]))
+                   | (rook_attacks(occ, sq) & (white[ROOK] | white[QUEEN] | black[ROOK] | black[QUEEN])))
+        result = []
+        for slider in iter_bits(sliders):
+            piece = self.mailbox[slider]
+            result.append((piece >> 3, slider, piece & 7))
+        return result
+
+    def _toggle_occupancy(self, sq: int) -> List[Tuple[int, int, int, int]]:
+        # Attack sets of the sliders through sq before the occupancy of sq changes
+        return [(color, slider, ptype, piece_attacks(ptype, color, slider, self.all))
+                for color, slider, ptype in self._sliders_through(sq)]
+
+    def _retally_sliders(self, before: List[Tuple[int, int, int, int]]):
+        occ = self.all
+        for color, slider, ptype, old in before:
+            new = piece_attacks(ptype, color, slider, occ)
+            if old != new:
+                self._count_attacks(color, old & ~new, -1)
+                self._count_attacks(color, new & ~old, 1)
+
+    def put_piece(self, color: int, ptype: int, sq: int):
+        bit = 1 << sq
+        before = self._toggle_occupancy(sq) if self.attack_counts is not None else None
+        self.pieces[color][ptype] |= bit
+        self.occupied[color] |= bit
+        self.all |= bit
+        self.mailbox[sq] = (color << 3) | ptype
+        self.hash ^= ZOBRIST_PIECES[(((color << 3) | ptype) << 6) | sq]
+        if before is not None:
+            self._retally_sliders(before)
+            self._count_attacks(color, piece_attacks(ptype, color, sq, self.all), 1)
+
+    def remove_piece(self, sq: int) -> int:
+        piece = self.mailbox[sq]
+        if piece != NO_PIECE:
+            bit = 1 << sq
+            color = piece >> 3
+            if self.attack_counts is not None:
+                self._count_attacks(color, piece_attacks(piece & 7, color, sq, self.all), -1)
+                before = self._toggle_occupancy(sq)
+            self.pieces[color][piece & 7] ^= bit
+            self.occupied[color] ^= bit
+            self.all ^= bit
+            self.mailbox[sq] = NO_PIECE
+            self.hash ^= ZOBRIST_PIECES[(piece << 6) | sq]
+            if self.attack_counts is not None:
+                self._retally_sliders(before)
+        return piece
+
+    def piece_at(self, sq: int) -> Optional[Tuple[int, int]]:
+        piece = self.mailbox[sq]
+        if piece == NO_PIECE:
+            return None
+        return piece >> 3, piece & 7
+
+    def king_square(self, color: int) -> int:
+        return self.pieces[color][KING].bit_length() - 1
+
+    # Attack queries
+
+    def attackers_to(self, sq: int, occ: Optional[int] = None) -> int:
+        if occ is None:
+            occ = self.all
+        white, black = self.pieces
+        diagonal = white[BISHOP] | white[QUEEN] | black[BISHOP] | black[QUEEN]
+        straight = white[ROOK] | white[QUEEN] | black[ROOK] | black[QUEEN]
+        return ((PAWN_ATTACKS[BLACK][sq] & white[PAWN])
+                | (PAWN_ATTACKS[WHITE][sq] & black[PAWN])
+                | (KNIGHT_ATTACKS[sq] & (white[KNIGHT] | black[KNIGHT]))
+                | (KING_ATTACKS[sq] & (white[KING] | black[KING]))
+                | (bishop_attacks(occ, sq) & diagonal)
+                | (rook_attacks(occ, sq) & straight))
+
+    def is_attacked(self, sq: int, by_color: int, occ: Optional[int] = None) -> bool:
+        if occ is None:
+            if self.attack_counts is not None:
+                return self.attack_counts[by_color][sq] > 0
+            occ = self.all
+        them = self.pieces[by_color]
+        if PAWN_ATTACKS[by_color ^ 1][sq] & them[PAWN]:
+            return True
+        if KNIGHT_ATTACKS[sq] & them[KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & them[KING]:
+            return True
+        if bishop_attacks(occ, sq) & (them[BISHOP] | them[QUEEN]):
+            return True
+        return bool(rook_attacks(occ, sq) & (them[ROOK] | them[QUEEN]))
+
+    def in_check(self, color: Optional[int] = None) -> bool:
+        if color is None:
+            color = self.side
+        king = self.pieces[color][KING]
+        return bool(king) and self.is_attacked(king.bit_length() - 1, color ^ 1)
+
+    # Move generation
+
+    def generate_moves(self, captures_only: bool = False) -> List[int]:
+        # Pseudo-legal moves for the side to move, including castling,
+        # en passant and all four promotions. captures_only keeps captures
+        # and promotions, for quiescence search.
+        moves = []
+        us = self.side
+        mine = self.pieces[us]
+        own = self.occupied[us]
+        enemy = self.occupied[us ^ 1]
+        occ = self.all
+        empty = FULL ^ occ
+        append = moves.append
+
+        # Pawns, set-wise
+        pawns = mine[PAWN]
+        if us == WHITE:
+            single = (pawns << 8) & empty
+            double = ((single & (RANK_1 << 16)) << 8) & empty
+            left = ((pawns & NOT_FILE_A) << 7) & enemy
+            right = ((pawns & NOT_FILE_H) << 9) & enemy
+            push, left_delta, right_delta, last_rank = 8, 7, 9, RANK_8
+        else:
+            single = (pawns >> 8) & empty
+            double = ((single & (RANK_1 << 40)) >> 8) & empty
+            left = ((pawns & NOT_FILE_A) >> 9) & enemy
+            right = ((pawns & NOT_FILE_H) >> 7) & enemy
+            push, left_delta, right_delta, last_rank = -8, -9, -7, RANK_1
+        if captures_only:
+            single &= last_rank
+            double = 0
+        for targets, delta in ((single, push), (left, left_delta), (right, right_delta)):
+            while targets:
+                low = targets & -targets
+                to = low.bit_length() - 1
+                targets ^= low
+                frm = to - delta
+                if low & last_rank:
+                    base = frm | (to << 6)
+                    append(base | (QUEEN << 12))
+                    append(base | (ROOK << 12))
+                    append(base | (BISHOP << 12))
+                    append(base | (KNIGHT << 12))
+                else:
+                    append(frm | (to << 6))
+        while double:
+            low = double & -double
+            to = low.bit_length() - 1
+            double ^= low
+            append((to - 2 * push) | (to << 6) | (FLAG_DOUBLE_PUSH << 16))
+        if self.ep_square >= 0:
+            ep = self.ep_square
+            attackers = PAWN_ATTACKS[us ^ 1][ep] & pawns
+            while attackers:
+                low = attackers & -attackers
+                attackers ^= low
+                append((low.bit_length() - 1) | (ep << 6) | (FLAG_EN_PASSANT << 16))
+
+        # Knights and king from the leaper tables
+        not_own = enemy if captures_only else FULL ^ own
+        for table, bb in ((KNIGHT_ATTACKS, mine[KNIGHT]), (KING_ATTACKS, mine[KING])):
+            while bb:
+                low = bb & -bb
+                frm = low.bit_length() - 1
+                bb ^= low
+                targets = table[frm] & not_own
+                while targets:
+                    tlow = targets & -targets
+                    targets ^= tlow
+                    append(frm | ((tlow.bit_length() - 1) << 6))
+
+        # Sliders
+        for attack, bb in ((bishop_attacks, mine[BISHOP]), (rook_attacks, mine[ROOK]),
+                           (queen_attacks, mine[QUEEN])):
+            while bb:
+                low = bb & -bb
+                frm = low.bit_length() - 1
+                bb ^= low
+                targets = attack(occ, frm) & not_own
+                while targets:
+                    tlow = targets & -targets
+                    targets ^= tlow
+                    append(frm | ((tlow.bit_length() - 1) << 6))
+
+        # Castling: path empty and king not passing through an attacked square
+        if self.castling and not captures_only:
+            them = us ^ 1
+            for right, king_from, king_to, _, _, between in CASTLING_MOVES[us * 2:us * 2 + 2]:
+                if self.castling & right and not occ & between:
+                    step = 1 if king_to > king_from else -1
+                    if not (self.is_attacked(king_from, them)
+                            or self.is_attacked(king_from + step, them)
+                            or self.is_attacked(king_to, them)):
+                        append(king_from | (king_to << 6) | (FLAG_CASTLE << 16))
+        return moves
+
+    def checkers_and_pinned(self, color: Optional[int] = None) -> Tuple[int, int]:
+        # Enemy pieces giving check and own pieces pinned to the king
+        if color is None:
+            color = self.side
+        king = self.pieces[color][KING]
+        if not king:
+            return 0, 0
+        k = king.bit_length() - 1
+        them = self.pieces[color ^ 1]
+        enemy_occ = self.occupied[color ^ 1]
+        own = self.occupied[color]
+        checkers = ((PAWN_ATTACKS[color][k] & them[PAWN]) | (KNIGHT_ATTACKS[k] & them[KNIGHT]))
+        pinned = 0
+        snipers = ((rook_attacks(enemy_occ, k) & (them[ROOK] | them[QUEEN]))
+                   | (bishop_attacks(enemy_occ, k) & (them[BISHOP] | them[QUEEN])))
+        while snipers:
+            low = snipers & -snipers
+            snipers ^= low
+            blockers = BETWEEN[k * 64 + low.bit_length() - 1] & own
+            if not blockers:
+                checkers |= low
+            elif not blockers & (blockers - 1):
+                pinned |= blockers
+        return checkers, pinned
+
+    def is_legal(self, move: int) -> bool:
+        self.make_move(move)
+        legal = not self.in_check(self.side ^ 1)
+        self.unmake_move()
+        return legal
+
+    def legal_moves(self, captures_only: bool = False) -> List[int]:
+        # Filter pseudo-legal moves with the checkers and pins instead of
+        # playing each move; only en passant falls back to is_legal
+        moves = self.generate_moves(captures_only)
+        us = self.side
+        king = self.pieces[us][KING]
+        if not king:
+            return moves
+        k = king.bit_length() - 1
+        checkers, pinned = self.checkers_and_pinned(us)
+        if checkers:
+            if checkers & (checkers - 1):
+                targets = 0
+            else:
+                targets = checkers | BETWEEN[k * 64 + checkers.bit_length() - 1]
+        else:
+            targets = FULL
+        occ_without_king = self.all ^ king
+        them = us ^ 1
+        legal = []
+        for move in moves:
+            frm = move & 63
+            to = (move >> 6) & 63
+            if frm == k:
+                if move >> 16 == FLAG_CASTLE:
+                    if not checkers:
+                        legal.append(move)
+                elif not self.is_attacked(to, them, occ_without_king):
+                    legal.append(move)
+            elif move >> 16 == FLAG_EN_PASSANT:
+                if self.is_legal(move):
+                    legal.append(move)
+            elif (targets >> to) & 1 and (not (pinned >> frm) & 1 or (LINE[k * 64 + frm] >> to) & 1):
+                legal.append(move)
+        return legal
+
+    def legacy_moves(self, sq: int) -> List[Tuple[int, int]]:
+        # Same destination squares as Piece.get_valid_moves in chess game.py:
+        # pseudo-legal, no castling and no en passant
+        piece = self.mailbox[sq]
+        if piece == NO_PIECE:
+            return []
+        color, ptype = piece >> 3, piece & 7
+        occ = self.all
+        if ptype == PAWN:
+            bit = 1 << sq
+            empty = FULL ^ occ
+            if color == WHITE:
+                targets = (bit << 8) & empty
+                if targets and bit & RANK_2:
+                    targets |= (targets << 8) & empty
+            else:
+                targets = (bit >> 8) & empty
+                if targets and bit & RANK_7:
+                    targets |= (targets >> 8) & empty
+            targets |= PAWN_ATTACKS[color][sq] & self.occupied[color ^ 1]
+        else:
+            targets = piece_attacks(ptype, color, sq, occ) & ~self.occupied[color]
+        return [row_col(to) for to in iter_bits(targets)]
+
+    def legacy_move(self, from_sq: int, to_sq: int) -> int:
+        # Encode a GUI move; pawns reaching the last rank become queens
+        piece = self.mailbox[from_sq]
+        if (piece & 7) == PAWN and (to_sq >> 3) in (0, 7):
+            return encode_move(from_sq, to_sq, QUEEN)
+        if (piece & 7) == PAWN and abs(to_sq - from_sq) == 16:
+            return encode_move(from_sq, to_sq, flag=FLAG_DOUBLE_PUSH)
+        return encode_move(from_sq, to_sq)
+
+    def make_move(self, move: int):
+        # Play a move in place, pushing an undo record for unmake_move
+        frm = move & 63
+        to = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 16
+        us = self.side
+        ptype = self.mailbox[frm] & 7
+        key = self.hash
+        if self._ep_capturable():
+            self.hash ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+
+        if flag == FLAG_EN_PASSANT:
+            captured = self.remove_piece(to - 8 if us == WHITE else to + 8)
+        else:
+            captured = self.remove_piece(to)
+        self.history.append((move, captured, self.castling, self.ep_square, self.halfmove, key))
+        self.remove_piece(frm)
+        self.put_piece(us, promotion if promotion else ptype, to)
+        if flag == FLAG_CASTLE:
+            rook_from, rook_to = CASTLING_ROOKS[to]
+            self.remove_piece(rook_from)
+            self.put_piece(us, ROOK, rook_to)
+
+        castling = self.castling & CASTLING_MASK[frm] & CASTLING_MASK[to]
+        if castling != self.castling:
+            self.hash ^= ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_CASTLING[castling]
+            self.castling = castling
+        if ptype == PAWN or captured != NO_PIECE:
+            self.halfmove = 0
+        else:
+            self.halfmove += 1
+        if us == BLACK:
+            self.fullmove += 1
+        self.side = us ^ 1
+        self.hash ^= ZOBRIST_SIDE
+        if flag == FLAG_DOUBLE_PUSH:
+            self.ep_square = (frm + to) >> 1
+            if self._ep_capturable():
+                self.hash ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+        else:
+            self.ep_square = -1
+
+    def unmake_move(self) -> int:
+        # Take back the last move made with make_move and return it
+        move, captured, self.castling, self.ep_square, self.halfmove, key = self.history.pop()
+        frm = move & 63
+        to = (move >> 6) & 63
+        flag = move >> 16
+        us = self.side ^ 1
+        self.side = us
+        if us == BLACK:
+            self.fullmove -= 1
+
+        if flag == FLAG_CASTLE:
+            rook_from, rook_to = CASTLING_ROOKS[to]
+            self.remove_piece(rook_to)
+            self.put_piece(us, ROOK, rook_from)
+        piece = self.remove_piece(to)
+        self.put_piece(us, PAWN if (move >> 12) & 7 else piece & 7, frm)
+        if captured != NO_PIECE:
+            if flag == FLAG_EN_PASSANT:
+                self.put_piece(captured >> 3, PAWN, to - 8 if us == WHITE else to + 8)
+            else:
+                self.put_piece(captured >> 3, captured & 7, to)
+        self.hash = key
+        return move
+
+    def __str__(self) -> str:
+        rows = []
+        for rank in range(7, -1, -1):
+            row = ''
+            for file in range(8):
+                piece = self.mailbox[rank * 8 + file]
+                if piece == NO_PIECE:
+                    row += '.'
+                else:
+                    letter = 'pnbrqk'[piece & 7]
+                    row += letter.upper() if piece >> 3 == WHITE else letter
+            rows.append(row)
+        return '\n'.join(rows)
@@ -0,0 +1,384 @@
+from typing import List, Tuple, Optional
+from chess_bitboard import (Position, START_FEN, COLOR_NAMES, PIECE_CLASS_NAMES, PAWN, KING, QUEEN,
+                            WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE,
+                            FLAG_CASTLE, FLAG_EN_PASSANT, square, row_col, iter_bits,
+                            move_from, move_to, move_promotion, move_flag)
+from chess_tt import MoveCache
+from chess_search import Searcher
+
+# Chess rules and game state, importable without pygame or a display.
+# "chess game.py" draws this state; engines, tests and servers use it directly.
+
+# Constants
+ROWS, COLS = 8, 8
+
+class Piece:
+    def __init__(self, color: str, row: int, col: int):
+        self.color = color  # 'white' or 'black'
+        self.row = row
+        self.col = col
+        self.has_moved = False
+
+    def move(self, row: int, col: int):
+        self.row = row
+        self.col = col
+        self.has_moved = True
+
+    def get_valid_moves(self, board) -> List[Tuple[int, int]]:
+        return []
+
+    def __repr__(self):
+        return f"{self.color} {self.__class__.__name__} at ({self.row}, {self.col})"
+
+
+class Pawn(Piece):
+    def __init__(self, color, row, col):
+        super().__init__(color, row, col)
+        self.direction = -1 if color == 'white' else 1
+        self.en_passant = False
+
+    def get_valid_moves(self, board) -> List[Tuple[int, int]]:
+        moves = []
+        
+        # Move forward
+        if 0 <= self.row + self.direction < ROWS:
+            if board[self.row + self.direction][self.col] is None:
+                moves.append((self.row + self.direction, self.col))
+                
+                # Double move from starting position
+                if not self.has_moved and board[self.row + 2 * self.direction][self.col] is None:
+                    moves.append((self.row + 2 * self.direction, self.col))
+        
+        # Capture diagonally
+        for dc in [-1, 1]:
+            if 0 <= self.col + dc < COLS and 0 <= self.row + self.direction < ROWS:
+                target = board[self.row + self.direction][self.col + dc]
+                if target is not None and target.color != self.color:
+                    moves.append((self.row + self.direction, self.col + dc))
+        
+        # TODO: Implement en passant
+        
+        return moves
+
+
+class Rook(Piece):
+    def get_valid_moves(self, board) -> List[Tuple[int, int]]:
+        moves = []
+        
+        # Horizontal and vertical moves
+        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+        
+        for dr, dc in directions:
+            for i in range(1, 8):
+                r, c = self.row + dr * i, self.col + dc * i
+                if 0 <= r < ROWS and 0 <= c < COLS:
+                    target = board[r][c]
+                    if target is None:
+                        moves.append((r, c))
+                    else:
+                        if target.color != self.color:
+                            moves.append((r, c))
+                        break
+                else:
+                    break
+        
+        return moves
+
+
+class Knight(Piece):
+    def get_valid_moves(self, board) -> List[Tuple[int, int]]:
+        moves = []
+        knight_moves = [
+            (2, 1), (1, 2), (-1, 2), (-2, 1),
+            (-2, -1), (-1, -2), (1, -2), (2, -1)
+        ]
+        
+        for dr, dc in knight_moves:
+            r, c = self.row + dr, self.col + dc
+            if 0 <= r < ROWS and 0 <= c < COLS:
+                target = board[r][c]
+                if target is None or target.color != self.color:
+                    moves.append((r, c))
+        
+        return moves
+
+
+class Bishop(Piece):
+    def get_valid_moves(self, board) -> List[Tuple[int, int]]:
+        moves = []
+        directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+        
+        for dr, dc in directions:
+            for i in range(1, 8):
+                r, c = self.row + dr * i, self.col + dc * i
+                if 0 <= r < ROWS and 0 <= c < COLS:
+                    target = board[r][c]
+                    if target is None:
+                        moves.append((r, c))
+                    else:
+                        if target.color != self.color:
+                            moves.append((r, c))
+                        break
+                else:
+                    break
+        
+        return moves
+
+
+class Queen(Piece):
+    def get_valid_moves(self, board) -> List[Tuple[int, int]]:
+        # Combine rook and bishop moves
+        rook_moves = Rook(self.color, self.row, self.col).get_valid_moves(board)
+        bishop_moves = Bishop(self.color, self.row, self.col).get_valid_moves(board)
+        return rook_moves + bishop_moves
+
+
+class King(Piece):
+    def __init__(self, color, row, col):
+        super().__init__(color, row, col)
+        self.in_check = False
+
+    def get_valid_moves(self, board) -> List[Tuple[int, int]]:
+        moves = []
+        king_moves = [
+            (1, 0), (-1, 0), (0, 1), (0, -1),
+            (1, 1), (1, -1), (-1, 1), (-1, -1)
+        ]
+        
+        for dr, dc in king_moves:
+            r, c = self.row + dr, self.col + dc
+            if 0 <= r < ROWS and 0 <= c < COLS:
+                target = board[r][c]
+                if target is None or target.color != self.color:
+                    moves.append((r, c))
+        
+        # TODO: Implement castling
+        
+        return moves
+
+
+class ChessGame:
+    def __init__(self, use_bitboards: bool = True):
+        self.board = self.create_board()
+        self.turn = 'white'
+        self.selected_piece = None
+        self.valid_moves = []
+        self.white_king = self.board[7][4]
+        self.black_king = self.board[0][4]
+        self.game_over = False
+        self.winner = None
+        # Undo records: (piece, from row, from col, captured piece, has_moved, game_over, winner)
+        self.history = []
+        # Bitboard backing store used for move generation and check detection;
+        # its attack map is updated incrementally by make_move
+        self.position = None
+        if use_bitboards:
+            self.position = Position.from_board(self.board, self.turn)
+            self.position.enable_attack_map()
+        # Move lists per (position hash, square), shared by repeated selections
+        self.move_cache = MoveCache()
+        # Where position.history starts, for PGN export
+        self.start_fen = START_FEN
+
+    def create_board(self) -> List[List[Optional[Piece]]]:
+        board = [[None for _ in range(COLS)] for _ in range(ROWS)]
+        
+        # Create pawns
+        for col in range(COLS):
+            board[1][col] = Pawn('black', 1, col)
+            board[6][col] = Pawn('white', 6, col)
+        
+        # Create rooks
+        board[0][0] = Rook('black', 0, 0)
+        board[0][7] = Rook('black', 0, 7)
+        board[7][0] = Rook('white', 7, 0)
+        board[7][7] = Rook('white', 7, 7)
+        
+        # Create knights
+        board[0][1] = Knight('black', 0, 1)
+        board[0][6] = Knight('black', 0, 6)
+        board[7][1] = Knight('white', 7, 1)
+        board[7][6] = Knight('white', 7, 6)
+        
+        # Create bishops
+        board[0][2] = Bishop('black', 0, 2)
+        board[0][5] = Bishop('black', 0, 5)
+        board[7][2] = Bishop('white', 7, 2)
+        board[7][5] = Bishop('white', 7, 5)
+        
+        # Create queens
+        board[0][3] = Queen('black', 0, 3)
+        board[7][3] = Queen('white', 7, 3)
+        
+        # Create kings
+        board[0][4] = King('black', 0, 4)
+        board[7][4] = King('white', 7, 4)
+        
+        return board
+
+    def load_position(self, pos: Position):
+        # Replace the game with an arbitrary position, rebuilding the piece grid
+        board = [[None for _ in range(COLS)] for _ in range(ROWS)]
+        classes = {name: globals()[name] for name in PIECE_CLASS_NAMES}
+        for sq in iter_bits(pos.all):
+            piece = pos.mailbox[sq]
+            row, col = row_col(sq)
+            obj = classes[PIECE_CLASS_NAMES[piece & 7]](COLOR_NAMES[piece >> 3], row, col)
+            if (piece & 7) == PAWN:
+                obj.has_moved = row != (6 if piece >> 3 == 0 else 1)
+            elif (piece & 7) != KING:
+                obj.has_moved = True
+            board[row][col] = obj
+
+        # Kings and rooks keep has_moved = False only where castling rights say so
+        for rights, row, col in ((WHITE_KINGSIDE, 7, 7), (WHITE_QUEENSIDE, 7, 0),
+                                 (BLACK_KINGSIDE, 0, 7), (BLACK_QUEENSIDE, 0, 0)):
+            if pos.castling & rights and isinstance(board[row][col], Rook):
+                board[row][col].has_moved = False
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = board[row][col]
+                if isinstance(piece, King):
+                    rights = (WHITE_KINGSIDE | WHITE_QUEENSIDE) if piece.color == 'white' else \
+                        (BLACK_KINGSIDE | BLACK_QUEENSIDE)
+                    piece.has_moved = not (pos.castling & rights and col == 4)
+
+        self.board = board
+        self.turn = COLOR_NAMES[pos.side]
+        self.selected_piece = None
+        self.valid_moves = []
+        self.game_over = False
+        self.winner = None
+        self.history = []
+        self.white_king = self.black_king = None
+        self.update()
+        self.start_fen = pos.fen()
+        if self.position is not None:
+            self.position = Position.from_fen(self.start_fen)
+            self.position.enable_attack_map()
+
+    def load_fen(self, fen: str):
+        self.load_position(Position.from_fen(fen))
+
+    def fen(self) -> str:
+        if self.position:
+            return self.position.fen()
+        return Position.from_board(self.board, self.turn).fen()
+
+    def select_piece(self, row: int, col: int) -> bool:
+        piece = self.board[row][col]
+        if piece and piece.color == self.turn:
+            self.selected_piece = piece
+            if self.position:
+                self.valid_moves = self.move_cache.legacy_moves(self.position, square(row, col))
+            else:
+                self.valid_moves = piece.get_valid_moves(self.board)
+            return True
+        return False
+
+    def move_piece(self, row: int, col: int) -> bool:
+        if self.selected_piece and (row, col) in self.valid_moves:
+            self.make_move((self.selected_piece.row, self.selected_piece.col), (row, col))
+            self.selected_piece = None
+            self.valid_moves = []
+            return True
+        return False
+
+    def make_move(self, from_pos: Tuple[int, int], to_pos: Tuple[int, int]):
+        # Play a move, pushing an undo record so unmake_move can take it back.
+        # Castling and en passant state is kept by the position's own undo stack.
+        from_row, from_col = from_pos
+        row, col = to_pos
+        piece = self.board[from_row][from_col]
+        captured = self.board[row][col]
+        self.history.append((piece, from_row, from_col, captured, piece.has_moved,
+                             self.game_over, self.winner))
+
+        # Check if capturing the king
+        if isinstance(captured, King):
+            self.game_over = True
+            self.winner = self.turn
+
+        # Keep the bitboards in sync with the piece grid
+        if self.position:
+            from_sq = square(from_row, from_col)
+            self.position.make_move(self.position.legacy_move(from_sq, square(row, col)))
+
+        # Move the piece
+        self.board[from_row][from_col] = None
+        self.board[row][col] = piece
+        piece.move(row, col)
+
+        # Check for pawn promotion
+        if isinstance(piece, Pawn) and (row == 0 or row == 7):
+            self.board[row][col] = Queen(piece.color, row, col)
+
+        self.change_turn()
+
+    def unmake_move(self) -> bool:
+        if not self.history:
+            return False
+        piece, from_row, from_col, captured, had_moved, self.game_over, self.winner = self.history.pop()
+        # A promoted pawn is restored in place of its queen
+        self.board[piece.row][piece.col] = captured
+        self.board[from_row][from_col] = piece
+        piece.move(from_row, from_col)
+        piece.has_moved = had_moved
+        if self.position:
+            self.position.unmake_move()
+        self.change_turn()
+        return True
+
+    def engine_root_moves(self) -> List[int]:
+        # Moves the engine may choose from under the GUI rules
+        # (no castling, no en passant, promotion to queen only)
+        if not self.position or self.game_over:
+            return []
+        return [move for move in self.position.legal_moves()
+                if move_flag(move) not in (FLAG_CASTLE, FLAG_EN_PASSANT)
+                and move_promotion(move) in (0, QUEEN)]
+
+    def play_engine_move(self, move: int):
+        self.make_move(row_col(move_from(move)), row_col(move_to(move)))
+        self.selected_piece = None
+        self.valid_moves = []
+
+    def computer_move(self, searcher: Searcher, movetime: float = 1.0) -> bool:
+        # Search synchronously and play the engine's choice
+        root_moves = self.engine_root_moves()
+        if not root_moves:
+            return False
+        if len(root_moves) == 1:
+            self.play_engine_move(root_moves[0])
+            return True
+        pos = self.position.copy()
+        pos.attack_counts = None
+        result = searcher.search(pos, movetime=movetime, root_moves=root_moves)
+        self.play_engine_move(result.best_move)
+        return True
+
+    def change_turn(self):
+        self.turn = 'black' if self.turn == 'white' else 'white'
+
+    def is_in_check(self, color: str) -> bool:
+        if self.position:
+            return self.position.in_check(COLOR_NAMES.index(color))
+        king = self.white_king if color == 'white' else self.black_king
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.board[row][col]
+                if piece and piece.color != color:
+                    if (king.row, king.col) in piece.get_valid_moves(self.board):
+                        return True
+        return False
+
+    def update(self):
+        # Update king references (in case they moved)
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.board[row][col]
+                if isinstance(piece, King):
+                    if piece.color == 'white':
+                        self.white_king = piece
+                    else:
+                        self.black_king = piece
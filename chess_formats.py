@@ -0,0 +1,396 @@
+import argparse
+import mmap
+import re
+import struct
+import sys
+import time
+from typing import List, Tuple, Dict, Optional, Iterator, Iterable
+
+from chess_bitboard import (Position, START_FEN, WHITE, BLACK, NO_PIECE, PAWN, KNIGHT, BISHOP, ROOK,
+                            QUEEN, KING, FLAG_CASTLE, FLAG_EN_PASSANT, square_name, iter_bits)
+
+# Import and export of positions and games:
+#   SAN moves and PGN games (read and write)
+#   a fixed-width 32-byte binary position record, read through mmap
+
+PIECE_LETTERS = 'PNBRQK'
+SAN_PATTERN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?$')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+# SAN
+
+def move_to_san(pos: Position, move: int, legal: Optional[List[int]] = None) -> str:
+    if legal is None:
+        legal = pos.legal_moves()
+    frm = move & 63
+    to = (move >> 6) & 63
+    promotion = (move >> 12) & 7
+    ptype = pos.mailbox[frm] & 7
+    if (move >> 16) == FLAG_CASTLE:
+        san = 'O-O' if to > frm else 'O-O-O'
+    else:
+        capture = pos.mailbox[to] != NO_PIECE or (move >> 16) == FLAG_EN_PASSANT
+        if ptype == PAWN:
+            san = square_name(frm)[0] + 'x' if capture else ''
+            san += square_name(to)
+            if promotion:
+                san += '=' + PIECE_LETTERS[promotion]
+        else:
+            # Disambiguate by file, then rank, then both
+            rivals = [other & 63 for other in legal
+                      if other != move and (other >> 6) & 63 == to and pos.mailbox[other & 63] & 7 == ptype]
+            prefix = ''
+            if rivals:
+                if all((r & 7) != (frm & 7) for r in rivals):
+                    prefix = square_name(frm)[0]
+                elif all((r >> 3) != (frm >> 3) for r in rivals):
+                    prefix = square_name(frm)[1]
+                else:
+                    prefix = square_name(frm)
+            san = PIECE_LETTERS[ptype] + prefix + ('x' if capture else '') + square_name(to)
+    pos.make_move(move)
+    if pos.in_check():
+        san += '#' if not pos.legal_moves() else '+'
+    pos.unmake_move()
+    return san
+
+
+def san_to_move(pos: Position, san: str) -> int:
+    text = san.rstrip('+#!?')
+    legal = pos.legal_moves()
+    if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        long_side = text.count('O') + text.count('0') == 3
+        for move in legal:
+            if (move >> 16) == FLAG_CASTLE and ((((move >> 6) & 63) < (move & 63)) == long_side):
+                return move
+        raise ValueError(f"Illegal move: {san}")
+    match = SAN_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid SAN: {san}")
+    piece, from_file, from_rank, _, target, promotion = match.groups()
+    ptype = PIECE_LETTERS.index(piece) if piece else PAWN
+    to = (int(target[1]) - 1) * 8 + 'abcdefgh'.index(target[0])
+    promo = PIECE_LETTERS.index(promotion) if promotion else 0
+    candidates = []
+    for move in legal:
+        frm = move & 63
+        if ((move >> 6) & 63 != to or pos.mailbox[frm] & 7 != ptype
+                or (move >> 12) & 7 != promo or (move >> 16) == FLAG_CASTLE):
+            continue
+        if from_file and 'abcdefgh'[frm & 7] != from_file:
+            continue
+        if from_rank and str((frm >> 3) + 1) != from_rank:
+            continue
+        candidates.append(move)
+    if len(candidates) != 1:
+        raise ValueError(f"{'Ambiguous' if candidates else 'Illegal'} move: {san}")
+    return candidates[0]
+
+
+# PGN
+
+class PgnGame:
+    def __init__(self, tags: Optional[Dict[str, str]] = None, moves: Optional[List[int]] = None,
+                 start_fen: str = START_FEN):
+        self.tags = tags if tags is not None else {}
+        self.moves = moves if moves is not None else []
+        self.start_fen = start_fen
+
+    def positions(self) -> Iterator[Position]:
+        # Yields the position before each move and the final position, reusing one Position
+        pos = Position.from_fen(self.start_fen)
+        yield pos
+        for move in self.moves:
+            pos.make_move(move)
+            yield pos
+
+    def final_position(self) -> Position:
+        pos = Position.from_fen(self.start_fen)
+        for move in self.moves:
+            pos.make_move(move)
+        return pos
+
+
+def _movetext_tokens(text: str) -> Iterator[str]:
+    # Strip comments, variations and NAGs, then split into SAN tokens
+    text = re.sub(r'\{[^}]*\}|;[^\n]*', ' ', text)
+    while '(' in text:
+        stripped = re.sub(r'\([^()]*\)', ' ', text)
+        if stripped == text:
+            break
+        text = stripped
+    for token in text.split():
+        token = re.sub(r'^\d+\.+', '', token)
+        if token and not token.startswith('$') and token not in RESULTS:
+            yield token
+
+
+def read_pgn(lines: Iterable[str]) -> Iterator[PgnGame]:
+    tags = {}
+    movetext = []
+
+    def finish():
+        start_fen = tags.get('FEN', START_FEN)
+        pos = Position.from_fen(start_fen)
+        moves = []
+        for token in _movetext_tokens('\n'.join(movetext)):
+            move = san_to_move(pos, token)
+            pos.make_move(move)
+            moves.append(move)
+        return PgnGame(dict(tags), moves, start_fen)
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            if movetext:
+                yield finish()
+                tags.clear()
+                movetext.clear()
+            match = re.match(r'\[(\w+)\s+"(.*)"\]', line)
+            if match:
+                tags[match.group(1)] = match.group(2)
+        elif line and not line.startswith('%'):
+            movetext.append(line)
+    if movetext or tags:
+        yield finish()
+
+
+def write_pgn(game: PgnGame) -> str:
+    # Seven tag roster first, in its standard order
+    tags = {name: game.tags.get(name, default)
+            for name, default in (('Event', '?'), ('Site', '?'), ('Date', '????.??.??'), ('Round', '?'),
+                                  ('White', '?'), ('Black', '?'), ('Result', '*'))}
+    tags.update(game.tags)
+    if game.start_fen != START_FEN:
+        tags['SetUp'] = '1'
+        tags['FEN'] = game.start_fen
+    lines = [f'[{name} "{value}"]' for name, value in tags.items()]
+
+    pos = Position.from_fen(game.start_fen)
+    tokens = []
+    for i, move in enumerate(game.moves):
+        if pos.side == WHITE:
+            tokens.append(f"{pos.fullmove}.")
+        elif i == 0:
+            tokens.append(f"{pos.fullmove}...")
+        tokens.append(move_to_san(pos, move))
+        pos.make_move(move)
+    tokens.append(tags['Result'])
+
+    # Wrap movetext at 80 columns
+    text_lines = []
+    current = ''
+    for token in tokens:
+        if current and len(current) + 1 + len(token) > 80:
+            text_lines.append(current)
+            current = token
+        else:
+            current = f"{current} {token}" if current else token
+    text_lines.append(current)
+    return '\n'.join(lines) + '\n\n' + '\n'.join(text_lines) + '\n'
+
+
+def game_to_pgn(game, tags: Optional[Dict[str, str]] = None) -> str:
+    # Export a chess_core.ChessGame from the moves recorded by its position
+    moves = [record[0] for record in game.position.history]
+    tags = dict(tags or {})
+    if game.game_over and 'Result' not in tags:
+        tags['Result'] = '1-0' if game.winner == 'white' else '0-1'
+    return write_pgn(PgnGame(tags, moves, game.start_fen))
+
+
+# Binary positions: occupancy bitboard, then one nibble per occupied square in
+# ascending square order (color << 3 | piece type), then the game state.
+#   Q occupancy | 16s nibbles | B side + castling << 1 | B en passant (255: none)
+#   | H halfmove | H fullmove | 2x padding            = 32 bytes
+
+RECORD = struct.Struct('<Q16sBBHH2x')
+RECORD_SIZE = RECORD.size
+
+
+def pack_position(pos: Position) -> bytes:
+    nibbles = bytearray(16)
+    for i, sq in enumerate(iter_bits(pos.all)):
+        if i >= 32:
+            raise ValueError("More than 32 pieces cannot be packed")
+        nibbles[i >> 1] |= pos.mailbox[sq] << ((i & 1) * 4)
+    return RECORD.pack(pos.all, bytes(nibbles), pos.side | (pos.castling << 1),
+                       pos.ep_square if pos.ep_square >= 0 else 255, pos.halfmove, pos.fullmove)
+
+
+def unpack_position(buffer, offset: int = 0) -> Position:
+    occupancy, nibbles, flags, ep, halfmove, fullmove = RECORD.unpack_from(buffer, offset)
+    pos = Position()
+    pieces = pos.pieces
+    mailbox = pos.mailbox
+    i = 0
+    while occupancy:
+        low = occupancy & -occupancy
+        occupancy ^= low
+        sq = low.bit_length() - 1
+        piece = (nibbles[i >> 1] >> ((i & 1) * 4)) & 15
+        pieces[piece >> 3][piece & 7] |= low
+        mailbox[sq] = piece
+        i += 1
+    pos.occupied = [pieces[WHITE][0] | pieces[WHITE][1] | pieces[WHITE][2] | pieces[WHITE][3]
+                    | pieces[WHITE][4] | pieces[WHITE][5],
+                    pieces[BLACK][0] | pieces[BLACK][1] | pieces[BLACK][2] | pieces[BLACK][3]
+                    | pieces[BLACK][4] | pieces[BLACK][5]]
+    pos.all = pos.occupied[0] | pos.occupied[1]
+    pos.side = flags & 1
+    pos.castling = flags >> 1
+    pos.ep_square = -1 if ep == 255 else ep
+    pos.halfmove = halfmove
+    pos.fullmove = fullmove
+    pos.hash = pos.compute_hash()
+    return pos
+
+
+# FEN text straight from a record, for streaming large files without building
+# a Position per record: letters indexed by the record's piece nibble, and the
+# castling field for each set of rights
+NIBBLE_LETTERS = 'PNBRQK??pnbrqk??'
+CASTLING_TEXT = [''.join(char for char, right in zip('KQkq', (1, 2, 4, 8)) if rights & right) or '-'
+                 for rights in range(16)]
+EP_TEXT = {sq: square_name(sq) for sq in range(64)}
+EP_TEXT[255] = '-'
+
+
+def record_fen(buffer, offset: int = 0) -> str:
+    occupancy, nibbles, flags, ep, halfmove, fullmove = RECORD.unpack_from(buffer, offset)
+    board = ['1'] * 64
+    i = 0
+    while occupancy:
+        low = occupancy & -occupancy
+        occupancy ^= low
+        board[low.bit_length() - 1] = NIBBLE_LETTERS[(nibbles[i >> 1] >> ((i & 1) * 4)) & 15]
+        i += 1
+    ranks = []
+    for start in range(56, -1, -8):
+        text = ''.join(board[start:start + 8])
+        for run in ('11111111', '1111111', '111111', '11111', '1111', '111', '11'):
+            if run in text:
+                text = text.replace(run, str(len(run)))
+        ranks.append(text)
+    return f"{'/'.join(ranks)} {'wb'[flags & 1]} {CASTLING_TEXT[flags >> 1]} {EP_TEXT[ep]} {halfmove} {fullmove}"
+
+
+def write_positions(path: str, positions: Iterable[Position], append: bool = False) -> int:
+    count = 0
+    with open(path, 'ab' if append else 'wb') as f:
+        for pos in positions:
+            f.write(pack_position(pos))
+            count += 1
+    return count
+
+
+class PositionFile:
+    # Random access to a file of packed positions through a read-only mmap
+
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        size = self.file.seek(0, 2)
+        if size % RECORD_SIZE:
+            self.file.close()
+            raise ValueError(f"{path} is not a whole number of {RECORD_SIZE}-byte records")
+        self.count = size // RECORD_SIZE
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> Position:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return unpack_position(self.map, index * RECORD_SIZE)
+
+    def __iter__(self) -> Iterator[Position]:
+        data = self.map
+        for offset in range(0, self.count * RECORD_SIZE, RECORD_SIZE):
+            yield unpack_position(data, offset)
+
+    def records(self) -> Iterator[bytes]:
+        # The raw 32-byte records, e.g. to copy or send on unchanged
+        data = self.map
+        for offset in range(0, self.count * RECORD_SIZE, RECORD_SIZE):
+            yield data[offset:offset + RECORD_SIZE]
+
+    def fens(self) -> Iterator[str]:
+        # FEN of every record without building Positions
+        data = self.map
+        for offset in range(0, self.count * RECORD_SIZE, RECORD_SIZE):
+            yield record_fen(data, offset)
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_positions(path: str) -> Iterator[Position]:
+    # Positions from a FEN list, a PGN file (every position of every game)
+    # or a packed binary file, chosen by extension
+    if path.endswith('.bin'):
+        with PositionFile(path) as positions:
+            yield from positions
+    elif path.endswith('.pgn'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for game in read_pgn(f):
+                for pos in game.positions():
+                    yield pos.copy()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield Position.from_fen(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert and stream chess positions')
+    sub = parser.add_subparsers(dest='command', required=True)
+    convert = sub.add_parser('convert', help='FEN/PGN/binary to packed binary or FEN')
+    convert.add_argument('input')
+    convert.add_argument('output', help='.bin for packed records, anything else for FEN lines')
+    stream = sub.add_parser('stream', help='run the move generator over every position')
+    stream.add_argument('input')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'convert':
+        if args.output.endswith('.bin'):
+            count = write_positions(args.output, read_positions(args.input))
+        else:
+            count = 0
+            with open(args.output, 'w', encoding='utf-8') as f:
+                if args.input.endswith('.bin'):
+                    with PositionFile(args.input) as positions:
+                        for fen in positions.fens():
+                            f.write(fen + '\n')
+                            count += 1
+                else:
+                    for pos in read_positions(args.input):
+                        f.write(pos.fen() + '\n')
+                        count += 1
+        print(f"{count} positions written in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    else:
+        count = moves = 0
+        for pos in read_positions(args.input):
+            moves += len(pos.legal_moves())
+            count += 1
+        elapsed = time.perf_counter() - start
+        print(f"{count} positions, {moves} legal moves in {elapsed:.2f}s "
+              f"({count / max(elapsed, 1e-9):.0f} positions/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from multiprocessing import shared_memory
+from typing import List, Tuple, Optional, Iterator
+
+from chess_bitboard import Position, START_FEN, move_to_uci
+from chess_core import ChessGame
+from chess_formats import PositionFile, read_pgn
+from chess_search import MATE_BOUND, Searcher, SearchResult
+from chess_tt import TranspositionTable
+
+# Multi-process analysis. Positions travel between processes as FEN strings,
+# never as pickled Piece objects, and every worker keeps its own Searcher.
+#   batch: whole positions from a file spread over a process pool
+#   split: the root moves of one position divided between workers
+#   smp:   lazy SMP, all workers search one position through a shared-memory TT
+# EngineWorker runs the game's computer opponent in a background process.
+
+_searcher: Optional[Searcher] = None
+
+
+def _init_worker(tt_mb: float):
+    global _searcher
+    _searcher = Searcher(tt_mb=tt_mb)
+
+
+def _analyse(task: Tuple[int, str, int, Optional[float]]) -> Tuple[int, str, str, str, int, int, float]:
+    index, fen, depth, movetime = task
+    pos = Position.from_fen(fen)
+    result = _searcher.search(pos, depth, movetime)
+    best = move_to_uci(result.best_move) if result.best_move else '-'
+    return index, fen, best, result.score_text(), result.depth, result.nodes, result.elapsed
+
+
+def read_fens(path: str) -> Iterator[str]:
+    # FEN lines, or the final position of each game in a .pgn, or every record of a packed .bin
+    if path.endswith('.pgn'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for game in read_pgn(f):
+                yield game.final_position().fen()
+    elif path.endswith('.bin'):
+        with PositionFile(path) as positions:
+            yield from positions.fens()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+
+
+def analyse_batch(fens: List[str], workers: int, depth: int, movetime: Optional[float],
+                  tt_mb: float = 16, output=sys.stdout) -> Tuple[int, int, float]:
+    # Results are written in input order as soon as they are available
+    start = time.perf_counter()
+    tasks = [(i, fen, depth, movetime) for i, fen in enumerate(fens)]
+    total_nodes = 0
+    with multiprocessing.Pool(workers, _init_worker, (tt_mb,)) as pool:
+        for index, fen, best, score, reached, nodes, elapsed in pool.imap(_analyse, tasks, chunksize=1):
+            total_nodes += nodes
+            output.write(f"{fen}\t{best}\t{score}\tdepth {reached}\tnodes {nodes}\t{elapsed:.2f}s\n")
+            output.flush()
+    return len(tasks), total_nodes, time.perf_counter() - start
+
+
+def _search_root_moves(task: Tuple[str, List[int], int, Optional[float]]) -> Tuple[int, List[Tuple[int, List[int]]]]:
+    # The nodes searched and the score and pv of every completed depth
+    fen, moves, depth, movetime = task
+    iterations = []
+    result = _searcher.search(Position.from_fen(fen), depth, movetime, root_moves=moves,
+                              info=lambda result: iterations.append((result.score, result.pv)))
+    return result.nodes, iterations
+
+
+def split_root(fen: str, workers: int, depth: int, movetime: Optional[float] = None,
+               tt_mb: float = 16) -> SearchResult:
+    # Each worker searches a round-robin share of the root moves
+    start = time.perf_counter()
+    moves = Position.from_fen(fen).legal_moves()
+    shares = [moves[i::workers] for i in range(workers) if moves[i::workers]]
+    if not shares:
+        return SearchResult(0, 0, 0, 0, 0.0, [])
+    with multiprocessing.Pool(len(shares), _init_worker, (tt_mb,)) as pool:
+        results = pool.map(_search_root_moves, [(fen, share, depth, movetime) for share in shares])
+    nodes = sum(result[0] for result in results)
+    # Scores from different depths do not compare, so every share is judged
+    # at the deepest depth all of them completed. A share that stopped on a
+    # mate score has its final score at any depth.
+    searched = [iterations for _, iterations in results if iterations]
+    if not searched:
+        return SearchResult(moves[0], 0, 0, nodes, time.perf_counter() - start, [moves[0]])
+    unfinished = [len(iterations) for iterations in searched if abs(iterations[-1][0]) < MATE_BOUND]
+    reached = min(unfinished) if unfinished else max(len(iterations) for iterations in searched)
+    score, pv = max((iterations[min(reached, len(iterations)) - 1] for iterations in searched),
+                    key=lambda iteration: iteration[0])
+    return SearchResult(pv[0], score, reached, nodes, time.perf_counter() - start, pv)
+
+
+def _smp_worker(args: Tuple[str, str, int, Optional[float], int]) -> Tuple[int, int, int, List[int]]:
+    shm_name, fen, depth, movetime, worker_id = args
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        tt = TranspositionTable(buffer=shm.buf)
+        searcher = Searcher(tt=tt)
+        pos = Position.from_fen(fen)
+        root_moves = None
+        # Helpers walk the root moves in a rotated order so they fill the
+        # shared table with different subtrees than the main thread
+        moves = pos.legal_moves()
+        if worker_id and len(moves) > 1:
+            shift = worker_id % len(moves)
+            root_moves = moves[shift:] + moves[:shift]
+        try:
+            result = searcher.search(pos, depth, movetime, root_moves=root_moves)
+        finally:
+            tt.close()
+        return result.score, result.nodes, result.depth, result.pv
+    finally:
+        shm.close()
+
+
+def lazy_smp(fen: str, workers: int, depth: int, movetime: Optional[float], tt_mb: float = 64) -> SearchResult:
+    start = time.perf_counter()
+    shm = shared_memory.SharedMemory(create=True, size=TranspositionTable.bytes_for(tt_mb))
+    try:
+        shm.buf[:] = bytes(shm.size)
+        tasks = [(shm.name, fen, depth, movetime, i) for i in range(workers)]
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(_smp_worker, tasks)
+    finally:
+        shm.close()
+        shm.unlink()
+    nodes = sum(result[1] for result in results)
+    # Take the deepest completed search, the main worker winning ties
+    best = max(results, key=lambda result: result[2])
+    return SearchResult(best[3][0] if best[3] else 0, best[0], best[2], nodes,
+                        time.perf_counter() - start, best[3])
+
+
+
+_engine_searcher: Optional[Searcher] = None
+
+
+def _init_engine(tt_mb: float):
+    global _engine_searcher
+    _engine_searcher = Searcher(tt_mb=tt_mb)
+
+
+def _engine_search(fen: str, movetime: float, root_moves: List[int]) -> int:
+    pos = Position.from_fen(fen)
+    return _engine_searcher.search(pos, movetime=movetime, root_moves=root_moves).best_move
+
+
+class EngineWorker:
+    # Runs engine searches in a separate process so an event loop never blocks.
+    # Positions are sent as FEN and the chosen move comes back as an int.
+
+    def __init__(self, movetime: float = 1.0, tt_mb: float = 16):
+        self.movetime = movetime
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_engine, initargs=(tt_mb,))
+        self.future: Optional[Future] = None
+        self.searched = None
+
+    @property
+    def busy(self) -> bool:
+        return self.future is not None
+
+    def start(self, game: ChessGame) -> bool:
+        root_moves = game.engine_root_moves()
+        if self.busy or not root_moves:
+            return False
+        if len(root_moves) == 1:
+            # Nothing to search; play it on the next poll
+            self.searched = (game, game.position.hash)
+            self.future = Future()
+            self.future.set_result(root_moves[0])
+            return True
+        self.searched = (game, game.position.hash)
+        self.future = self.executor.submit(_engine_search, game.position.fen(), self.movetime, root_moves)
+        return True
+
+    def poll(self, game: ChessGame) -> bool:
+        # Play the finished search's move; True when the board changed
+        if self.future is None or not self.future.done():
+            return False
+        move = self.future.result()
+        self.future = None
+        # Drop the result if the game moved on (undo, restart) meanwhile
+        if self.searched != (game, game.position.hash) or not move:
+            return False
+        game.play_engine_move(move)
+        return True
+
+    def shutdown(self):
+        if self.future is not None:
+            self.future.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel chess analysis')
+    parser.add_argument('mode', choices=['batch', 'split', 'smp'])
+    parser.add_argument('input', nargs='?', help='FEN, PGN or packed .bin file for batch mode')
+    parser.add_argument('--fen', default=START_FEN)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--depth', type=int, default=64)
+    parser.add_argument('--movetime', type=float, default=None, help='seconds per position')
+    parser.add_argument('--hash', type=float, default=16, help='transposition table size in MB')
+    parser.add_argument('--output', help='write batch results here instead of stdout')
+    args = parser.parse_args()
+    if args.depth == 64 and args.movetime is None:
+        args.movetime = 1.0
+
+    if args.mode == 'batch':
+        if not args.input:
+            parser.error('batch mode needs an input file')
+        fens = list(read_fens(args.input))
+        output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            count, nodes, elapsed = analyse_batch(fens, args.workers, args.depth, args.movetime,
+                                                  args.hash, output)
+        finally:
+            if args.output:
+                output.close()
+        print(f"{count} positions in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.2f} positions/s, "
+              f"{nodes / max(elapsed, 1e-9):.0f} nps, {args.workers} workers)", file=sys.stderr)
+        return
+
+    if args.mode == 'split':
+        result = split_root(args.fen, args.workers, args.depth, args.movetime, args.hash)
+    else:
+        result = lazy_smp(args.fen, args.workers, args.depth, args.movetime, args.hash)
+    print(result)
+    print(f"bestmove {move_to_uci(result.best_move) if result.best_move else '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import sys
+import time
+from typing import List, Tuple, Dict
+
+import chess_core
+
+from chess_bitboard import (Position, START_FEN, PIECE_CLASS_NAMES, COLOR_NAMES,
+                            PAWN, WHITE, iter_bits, row_col, move_to_uci)
+
+# Headless perft driver: counts leaf nodes of the legal move tree to verify the
+# move generator against published tables and to benchmark its throughput.
+
+# Published perft results (chessprogramming.org "Perft Results")
+PERFT_SUITE: List[Tuple[str, str, List[int]]] = [
+    ('startpos', START_FEN,
+     [20, 400, 8902, 197281, 4865609, 119060324]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603, 193690690]),
+    ('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624, 11030083]),
+    ('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333, 15833292]),
+    ('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487, 89941194]),
+    ('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594, 164075551]),
+]
+
+
+def perft(pos: Position, depth: int) -> int:
+    moves = pos.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        pos.make_move(move)
+        nodes += perft(pos, depth - 1)
+        pos.unmake_move()
+    return nodes
+
+
+def divide(pos: Position, depth: int) -> Dict[str, int]:
+    # Leaf counts split by root move, for bisecting a wrong total
+    counts = {}
+    for move in pos.legal_moves():
+        pos.make_move(move)
+        counts[move_to_uci(move)] = perft(pos, depth - 1)
+        pos.unmake_move()
+    return counts
+
+
+def timed_perft(pos: Position, depth: int) -> Tuple[int, float]:
+    start = time.perf_counter()
+    nodes = perft(pos, depth)
+    return nodes, time.perf_counter() - start
+
+
+def load_piece_classes():
+    return {name: getattr(chess_core, name) for name in PIECE_CLASS_NAMES}
+
+
+def check_piece_classes(pos: Position, depth: int, classes) -> int:
+    # Compare Piece.get_valid_moves with Position.legacy_moves at every node
+    board = [[None] * 8 for _ in range(8)]
+    for sq in iter_bits(pos.all):
+        piece = pos.mailbox[sq]
+        row, col = row_col(sq)
+        obj = classes[PIECE_CLASS_NAMES[piece & 7]](COLOR_NAMES[piece >> 3], row, col)
+        if (piece & 7) == PAWN:
+            obj.has_moved = row != (6 if piece >> 3 == WHITE else 1)
+        board[row][col] = obj
+    mismatches = 0
+    for sq in iter_bits(pos.all):
+        row, col = row_col(sq)
+        expected = sorted(board[row][col].get_valid_moves(board))
+        if sorted(pos.legacy_moves(sq)) != expected:
+            print(f"mismatch at {pos.fen()} square {row, col}: {expected} != {sorted(pos.legacy_moves(sq))}")
+            mismatches += 1
+    if depth > 1:
+        for move in pos.legal_moves():
+            pos.make_move(move)
+            mismatches += check_piece_classes(pos, depth - 1, classes)
+            pos.unmake_move()
+    return mismatches
+
+
+def run_suite(max_depth: int, max_nodes: int) -> bool:
+    ok = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected in PERFT_SUITE:
+        for depth, count in enumerate(expected, 1):
+            if depth > max_depth or count > max_nodes:
+                break
+            nodes, elapsed = timed_perft(Position.from_fen(fen), depth)
+            total_nodes += nodes
+            total_time += elapsed
+            status = 'ok' if nodes == count else f'FAIL (expected {count})'
+            print(f"{name:10} depth {depth}: {nodes:>10} nodes {elapsed:8.2f}s "
+                  f"{nodes / max(elapsed, 1e-9):>10.0f} nps  {status}")
+            ok = ok and nodes == count
+    print(f"total: {total_nodes} nodes in {total_time:.2f}s "
+          f"({total_nodes / max(total_time, 1e-9):.0f} nps)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perft driver for the bitboard move generator')
+    parser.add_argument('depth', type=int, nargs='?', default=4)
+    parser.add_argument('--fen', default=START_FEN)
+    parser.add_argument('--divide', action='store_true', help='print leaf counts per root move')
+    parser.add_argument('--suite', action='store_true', help='check the published perft tables')
+    parser.add_argument('--max-nodes', type=int, default=1000000,
+                        help='skip suite entries above this many leaf nodes')
+    parser.add_argument('--legacy', action='store_true',
+                        help='also compare the Piece classes with the bitboard moves')
+    args = parser.parse_args()
+
+    if args.suite:
+        sys.exit(0 if run_suite(args.depth, args.max_nodes) else 1)
+
+    pos = Position.from_fen(args.fen)
+    if args.legacy:
+        mismatches = check_piece_classes(pos, args.depth, load_piece_classes())
+        print(f"piece class mismatches: {mismatches}")
+        sys.exit(1 if mismatches else 0)
+    if args.divide:
+        start = time.perf_counter()
+        counts = divide(pos, args.depth)
+        elapsed = time.perf_counter() - start
+        for move, count in sorted(counts.items()):
+            print(f"{move}: {count}")
+        nodes = sum(counts.values())
+    else:
+        nodes, elapsed = timed_perft(pos, args.depth)
+    print(f"nodes {nodes} time {elapsed:.2f}s nps {nodes / max(elapsed, 1e-9):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+import argparse
+import time
+from typing import List, Optional, Callable
+
+from chess_bitboard import (Position, START_FEN, WHITE, NO_PIECE, PAWN, FLAG_EN_PASSANT,
+                            iter_bits, move_to_uci)
+from chess_tt import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
+
+# Alpha-beta search on top of the bitboard move generator: negamax with a
+# transposition table, iterative deepening, quiescence search and move
+# ordering by TT move, MVV-LVA, killer moves and the history heuristic.
+
+MAX_PLY = 64
+INFINITY = 32000
+MATE = 31000
+MATE_BOUND = MATE - MAX_PLY
+
+PIECE_VALUES = [100, 320, 330, 500, 900, 20000]
+
+# Piece-square tables from white's point of view, a8 first
+# (simplified evaluation function, Tomasz Michniewski)
+PAWN_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+ROOK_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+]
+QUEEN_TABLE = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+]
+KING_TABLE = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+]
+
+
+def _piece_square_values() -> List[int]:
+    # PIECE_SQUARE[piece code * 64 + sq]: material plus placement, signed for white
+    tables = [PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_TABLE]
+    values = [0] * (16 * 64)
+    for ptype, table in enumerate(tables):
+        for sq in range(64):
+            values[ptype * 64 + sq] = PIECE_VALUES[ptype] + table[sq ^ 56]
+            values[(8 | ptype) * 64 + sq] = -(PIECE_VALUES[ptype] + table[sq])
+    return values
+
+
+PIECE_SQUARE = _piece_square_values()
+
+
+def evaluate(pos: Position) -> int:
+    # Static score in centipawns from the side to move's point of view
+    mailbox = pos.mailbox
+    score = 0
+    for sq in iter_bits(pos.all):
+        score += PIECE_SQUARE[(mailbox[sq] << 6) | sq]
+    return score if pos.side == WHITE else -score
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchResult:
+    def __init__(self, best_move: int, score: int, depth: int, nodes: int,
+                 elapsed: float, pv: List[int]):
+        self.best_move = best_move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.pv = pv
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / max(self.elapsed, 1e-9)
+
+    def score_text(self) -> str:
+        if abs(self.score) >= MATE_BOUND:
+            plies = MATE - abs(self.score)
+            return f"mate {(plies + 1) // 2 if self.score > 0 else -((plies + 1) // 2)}"
+        return f"cp {self.score}"
+
+    def __str__(self) -> str:
+        return (f"depth {self.depth} score {self.score_text()} nodes {self.nodes} "
+                f"nps {self.nps:.0f} time {self.elapsed:.2f}s pv {' '.join(move_to_uci(m) for m in self.pv)}")
+
+
+class Searcher:
+    def __init__(self, tt: Optional[TranspositionTable] = None, tt_mb: float = 16):
+        self.tt = tt if tt is not None else TranspositionTable(tt_mb)
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * 4096, [0] * 4096]  # [color][from * 64 + to]
+        self.nodes = 0
+        self.deadline = None
+        self.stop_requested = False
+
+    def stop(self):
+        # Ask a running search (e.g. in another thread) to return early
+        self.stop_requested = True
+
+    def search(self, pos: Position, max_depth: int = MAX_PLY, movetime: Optional[float] = None,
+               root_moves: Optional[List[int]] = None,
+               info: Optional[Callable[[SearchResult], None]] = None) -> SearchResult:
+        start = time.perf_counter()
+        self.deadline = start + movetime if movetime else None
+        self.stop_requested = False
+        self.nodes = 0
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        for table in self.history:
+            for i in range(4096):
+                table[i] >>= 3
+        self.tt.new_search()
+
+        moves = pos.legal_moves()
+        if root_moves is not None:
+            # Searched in the caller's order. A restricted search is one part
+            # of a wider root, so a single move there is no forced reply.
+            legal = set(moves)
+            moves = [move for move in root_moves if move in legal]
+        if not moves:
+            score = -MATE if pos.in_check() else 0
+            return SearchResult(0, score, 0, 0, 0.0, [])
+
+        result = SearchResult(moves[0], 0, 0, 0, 0.0, [moves[0]])
+        history_length = len(pos.history)
+        for depth in range(1, max_depth + 1):
+            try:
+                score, pv = self._root(pos, moves, depth)
+            except SearchTimeout:
+                while len(pos.history) > history_length:
+                    pos.unmake_move()
+                break
+            elapsed = time.perf_counter() - start
+            result = SearchResult(pv[0], score, depth, self.nodes, elapsed, pv)
+            if info:
+                info(result)
+            # Search the previous best move first on the next iteration
+            moves.remove(pv[0])
+            moves.insert(0, pv[0])
+            if abs(score) >= MATE_BOUND or (len(moves) == 1 and root_moves is None):
+                break
+            if self.deadline and time.perf_counter() + elapsed * 2 > self.deadline:
+                break
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _check_time(self):
+        if self.stop_requested or (self.deadline and time.perf_counter() >= self.deadline):
+            raise SearchTimeout()
+
+    def _root(self, pos: Position, moves: List[int], depth: int):
+        alpha, beta = -INFINITY, INFINITY
+        best_pv = [moves[0]]
+        for move in moves:
+            pos.make_move(move)
+            score, pv = self._negamax(pos, depth - 1, -beta, -alpha, 1)
+            score = -score
+            pos.unmake_move()
+            if score > alpha:
+                alpha = score
+                best_pv = [move] + pv
+        self.tt.store(pos.hash, best_pv[0], alpha, depth, BOUND_EXACT)
+        return alpha, best_pv
+
+    def _is_repetition(self, pos: Position) -> bool:
+        history = pos.history
+        key = pos.hash
+        stop = max(len(history) - pos.halfmove, 0)
+        for i in range(len(history) - 2, stop - 1, -2):
+            if history[i][5] == key:
+                return True
+        return False
+
+    def _order(self, pos: Position, moves: List[int], tt_move: int, ply: int) -> List[int]:
+        mailbox = pos.mailbox
+        killers = self.killers[ply]
+        history = self.history[pos.side]
+
+        def score(move):
+            if move == tt_move:
+                return 1 << 30
+            victim = mailbox[(move >> 6) & 63]
+            if victim != NO_PIECE or (move >> 16) == FLAG_EN_PASSANT:
+                # MVV-LVA: most valuable victim, then least valuable attacker
+                victim_type = PAWN if victim == NO_PIECE else victim & 7
+                return (1 << 28) + victim_type * 8 - (mailbox[move & 63] & 7)
+            if (move >> 12) & 7:
+                return (1 << 27) + ((move >> 12) & 7)
+            if move == killers[0]:
+                return 1 << 26
+            if move == killers[1]:
+                return (1 << 26) - 1
+            return history[move & 4095]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def _negamax(self, pos: Position, depth: int, alpha: int, beta: int, ply: int):
+        self.nodes += 1
+        if not self.nodes & 255:
+            self._check_time()
+        if pos.halfmove >= 100 or self._is_repetition(pos):
+            return 0, []
+        if ply >= MAX_PLY:
+            return evaluate(pos), []
+
+        in_check = pos.in_check()
+        if in_check:
+            depth += 1
+        if depth <= 0:
+            return self._quiesce(pos, alpha, beta, ply), []
+
+        key = pos.hash
+        tt_move = 0
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_move, tt_score, tt_depth, bound = entry
+            if tt_depth >= depth:
+                if tt_score >= MATE_BOUND:
+                    tt_score -= ply
+                elif tt_score <= -MATE_BOUND:
+                    tt_score += ply
+                if (bound == BOUND_EXACT or (bound == BOUND_LOWER and tt_score >= beta)
+                        or (bound == BOUND_UPPER and tt_score <= alpha)):
+                    return tt_score, [tt_move] if tt_move else []
+
+        moves = pos.legal_moves()
+        if not moves:
+            return (-MATE + ply if in_check else 0), []
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        best_pv = []
+        mailbox = pos.mailbox
+        for move in self._order(pos, moves, tt_move, ply):
+            pos.make_move(move)
+            score, pv = self._negamax(pos, depth - 1, -beta, -alpha, ply + 1)
+            score = -score
+            pos.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                best_pv = [move] + pv
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if mailbox[(move >> 6) & 63] == NO_PIECE and not (move >> 12) & 7:
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self.history[pos.side][move & 4095] += depth * depth
+                        break
+
+        if best_score >= beta:
+            bound = BOUND_LOWER
+        elif best_score > original_alpha:
+            bound = BOUND_EXACT
+        else:
+            bound = BOUND_UPPER
+        stored = best_score
+        if stored >= MATE_BOUND:
+            stored += ply
+        elif stored <= -MATE_BOUND:
+            stored -= ply
+        self.tt.store(key, best_move, stored, depth, bound)
+        return best_score, best_pv
+
+    def _quiesce(self, pos: Position, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if not self.nodes & 255:
+            self._check_time()
+        if ply >= MAX_PLY:
+            return evaluate(pos)
+
+        if pos.in_check():
+            # Every evasion is searched; no stand pat while in check
+            moves = pos.legal_moves()
+            if not moves:
+                return -MATE + ply
+            best = -INFINITY
+        else:
+            best = evaluate(pos)
+            if best >= beta:
+                return best
+            if best > alpha:
+                alpha = best
+            moves = pos.legal_moves(captures_only=True)
+
+        for move in self._order(pos, moves, 0, ply):
+            pos.make_move(move)
+            score = -self._quiesce(pos, -beta, -alpha, ply + 1)
+            pos.unmake_move()
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyse a chess position')
+    parser.add_argument('--fen', default=START_FEN)
+    parser.add_argument('--movetime', type=float, default=5.0, help='seconds per move')
+    parser.add_argument('--depth', type=int, default=MAX_PLY)
+    parser.add_argument('--hash', type=float, default=16, help='transposition table size in MB')
+    args = parser.parse_args()
+
+    searcher = Searcher(tt_mb=args.hash)
+    result = searcher.search(Position.from_fen(args.fen), args.depth, args.movetime, info=print)
+    print(f"bestmove {move_to_uci(result.best_move)} nodes {result.nodes} nps {result.nps:.0f}")
+
+
+if __name__ == "__main__":
+    main()
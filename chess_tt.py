@@ -0,0 +1,132 @@
+from collections import OrderedDict
+from typing import List, Tuple, Optional
+
+from chess_bitboard import Position
+
+# Transposition table and move-list cache keyed by Position.hash
+
+# Bound types stored with a score
+BOUND_NONE, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER = 0, 1, 2, 3
+
+ENTRY_BYTES = 16  # one 64-bit key word and one 64-bit data word
+SCORE_OFFSET = 1 << 15
+MAX_AGE = 63
+
+
+def pack_entry(move: int, score: int, depth: int, bound: int, age: int) -> int:
+    # data word: move (20 bits) | score + 32768 (16) | depth (8) | bound (2) | age (6)
+    return (move | ((score + SCORE_OFFSET) << 20) | (max(depth, 0) << 36)
+            | (bound << 44) | (age << 46))
+
+
+def unpack_entry(data: int) -> Tuple[int, int, int, int]:
+    return (data & 0xFFFFF, ((data >> 20) & 0xFFFF) - SCORE_OFFSET,
+            (data >> 36) & 0xFF, (data >> 44) & 3)
+
+
+class TranspositionTable:
+    # Fixed-size, two-way bucketed table. Each slot stores key ^ data next to
+    # data, so a torn write from another process sharing the buffer reads back
+    # as a miss instead of a wrong entry.
+
+    def __init__(self, size_mb: float = 16, buffer=None):
+        if buffer is None:
+            entries = max(2, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+            buffer = bytearray(entries * ENTRY_BYTES)
+        self.buffer = buffer
+        self.words = memoryview(buffer).cast('Q')
+        self.buckets = len(self.words) // 4
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    @classmethod
+    def bytes_for(cls, size_mb: float) -> int:
+        return max(2, int(size_mb * 1024 * 1024) // ENTRY_BYTES) * ENTRY_BYTES
+
+    def close(self):
+        # Release the view so a shared memory block can be closed
+        self.words.release()
+
+    def new_search(self):
+        self.age = (self.age + 1) & MAX_AGE
+
+    def clear(self):
+        self.words.cast('B')[:] = bytes(len(self.words) * 8)
+        self.age = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        # Returns (move, score, depth, bound) or None
+        self.probes += 1
+        words = self.words
+        base = (key % self.buckets) << 2
+        for slot in (base, base + 2):
+            data = words[slot + 1]
+            if words[slot] ^ data == key and data:
+                self.hits += 1
+                return unpack_entry(data)
+        return None
+
+    def store(self, key: int, move: int, score: int, depth: int, bound: int):
+        words = self.words
+        base = (key % self.buckets) << 2
+        age = self.age
+        target = -1
+        worst = None
+        for slot in (base, base + 2):
+            data = words[slot + 1]
+            if not data or words[slot] ^ data == key:
+                target = slot
+                if data and not move:
+                    # Keep the best move from an earlier search of this position
+                    move = data & 0xFFFFF
+                break
+            # Replacement: prefer entries from old searches, then shallower ones
+            stale = ((age - (data >> 46)) & MAX_AGE) * 256
+            value = ((data >> 36) & 0xFF) - stale
+            if worst is None or value < worst:
+                worst = value
+                target = slot
+        data = pack_entry(move, score, depth, bound, age)
+        words[target] = key ^ data
+        words[target + 1] = data
+        self.stores += 1
+
+    def hashfull(self) -> int:
+        # Permille of the first 1000 slots used by the current search
+        words = self.words
+        sample = min(1000, len(words) // 2)
+        used = sum(1 for i in range(sample) if words[2 * i + 1]
+                   and (words[2 * i + 1] >> 46) == self.age)
+        return used * 1000 // max(sample, 1)
+
+
+class MoveCache:
+    # LRU cache of move lists per position, for the GUI and the search
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key, generate):
+        entries = self.entries
+        moves = entries.get(key)
+        if moves is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return moves
+        self.misses += 1
+        moves = generate()
+        entries[key] = moves
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+        return moves
+
+    def legal_moves(self, pos: Position) -> List[int]:
+        return self._lookup(pos.hash, pos.legal_moves)
+
+    def legacy_moves(self, pos: Position, sq: int) -> List[Tuple[int, int]]:
+        return self._lookup((pos.hash, sq), lambda: pos.legacy_moves(sq))
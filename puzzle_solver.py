@@ -0,0 +1,826 @@
+import argparse
+import heapq
+import mmap
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import List, Tuple, Dict, Optional, Sequence
+
+# Sliding puzzle solvers for any M x N board, importable without pygame.
+# Boards are flat lists (row-major, 0 is the blank, goal has the blank last).
+#   optimal:   IDA* with Manhattan distance + linear conflict, and for the 4x4
+#              board additive pattern databases memory-mapped from disk
+#   weighted:  A* with an inflated heuristic, bounded-suboptimal
+#   reduction: solve the outer row or column and shrink, for large boards
+
+# Constants
+SIZE = 4
+FOUND = -1
+UNSEEN = 255
+OPTIMAL_NODE_LIMIT = 500000  # about three seconds of IDA* in pure Python
+
+# 5-5-5 partition of the 15 tiles. The three 16**5-entry tables track the
+# blank and take about 80s to build once; they average 42.1 on random boards
+# against 39.0 for Manhattan distance + linear conflict. A 6-6-3 partition
+# would prune more but takes far longer to build in pure Python.
+PATTERNS = ((1, 5, 6, 9, 13), (2, 3, 4, 7, 8), (10, 11, 12, 14, 15))
+PDB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'puzzle15_pdb.bin')
+
+
+# Packed states: the tile at cell c in bits 4c..4c+3, so a 4x4 board fits a
+# 64-bit integer and sliding a tile is two shifts and an xor. Larger boards
+# use wider fields (tile_bits).
+
+TILE_BITS = 4
+
+
+def tile_bits(cells: int) -> int:
+    return max(TILE_BITS, (cells - 1).bit_length())
+
+
+def pack(board: Sequence[int], bits: int = TILE_BITS) -> int:
+    state = 0
+    for cell, tile in enumerate(board):
+        state |= tile << (bits * cell)
+    return state
+
+
+def unpack(state: int, cells: int, bits: int = TILE_BITS) -> List[int]:
+    mask = (1 << bits) - 1
+    return [(state >> (bits * cell)) & mask for cell in range(cells)]
+
+
+def tile_at(state: int, cell: int, bits: int = TILE_BITS) -> int:
+    return (state >> (bits * cell)) & ((1 << bits) - 1)
+
+
+def slide(state: int, blank: int, cell: int, bits: int = TILE_BITS) -> int:
+    # Move the tile at cell into the blank; the blank's field is zero
+    tile = (state >> (bits * cell)) & ((1 << bits) - 1)
+    return state ^ (tile << (bits * cell)) ^ (tile << (bits * blank))
+
+
+def neighbours(rows: int, cols: int) -> List[Tuple[int, ...]]:
+    table = []
+    for cell in range(rows * cols):
+        row, col = divmod(cell, cols)
+        table.append(tuple(row2 * cols + col2 for row2, col2 in
+                           ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1))
+                           if 0 <= row2 < rows and 0 <= col2 < cols))
+    return table
+
+
+def goal_board(rows: int, cols: int) -> List[int]:
+    return list(range(1, rows * cols)) + [0]
+
+
+def count_inversions(tiles: Sequence[int]) -> int:
+    # Fenwick tree over tile values, O(n log n)
+    size = max(tiles, default=0) + 1
+    tree = [0] * (size + 1)
+    inversions = 0
+    for seen, tile in enumerate(tiles):
+        # Earlier tiles no greater than this one
+        i = tile + 1
+        smaller = 0
+        while i:
+            smaller += tree[i]
+            i &= i - 1
+        inversions += seen - smaller
+        i = tile + 1
+        while i <= size:
+            tree[i] += 1
+            i += i & -i
+    return inversions
+
+
+def is_solvable(board: Sequence[int], rows: int, cols: int) -> bool:
+    # Inversion parity: odd widths need an even inversion count; even widths
+    # also count the blank's row distance from the bottom
+    inversions = count_inversions([tile for tile in board if tile])
+    if cols % 2:
+        return inversions % 2 == 0
+    blank_row = board.index(0) // cols
+    return (inversions + rows - 1 - blank_row) % 2 == 0
+
+
+def random_board(rows: int = SIZE, cols: int = SIZE, rng: Optional[random.Random] = None) -> List[int]:
+    # A uniformly random solvable board: shuffle every cell, then swap two
+    # tiles if the permutation has the wrong parity
+    rng = rng or random.Random()
+    board = goal_board(rows, cols)
+    rng.shuffle(board)
+    if not is_solvable(board, rows, cols):
+        first, second = [cell for cell, tile in enumerate(board) if tile][:2]
+        board[first], board[second] = board[second], board[first]
+    return board
+
+
+def _line_conflicts(codes: Tuple[int, ...]) -> int:
+    # 2 extra moves for every tile that must leave the line so the rest are in goal order
+    members = [code for code in codes if code >= 0]
+    longest = [1] * len(members)
+    for i in range(len(members)):
+        for j in range(i):
+            if members[j] < members[i]:
+                longest[i] = max(longest[i], longest[j] + 1)
+    return 2 * (len(members) - max(longest, default=0))
+
+
+# Pattern databases
+
+def build_pattern_db(pattern: Sequence[int], rows: int = SIZE, cols: int = SIZE) -> bytearray:
+    # Breadth-first search back from the goal over placements of the pattern
+    # tiles and the region of free cells the blank is in. Moving the blank
+    # through the region is free and each move of a pattern tile costs 1, so
+    # the tables of a partition add up to an admissible heuristic. A
+    # placement stores its distance from the nearest blank region.
+    # Index: tile i's cell in bits 4i..4i+3; a state adds the region's lowest
+    # cell in 4 more bits.
+    if rows * cols > 16:
+        raise ValueError("Pattern databases index cells in 4 bits")
+    cells = rows * cols
+    full = (1 << cells) - 1
+    not_first = sum(1 << cell for cell in range(cells) if cell % cols)
+    not_last = sum(1 << cell for cell in range(cells) if cell % cols != cols - 1)
+
+    def spread(region):
+        return (((region << 1) & not_first) | ((region >> 1) & not_last)
+                | ((region << cols) & full) | (region >> cols))
+
+    def flood(region, free):
+        # Free cells connected to region
+        while True:
+            grown = (region | spread(region)) & free
+            if grown == region:
+                return region
+            region = grown
+
+    count = len(pattern)
+    dist = bytearray([UNSEEN]) * (16 ** count)
+    seen = bytearray(16 ** count * 16)
+    goal = 0
+    occupied = 0
+    for i, tile in enumerate(pattern):
+        goal |= (tile - 1) << (4 * i)
+        occupied |= 1 << (tile - 1)
+    region = flood(1 << (cells - 1), full & ~occupied)
+    start = goal << 4 | ((region & -region).bit_length() - 1)
+    seen[start] = 1
+    dist[goal] = 0
+    near = neighbours(rows, cols)
+    shifts = [4 * i for i in range(count)]
+    frontier = [start]
+    depth = 0
+    while frontier:
+        depth += 1
+        following = []
+        for key in frontier:
+            state = key >> 4
+            owner = {}
+            occupied = 0
+            for shift in shifts:
+                cell = (state >> shift) & 15
+                owner[cell] = shift
+                occupied |= 1 << cell
+            free = full & ~occupied
+            region = flood(1 << (key & 15), free)
+            # Pattern tiles next to the blank's region slide into it, leaving
+            # the blank on their old cell
+            edge = spread(region) & occupied
+            while edge:
+                low = edge & -edge
+                edge ^= low
+                cell = low.bit_length() - 1
+                shift = owner[cell]
+                for target in near[cell]:
+                    if (region >> target) & 1:
+                        child = state + ((target - cell) << shift)
+                        child_region = flood(low, free ^ low ^ (1 << target))
+                        child_key = child << 4 | ((child_region & -child_region).bit_length() - 1)
+                        if not seen[child_key]:
+                            seen[child_key] = 1
+                            following.append(child_key)
+                            if dist[child] == UNSEEN:
+                                dist[child] = depth
+        frontier = following
+    return dist
+
+
+def build_pattern_dbs(path: str = PDB_PATH, patterns=PATTERNS, verbose: bool = False):
+    with open(path + '.tmp', 'wb') as f:
+        for pattern in patterns:
+            start = time.perf_counter()
+            f.write(build_pattern_db(pattern))
+            if verbose:
+                print(f"pattern {pattern}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    os.replace(path + '.tmp', path)
+
+
+def pattern_db_ready(path: str = PDB_PATH, patterns=PATTERNS) -> bool:
+    # Whether the tables of this partition are on disk
+    return os.path.exists(path) and os.path.getsize(path) == sum(16 ** len(pattern) for pattern in patterns)
+
+
+class PatternDatabase:
+    # The tables of one partition in a single file, read through a read-only
+    # mmap so several processes share the pages
+
+    def __init__(self, path: str = PDB_PATH, patterns=PATTERNS, build: bool = True):
+        self.patterns = patterns
+        self.table_size = [16 ** len(pattern) for pattern in patterns]
+        if not pattern_db_ready(path, patterns):
+            # A missing table, or one written for another partition
+            if not build:
+                raise FileNotFoundError(path)
+            build_pattern_dbs(path, patterns, verbose=True)
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = []
+        base = 0
+        for size in self.table_size:
+            self.offsets.append(base)
+            base += size
+        # The goal is symmetric about the main diagonal, so the transposed board
+        # is a second lookup into the same tables. Tile t at cell c reads as
+        # tile mirror(t) at transpose(c) there.
+        self.transpose = [(cell % SIZE) * SIZE + cell // SIZE for cell in range(SIZE * SIZE)]
+        slot = {}
+        for p, pattern in enumerate(patterns):
+            for i, tile in enumerate(pattern):
+                slot[tile] = (p, 4 * i)
+        # slots[tile]: (entry, shift, mirrored entry, mirrored shift); entries
+        # 0..n-1 index the board's tables and n..2n-1 the transposed board's
+        count = len(patterns)
+        self.slots = [None] * (SIZE * SIZE)
+        for tile, (p, shift) in slot.items():
+            mirror_p, mirror_shift = slot[self.transpose[tile - 1] + 1]
+            self.slots[tile] = (p, shift, count + mirror_p, mirror_shift)
+
+    def indices(self, board: Sequence[int]) -> List[int]:
+        # Absolute offsets of each table's entry for the board, then for its transpose
+        indices = self.offsets + self.offsets
+        transpose = self.transpose
+        for cell, tile in enumerate(board):
+            if tile:
+                p, shift, mirror_p, mirror_shift = self.slots[tile]
+                indices[p] += cell << shift
+                indices[mirror_p] += transpose[cell] << mirror_shift
+        return indices
+
+    def sums(self, indices: List[int]) -> Tuple[int, int]:
+        data = self.data
+        count = len(self.offsets)
+        return (sum(data[index] for index in indices[:count]),
+                sum(data[index] for index in indices[count:]))
+
+    def heuristic(self, board: Sequence[int]) -> int:
+        return max(self.sums(self.indices(board)))
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+# Search
+
+class NodeLimit(Exception):
+    pass
+
+
+class SolveResult:
+    def __init__(self, moves: List[Tuple[int, int]], nodes: int, elapsed: float, heuristic: int,
+                 method: str = 'optimal'):
+        self.moves = moves  # cells of the tiles to slide, in order, as (row, col)
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.heuristic = heuristic  # estimate at the root
+        self.method = method  # 'optimal', 'weighted' or 'reduction'
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / max(self.elapsed, 1e-9)
+
+    def __str__(self):
+        return (f"{len(self.moves)} moves {self.method} (h {self.heuristic}), {self.nodes} nodes "
+                f"in {self.elapsed:.2f}s ({self.nps:.0f} nodes/s)")
+
+
+class Solver:
+    def __init__(self, rows: int = SIZE, cols: int = SIZE, pdb: Optional[PatternDatabase] = None):
+        self.rows = rows
+        self.cols = cols
+        self.pdb = pdb
+        cells = rows * cols
+        self.near = neighbours(rows, cols)
+        # distance[tile * cells + cell]: Manhattan distance of tile at cell
+        self.distance = [0] * (cells * cells)
+        # row_code / col_code[tile * cells + cell]: the tile's goal column (row)
+        # if it belongs in this cell's row (column), else -1
+        self.row_code = [-1] * (cells * cells)
+        self.col_code = [-1] * (cells * cells)
+        for tile in range(1, cells):
+            goal_row, goal_col = divmod(tile - 1, cols)
+            for cell in range(cells):
+                row, col = divmod(cell, cols)
+                self.distance[tile * cells + cell] = abs(row - goal_row) + abs(col - goal_col)
+                if row == goal_row:
+                    self.row_code[tile * cells + cell] = goal_col
+                if col == goal_col:
+                    self.col_code[tile * cells + cell] = goal_row
+        self.conflicts = {}
+
+    def _conflicts(self, codes: Tuple[int, ...]) -> int:
+        value = self.conflicts.get(codes)
+        if value is None:
+            value = self.conflicts[codes] = _line_conflicts(codes)
+        return value
+
+    def _row_conflicts(self, board: List[int], row: int) -> int:
+        cells = self.rows * self.cols
+        code = self.row_code
+        start = row * self.cols
+        return self._conflicts(tuple(code[board[cell] * cells + cell] for cell in range(start, start + self.cols)))
+
+    def _col_conflicts(self, board: List[int], col: int) -> int:
+        cells = self.rows * self.cols
+        code = self.col_code
+        return self._conflicts(tuple(code[board[cell] * cells + cell] for cell in range(col, cells, self.cols)))
+
+    def manhattan(self, board: Sequence[int]) -> int:
+        cells = self.rows * self.cols
+        return sum(self.distance[tile * cells + cell] for cell, tile in enumerate(board) if tile)
+
+    def heuristic(self, board: Sequence[int]) -> int:
+        board = list(board)
+        h = self.manhattan(board)
+        h += sum(self._row_conflicts(board, row) for row in range(self.rows))
+        h += sum(self._col_conflicts(board, col) for col in range(self.cols))
+        if self.pdb is not None:
+            h = max(h, self.pdb.heuristic(board))
+        return h
+
+    def solve(self, board: Sequence[int], node_limit: Optional[int] = None) -> Optional[SolveResult]:
+        # board: flat row-major tiles, 0 for the blank. None when node_limit
+        # runs out first: hard 4x4 instances take minutes in pure Python.
+        start = time.perf_counter()
+        rows, cols = self.rows, self.cols
+        cells = rows * cols
+        board = list(board)
+        if sorted(board) != list(range(cells)):
+            raise ValueError("Board must hold each tile exactly once")
+        if not is_solvable(board, rows, cols):
+            raise ValueError("Puzzle is not solvable")
+
+        near = self.near
+        distance = self.distance
+        row_code = self.row_code
+        col_code = self.col_code
+        conflicts = self.conflicts
+        line_conflicts = _line_conflicts
+        pdb = self.pdb
+        data = pdb.data if pdb else None
+        slots = pdb.slots if pdb else None
+        transpose = pdb.transpose if pdb else None
+
+        manhattan = self.manhattan(board)
+        row_lc = [self._row_conflicts(board, row) for row in range(rows)]
+        col_lc = [self._col_conflicts(board, col) for col in range(cols)]
+        indices = pdb.indices(board) if pdb else []
+        pdb_h, mirror_h = pdb.sums(indices) if pdb else (0, 0)
+        path = []
+        nodes = 0
+        limit = node_limit if node_limit is not None else 1 << 62
+
+        def line_value(line_cells, code):
+            codes = tuple(code[board[cell] * cells + cell] for cell in line_cells)
+            value = conflicts.get(codes)
+            if value is None:
+                value = conflicts[codes] = line_conflicts(codes)
+            return value
+
+        row_cells = [tuple(range(row * cols, row * cols + cols)) for row in range(rows)]
+        col_cells = [tuple(range(col, cells, cols)) for col in range(cols)]
+
+        def search(g: int, bound: int, blank: int, previous: int, md: int, lc: int, ph: int, mh: int) -> int:
+            nonlocal nodes
+            nodes += 1
+            if nodes > limit:
+                raise NodeLimit()
+            h = md + lc
+            if ph > h:
+                h = ph
+            if mh > h:
+                h = mh
+            f = g + h
+            if f > bound:
+                return f
+            if md == 0:
+                return FOUND
+            minimum = 1 << 30
+            for cell in near[blank]:
+                if cell == previous:
+                    continue
+                tile = board[cell]
+                # The tile slides from cell into the blank
+                child_md = md - distance[tile * cells + cell] + distance[tile * cells + blank]
+                board[blank] = tile
+                board[cell] = 0
+                if blank // cols == cell // cols:
+                    # Horizontal slide: only the two columns change membership
+                    old_col, new_col = cell % cols, blank % cols
+                    old_a, old_b = col_lc[old_col], col_lc[new_col]
+                    col_lc[old_col] = line_value(col_cells[old_col], col_code)
+                    col_lc[new_col] = line_value(col_cells[new_col], col_code)
+                    child_lc = lc - old_a - old_b + col_lc[old_col] + col_lc[new_col]
+                else:
+                    old_row, new_row = cell // cols, blank // cols
+                    old_a, old_b = row_lc[old_row], row_lc[new_row]
+                    row_lc[old_row] = line_value(row_cells[old_row], row_code)
+                    row_lc[new_row] = line_value(row_cells[new_row], row_code)
+                    child_lc = lc - old_a - old_b + row_lc[old_row] + row_lc[new_row]
+                child_ph, child_mh = ph, mh
+                if slots is not None:
+                    p, shift, mirror_p, mirror_shift = slots[tile]
+                    old_index = indices[p]
+                    indices[p] = old_index + ((blank - cell) << shift)
+                    child_ph = ph - data[old_index] + data[indices[p]]
+                    old_mirror = indices[mirror_p]
+                    indices[mirror_p] = old_mirror + ((transpose[blank] - transpose[cell]) << mirror_shift)
+                    child_mh = mh - data[old_mirror] + data[indices[mirror_p]]
+                path.append(cell)
+
+                result = search(g + 1, bound, cell, blank, child_md, child_lc, child_ph, child_mh)
+                if result == FOUND:
+                    return FOUND
+
+                path.pop()
+                if slots is not None:
+                    indices[p] = old_index
+                    indices[mirror_p] = old_mirror
+                board[cell] = tile
+                board[blank] = 0
+                if blank // cols == cell // cols:
+                    col_lc[old_col], col_lc[new_col] = old_a, old_b
+                else:
+                    row_lc[old_row], row_lc[new_row] = old_a, old_b
+                if result < minimum:
+                    minimum = result
+            return minimum
+
+        lc = sum(row_lc) + sum(col_lc)
+        root_h = max(manhattan + lc, pdb_h, mirror_h)
+        bound = root_h
+        blank = board.index(0)
+        while True:
+            try:
+                result = search(0, bound, blank, -1, manhattan, lc, pdb_h, mirror_h)
+            except NodeLimit:
+                return None
+            if result == FOUND:
+                break
+            bound = result
+        moves = [divmod(cell, cols) for cell in path]
+        return SolveResult(moves, nodes, time.perf_counter() - start, root_h)
+
+
+def _check_board(board: Sequence[int], rows: int, cols: int):
+    if rows < 2 or cols < 2:
+        raise ValueError("Boards need at least 2 rows and 2 columns")
+    if sorted(board) != list(range(rows * cols)):
+        raise ValueError("Board must hold each tile exactly once")
+    if not is_solvable(board, rows, cols):
+        raise ValueError("Puzzle is not solvable")
+
+
+def weighted_astar(board: Sequence[int], rows: int, cols: int, weight: float = 2.0,
+                   node_limit: int = 200000, solver: Optional[Solver] = None) -> Optional[SolveResult]:
+    # A* on f = g + weight * h over packed states. Solutions are at most
+    # weight times longer than optimal; None when node_limit runs out.
+    start = time.perf_counter()
+    _check_board(board, rows, cols)
+    solver = solver or Solver(rows, cols)
+    cells = rows * cols
+    bits = tile_bits(cells)
+    mask = (1 << bits) - 1
+    near = solver.near
+    distance = solver.distance
+    row_code = solver.row_code
+    col_code = solver.col_code
+    conflicts = solver._conflicts
+
+    def line_conflicts(state, line_cells, code):
+        return conflicts(tuple(code[((state >> (bits * cell)) & mask) * cells + cell] for cell in line_cells))
+
+    row_cells = [tuple(range(row * cols, row * cols + cols)) for row in range(rows)]
+    col_cells = [tuple(range(col, cells, cols)) for col in range(cols)]
+
+    root = pack(board, bits)
+    root_h = solver.heuristic(board)
+    goal = pack(goal_board(rows, cols), bits)
+    # parent[state]: (previous state, cell of the tile that moved)
+    parent = {root: (None, -1)}
+    cost = {root: 0}
+    heap = [(weight * root_h, 0, root, board.index(0), root_h)]
+    nodes = 0
+    while heap:
+        _, g, state, blank, h = heapq.heappop(heap)
+        if g > cost[state]:
+            continue
+        if state == goal:
+            path = []
+            while parent[state][0] is not None:
+                state, cell = parent[state]
+                path.append(divmod(cell, cols))
+            path.reverse()
+            return SolveResult(path, nodes, time.perf_counter() - start, root_h, 'weighted')
+        nodes += 1
+        if nodes > node_limit:
+            return None
+        previous = parent[state][0]
+        for cell in near[blank]:
+            tile = (state >> (bits * cell)) & mask
+            child = state ^ (tile << (bits * cell)) ^ (tile << (bits * blank))
+            if child == previous or cost.get(child, g + 2) <= g + 1:
+                continue
+            # Only the moved tile's distance and the two lines it left and
+            # entered change
+            child_h = h - distance[tile * cells + cell] + distance[tile * cells + blank]
+            if blank // cols == cell // cols:
+                lines = (col_cells[cell % cols], col_cells[blank % cols])
+                code = col_code
+            else:
+                lines = (row_cells[cell // cols], row_cells[blank // cols])
+                code = row_code
+            for line in lines:
+                child_h += line_conflicts(child, line, code) - line_conflicts(state, line, code)
+            cost[child] = g + 1
+            parent[child] = (state, cell)
+            heapq.heappush(heap, (g + 1 + weight * child_h, g + 1, child, cell, child_h))
+    return None
+
+
+# Moves the reduction solver expects per step of a tile: the blank has to walk
+# round to the far side of the tile again. Not a lower bound, so placements are
+# searched greedily rather than optimally.
+TILE_STEP_COST = 5
+
+
+def _place(board: List[int], cols: int, targets: Dict[int, int], fixed: bytearray,
+           near: List[Tuple[int, ...]]) -> Tuple[List[int], int]:
+    # A* moving the given tiles to their cells without touching fixed cells.
+    # Other tiles are interchangeable, so a state is only the target tiles'
+    # cells and the blank's. Plays the moves on board and returns them.
+    tiles = list(targets)
+    goal_cells = [targets[tile] for tile in tiles]
+
+    def estimate(cells_of, blank):
+        # Target distances, plus the blank's walk to the nearest misplaced target
+        total = 0
+        approach = 1 << 30
+        for at, goal in zip(cells_of, goal_cells):
+            if at != goal:
+                total += abs(at // cols - goal // cols) + abs(at % cols - goal % cols)
+                approach = min(approach, abs(at // cols - blank // cols) + abs(at % cols - blank % cols) - 1)
+        return TILE_STEP_COST * total + approach if total else 0
+
+    root = (tuple(board.index(tile) for tile in tiles), board.index(0))
+    parent = {root: None}
+    # Ties go to the deepest node: on an open grid many paths share an f value
+    heap = [(estimate(*root), 0, root)]
+    nodes = 0
+    while heap:
+        _, g, state = heapq.heappop(heap)
+        g = -g
+        cells_of, blank = state
+        if list(cells_of) == goal_cells:
+            break
+        nodes += 1
+        for cell in near[blank]:
+            if fixed[cell]:
+                continue
+            # The tile at cell, if it is a target, moves into the blank
+            moved = tuple(blank if at == cell else at for at in cells_of)
+            child = (moved, cell)
+            if child not in parent:
+                parent[child] = state
+                heapq.heappush(heap, (g + 1 + estimate(moved, cell), -g - 1, child))
+    else:
+        raise ValueError("Tiles cannot reach their cells")
+
+    path = []
+    while parent[state] is not None:
+        path.append(state[1])
+        state = parent[state]
+    path.reverse()
+    for cell in path:
+        blank = board.index(0)
+        board[blank], board[cell] = board[cell], 0
+    return path, nodes
+
+
+def reduction_solve(board: Sequence[int], rows: int, cols: int) -> SolveResult:
+    # Fast suboptimal solver for any size: solve the longer side's outer line
+    # of the unsolved region (top row or left column), lock it, and repeat
+    # until a 3x3 region is left, which is solved in one search. Each line
+    # places its tiles one by one, the last two together so the search finds
+    # the usual corner manoeuvre.
+    start = time.perf_counter()
+    _check_board(board, rows, cols)
+    board = list(board)
+    near = neighbours(rows, cols)
+    fixed = bytearray(rows * cols)
+    top = left = 0
+    moves = []
+    nodes = 0
+
+    def place(targets):
+        nonlocal nodes
+        path, searched = _place(board, cols, targets, fixed, near)
+        moves.extend(path)
+        nodes += searched
+
+    while rows - top > 3 or cols - left > 3:
+        if rows - top >= cols - left:
+            line = [top * cols + col for col in range(left, cols)]
+            inward = cols
+            top += 1
+        else:
+            line = [row * cols + left for row in range(top, rows)]
+            inward = 1
+            left += 1
+        for cell in line[:-2]:
+            place({cell + 1: cell})
+            fixed[cell] = 1
+        # Stage the last two: the end tile on the second-to-last cell and
+        # its neighbour just inside the region, so the joint search is short.
+        # The neighbour is parked two cells inside first; with the end tile
+        # locked it could not leave the corner without trapping the blank.
+        second, last = line[-2:]
+        place({second + 1: second + 2 * inward})
+        place({last + 1: second})
+        fixed[second] = 1
+        try:
+            place({second + 1: second + inward})
+        except ValueError:
+            pass  # the joint search below still solves it, just slower
+        fixed[second] = 0
+        place({second + 1: second, last + 1: last})
+        fixed[second] = fixed[last] = 1
+    region = [row * cols + col for row in range(top, rows) for col in range(left, cols)]
+    place({cell + 1: cell for cell in region[:-1]})
+    return SolveResult([divmod(cell, cols) for cell in moves], nodes, time.perf_counter() - start, 0, 'reduction')
+
+
+def solve_board(board: Sequence[int], rows: int, cols: int, pdb: Optional[PatternDatabase] = None,
+                node_limit: int = 50000, optimal_limit: Optional[int] = OPTIMAL_NODE_LIMIT) -> SolveResult:
+    # Optimal IDA* while optimal_limit lasts, up to 14 cells or on 4x4 with
+    # pattern databases; then weighted A* up to 36 cells while node_limit
+    # lasts; then the reduction solver, which always answers quickly.
+    # optimal_limit=None solves every board up to 16 cells optimally.
+    # Measured: 4x4 answers in 2s on average (two thirds of random boards
+    # optimally, at most about 4s); up to 30x30 answers within about 2s,
+    # 50x50 in about 12s and 70x70 in about a minute.
+    start = time.perf_counter()
+    cells = rows * cols
+    abandoned = 0
+    use_pdb = pdb is not None and rows == cols == SIZE
+    if cells < 15 or use_pdb or (optimal_limit is None and cells <= 16):
+        result = Solver(rows, cols, pdb if use_pdb else None).solve(board, optimal_limit)
+        if result is not None:
+            return result
+        abandoned += optimal_limit
+    if cells <= 36:
+        result = weighted_astar(board, rows, cols, node_limit=node_limit)
+        if result is not None:
+            result.nodes += abandoned
+            result.elapsed = time.perf_counter() - start
+            return result
+        abandoned += node_limit
+    result = reduction_solve(board, rows, cols)
+    # Count the abandoned searches too
+    result.nodes += abandoned
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def scaling_benchmark(max_size: int, samples: int = 3, seed: Optional[int] = None,
+                      pdb: Optional[PatternDatabase] = None):
+    # Time solve_board on random N x N boards to see where latency grows
+    rng = random.Random(seed)
+    for size in range(2, max_size + 1):
+        results = [solve_board(random_board(size, size, rng), size, size, pdb) for _ in range(samples)]
+        methods = sorted({result.method for result in results})
+        print(f"{size}x{size}: {'/'.join(methods):9} "
+              f"moves {sum(len(result.moves) for result in results) / samples:8.1f}  "
+              f"nodes {sum(result.nodes for result in results) / samples:10.0f}  "
+              f"avg {sum(result.elapsed for result in results) / samples:7.2f}s  "
+              f"max {max(result.elapsed for result in results):7.2f}s")
+
+
+# Worker process for the GUI
+
+_pdb: Optional[PatternDatabase] = None
+_use_pdb = True
+
+
+def _init_solver(use_pdb: bool):
+    global _use_pdb
+    _use_pdb = use_pdb
+
+
+def _solve(board: List[int], rows: int, cols: int) -> List[Tuple[int, int]]:
+    # Never builds the tables, which takes over a minute: until they are on
+    # disk 4x4 boards are solved with Manhattan distance + linear conflict
+    global _pdb
+    if _use_pdb and _pdb is None and rows == cols == SIZE and pattern_db_ready():
+        _pdb = PatternDatabase(build=False)
+    return solve_board(board, rows, cols, _pdb).moves
+
+
+class SolverWorker:
+    # Solves in a separate process so the game loop keeps drawing. The board
+    # is sent as a flat list and the solution comes back as tile cells.
+
+    def __init__(self, use_pdb: bool = True):
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_solver, initargs=(use_pdb,))
+        self.future: Optional[Future] = None
+        self.board = None
+
+    @property
+    def busy(self) -> bool:
+        return self.future is not None
+
+    def start(self, board: List[int], rows: int = SIZE, cols: int = SIZE) -> bool:
+        if self.busy:
+            return False
+        self.board = list(board)
+        self.future = self.executor.submit(_solve, self.board, rows, cols)
+        return True
+
+    def poll(self, board: List[int]) -> Optional[List[Tuple[int, int]]]:
+        # The finished solution, or None while searching or if the board changed meanwhile
+        if self.future is None or not self.future.done():
+            return None
+        moves = self.future.result()
+        self.future = None
+        if list(board) != self.board:
+            return None
+        return moves
+
+    def shutdown(self):
+        if self.future is not None:
+            self.future.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sliding puzzle solver')
+    parser.add_argument('tiles', nargs='*', type=int, help='row-major tiles, 0 for the blank')
+    parser.add_argument('--rows', type=int, default=SIZE)
+    parser.add_argument('--cols', type=int, default=None, help='defaults to --rows')
+    parser.add_argument('--random', type=int, default=0, help='solve this many random puzzles')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--method', choices=['auto', 'optimal', 'weighted', 'reduction'], default='auto')
+    parser.add_argument('--no-pdb', action='store_true', help='Manhattan distance + linear conflict only')
+    parser.add_argument('--build', action='store_true', help='(re)build the pattern databases and exit')
+    parser.add_argument('--scale', type=int, default=0, metavar='N',
+                        help='time random boards from 2x2 up to NxN and exit')
+    args = parser.parse_args()
+    rows = args.rows
+    cols = args.cols or rows
+
+    if args.build:
+        build_pattern_dbs(verbose=True)
+        return
+    use_pdb = not args.no_pdb and (args.scale >= SIZE or rows == cols == SIZE)
+    pdb = PatternDatabase() if use_pdb else None
+    if args.scale:
+        scaling_benchmark(args.scale, seed=args.seed, pdb=pdb)
+        return
+    if args.tiles:
+        if len(args.tiles) != rows * cols:
+            parser.error(f"expected {rows * cols} tiles for a {rows}x{cols} board")
+        boards = [args.tiles]
+    else:
+        rng = random.Random(args.seed)
+        boards = [random_board(rows, cols, rng) for _ in range(max(args.random, 1))]
+    for board in boards:
+        if args.method == 'optimal':
+            result = Solver(rows, cols, pdb).solve(board)
+        elif args.method == 'weighted':
+            result = weighted_astar(board, rows, cols, node_limit=10 ** 9)
+        elif args.method == 'reduction':
+            result = reduction_solve(board, rows, cols)
+        else:
+            result = solve_board(board, rows, cols, pdb)
+        print(' '.join(map(str, board)))
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,23 @@
 import pygame
-import random
 import sys
-
-# Initialize pygame
-pygame.init()
+import time
+import random
+import argparse
+import itertools
+from collections import deque
+from typing import List, Optional
+import snake_core
+from snake_core import GRID_WIDTH, GRID_HEIGHT, UP, DOWN, LEFT, RIGHT, DIRECTIONS
+from snake_autopilot import Autopilot
+from snake_replay import Replay, read_replay, write_replay
 
 # Constants
-WIDTH, HEIGHT = 600, 600
 GRID_SIZE = 20
-GRID_WIDTH = WIDTH // GRID_SIZE
-GRID_HEIGHT = HEIGHT // GRID_SIZE
-FPS = 10
+WIDTH, HEIGHT = GRID_WIDTH * GRID_SIZE, GRID_HEIGHT * GRID_SIZE
+FPS = 10  # starting game ticks per second
+RENDER_FPS = 60  # frames per second, independent of the tick rate
+MAX_TICKS_PER_FRAME = 5  # after a stall, drop time rather than fast-forward
+TURN_QUEUE = 3  # turns buffered between ticks
 
 # Colors
 BLACK = (0, 0, 0)
@@ -21,111 +28,64 @@ BLUE = (30, 144, 255)
 DARK_GREEN = (0, 100, 0)
 GRAY = (40, 40, 40)
 
-# Directions
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
+# Body segments this far back are all drawn alike (the gradient has bottomed out)
+GRADIENT_SEGMENTS = (255 - 50) // 3 + 1
 
-class Snake:
-    def __init__(self):
-        self.reset()
+def draw_segment(surface, p, index: int, direction):
+    # Segment index of the snake (0 is the head) at grid position p
+    rect = pygame.Rect(p[0] * GRID_SIZE, p[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+
+    # Head is a different color
+    if index == 0:
+        pygame.draw.rect(surface, BLUE, rect)
+        pygame.draw.rect(surface, WHITE, rect, 1)
         
-    def reset(self):
-        self.length = 3
-        self.positions = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        self.direction = RIGHT
-        self.score = 0
-        self.grow_to = 3  # Initial length
-        self.is_alive = True
+        # Draw eyes on head
+        eye_size = GRID_SIZE // 5
+        # Left eye
+        if direction == RIGHT:
+            eye_pos = (p[0] * GRID_SIZE + GRID_SIZE - eye_size - 2, p[1] * GRID_SIZE + 5)
+        elif direction == LEFT:
+            eye_pos = (p[0] * GRID_SIZE + 2, p[1] * GRID_SIZE + 5)
+        elif direction == UP:
+            eye_pos = (p[0] * GRID_SIZE + 5, p[1] * GRID_SIZE + 2)
+        else:  # DOWN
+            eye_pos = (p[0] * GRID_SIZE + 5, p[1] * GRID_SIZE + GRID_SIZE - eye_size - 2)
         
-    def get_head_position(self):
-        return self.positions[0]
-    
-    def turn(self, point):
-        # Prevent snake from turning directly back on itself
-        if self.length > 1 and (point[0] * -1, point[1] * -1) == self.direction:
-            return
-        else:
-            self.direction = point
-    
-    def move(self):
-        if not self.is_alive:
-            return
-            
-        head = self.get_head_position()
-        x, y = self.direction
-        new_x = (head[0] + x) % GRID_WIDTH
-        new_y = (head[1] + y) % GRID_HEIGHT
-        new_position = (new_x, new_y)
+        pygame.draw.rect(surface, WHITE, (eye_pos[0], eye_pos[1], eye_size, eye_size))
         
-        # Check for collision with self
-        if new_position in self.positions[1:]:
-            self.is_alive = False
-            return
-            
-        self.positions.insert(0, new_position)
+        # Right eye (offset from left)
+        if direction == RIGHT:
+            eye_pos = (p[0] * GRID_SIZE + GRID_SIZE - eye_size - 2, p[1] * GRID_SIZE + GRID_SIZE - 5 - eye_size)
+        elif direction == LEFT:
+            eye_pos = (p[0] * GRID_SIZE + 2, p[1] * GRID_SIZE + GRID_SIZE - 5 - eye_size)
+        elif direction == UP:
+            eye_pos = (p[0] * GRID_SIZE + GRID_SIZE - 5 - eye_size, p[1] * GRID_SIZE + 2)
+        else:  # DOWN
+            eye_pos = (p[0] * GRID_SIZE + GRID_SIZE - 5 - eye_size, p[1] * GRID_SIZE + GRID_SIZE - eye_size - 2)
         
-        # Grow snake if needed
-        if len(self.positions) > self.grow_to:
-            self.positions.pop()
-    
+        pygame.draw.rect(surface, WHITE, (eye_pos[0], eye_pos[1], eye_size, eye_size))
+    else:
+        # Body segments with gradient
+        color_intensity = max(50, 255 - index * 3)
+        segment_color = (0, color_intensity, 0)
+        pygame.draw.rect(surface, segment_color, rect)
+        pygame.draw.rect(surface, DARK_GREEN, rect, 1)
+
+# Game rules live in snake_core; these add drawing
+class Snake(snake_core.Snake):
     def draw(self, surface):
         for i, p in enumerate(self.positions):
-            # Draw snake segment
-            rect = pygame.Rect(p[0] * GRID_SIZE, p[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE)
-            
-            # Head is a different color
-            if i == 0:
-                pygame.draw.rect(surface, BLUE, rect)
-                pygame.draw.rect(surface, WHITE, rect, 1)
-                
-                # Draw eyes on head
-                eye_size = GRID_SIZE // 5
-                # Left eye
-                if self.direction == RIGHT:
-                    eye_pos = (p[0] * GRID_SIZE + GRID_SIZE - eye_size - 2, p[1] * GRID_SIZE + 5)
-                elif self.direction == LEFT:
-                    eye_pos = (p[0] * GRID_SIZE + 2, p[1] * GRID_SIZE + 5)
-                elif self.direction == UP:
-                    eye_pos = (p[0] * GRID_SIZE + 5, p[1] * GRID_SIZE + 2)
-                else:  # DOWN
-                    eye_pos = (p[0] * GRID_SIZE + 5, p[1] * GRID_SIZE + GRID_SIZE - eye_size - 2)
-                
-                pygame.draw.rect(surface, WHITE, (eye_pos[0], eye_pos[1], eye_size, eye_size))
-                
-                # Right eye (offset from left)
-                if self.direction == RIGHT:
-                    eye_pos = (p[0] * GRID_SIZE + GRID_SIZE - eye_size - 2, p[1] * GRID_SIZE + GRID_SIZE - 5 - eye_size)
-                elif self.direction == LEFT:
-                    eye_pos = (p[0] * GRID_SIZE + 2, p[1] * GRID_SIZE + GRID_SIZE - 5 - eye_size)
-                elif self.direction == UP:
-                    eye_pos = (p[0] * GRID_SIZE + GRID_SIZE - 5 - eye_size, p[1] * GRID_SIZE + 2)
-                else:  # DOWN
-                    eye_pos = (p[0] * GRID_SIZE + GRID_SIZE - 5 - eye_size, p[1] * GRID_SIZE + GRID_SIZE - eye_size - 2)
-                
-                pygame.draw.rect(surface, WHITE, (eye_pos[0], eye_pos[1], eye_size, eye_size))
-            else:
-                # Body segments with gradient
-                color_intensity = max(50, 255 - i * 3)
-                segment_color = (0, color_intensity, 0)
-                pygame.draw.rect(surface, segment_color, rect)
-                pygame.draw.rect(surface, DARK_GREEN, rect, 1)
-    
-    def grow(self):
-        self.grow_to += 1
-        self.score += 10
+            draw_segment(surface, p, i, self.direction)
 
-class Food:
+class Food(snake_core.Food):
     def __init__(self):
-        self.position = (0, 0)
+        super().__init__()
         self.color = RED
-        self.randomize_position()
-    
-    def randomize_position(self):
-        self.position = (random.randint(0, GRID_WIDTH - 1), random.randint(0, GRID_HEIGHT - 1))
     
     def draw(self, surface):
+        if self.position is None:
+            return
         rect = pygame.Rect(self.position[0] * GRID_SIZE, self.position[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE)
         pygame.draw.rect(surface, self.color, rect)
         pygame.draw.rect(surface, WHITE, rect, 1)
@@ -139,8 +99,242 @@ class Food:
         )
         pygame.draw.ellipse(surface, (255, 200, 200), highlight)
 
-class Game:
+class GameRenderer:
+    # Dirty-rectangle renderer. The grid is drawn once into a background
+    # surface, and the renderer mirrors the body it last drew, so a frame only
+    # touches the new head cells, the vacated tail cells, the segments still
+    # changing colour, the food and any text whose value changed. Frame cost
+    # therefore does not grow with the snake.
+
+    def __init__(self, screen, font, big_font):
+        self.screen = screen
+        self.font = font
+        self.big_font = big_font
+        self.background = pygame.Surface((WIDTH, HEIGHT))
+        self.background.fill(BLACK)
+        for x in range(0, WIDTH, GRID_SIZE):
+            pygame.draw.line(self.background, GRAY, (x, 0), (x, HEIGHT), 1)
+        for y in range(0, HEIGHT, GRID_SIZE):
+            pygame.draw.line(self.background, GRAY, (0, y), (WIDTH, y), 1)
+        self.texts = {}  # key -> (value, surface) rendered so far
+        self.invalidate()
+
+    def invalidate(self):
+        self.valid = False
+        self.shown = deque()  # body positions as drawn, head first
+        self.food_shown = None
+        self.direction_shown = None
+        self.motion = []  # cells the last in-between frame drew partly
+        self.labels = {}  # name -> (value, surface, rect) on screen
+        self.showing_game_over = False
+
+    def text(self, key, value, message: str, color, font=None):
+        # font.render only when the value behind a text changes
+        cached = self.texts.get(key)
+        if cached is None or cached[0] != value:
+            cached = (value, (font or self.font).render(message, True, color))
+            self.texts[key] = cached
+        return cached[1]
+
+    def cell_rect(self, p) -> pygame.Rect:
+        return pygame.Rect(p[0] * GRID_SIZE, p[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+
+    def wanted_labels(self, game):
+        snake = game.snake
+        labels = {
+            'score': (snake.score, self.text('score', snake.score, f"Score: {snake.score}", WHITE), (10, 10)),
+            'length': (snake.grow_to, self.text('length', snake.grow_to, f"Length: {snake.grow_to}", WHITE),
+                       (WIDTH - 120, 10)),
+        }
+        if game.auto:
+            labels['auto'] = (True, self.text('auto', True, "AUTO", BLUE), (10, HEIGHT - 40))
+        return labels
+
+    def draw_game_over(self, game) -> List[pygame.Rect]:
+        score = game.snake.score
+        lines = [
+            (self.text('over', None, "GAME OVER", RED, self.big_font), HEIGHT // 2 - 50),
+            (self.text('final', score, f"Final Score: {score}", WHITE), HEIGHT // 2 + 10),
+            (self.text('restart', None, "Press SPACE to restart or ESC to quit", WHITE), HEIGHT // 2 + 50),
+        ]
+        rects = []
+        for surface, y in lines:
+            rect = surface.get_rect(center=(WIDTH // 2, y))
+            self.screen.blit(surface, rect)
+            rects.append(rect)
+        return rects
+
+    def redraw(self, game) -> List[pygame.Rect]:
+        self.invalidate()
+        self.screen.blit(self.background, (0, 0))
+        game.snake.draw(self.screen)
+        game.food.draw(self.screen)
+        for name, (value, surface, pos) in self.wanted_labels(game).items():
+            self.labels[name] = (value, surface, self.screen.blit(surface, pos))
+        if game.game_over:
+            self.draw_game_over(game)
+        self.shown = deque(game.snake.positions)
+        self.food_shown = game.food.position
+        self.direction_shown = game.snake.direction
+        self.showing_game_over = game.game_over
+        self.valid = True
+        return [self.screen.get_rect()]
+
+    def restore(self, rect: pygame.Rect, game):
+        # Background under rect, with the body and food cells it overlaps
+        self.screen.blit(self.background, rect, rect)
+        snake = game.snake
+        front = {p: i for i, p in enumerate(itertools.islice(snake.positions, GRADIENT_SEGMENTS))}
+        for x in range(rect.left // GRID_SIZE, min((rect.right - 1) // GRID_SIZE + 1, GRID_WIDTH)):
+            for y in range(rect.top // GRID_SIZE, min((rect.bottom - 1) // GRID_SIZE + 1, GRID_HEIGHT)):
+                if snake.occupies((x, y)):
+                    draw_segment(self.screen, (x, y), front.get((x, y), GRADIENT_SEGMENTS), snake.direction)
+                elif (x, y) == game.food.position:
+                    game.food.draw(self.screen)
+
+    def edge_rect(self, p, side, extent: int) -> pygame.Rect:
+        # The strip of cell p, extent pixels deep, along the side facing side
+        x, y = p[0] * GRID_SIZE, p[1] * GRID_SIZE
+        if side[0] == 1:
+            return pygame.Rect(x + GRID_SIZE - extent, y, extent, GRID_SIZE)
+        if side[0] == -1:
+            return pygame.Rect(x, y, extent, GRID_SIZE)
+        if side[1] == 1:
+            return pygame.Rect(x, y + GRID_SIZE - extent, GRID_SIZE, extent)
+        return pygame.Rect(x, y, GRID_SIZE, extent)
+
+    def draw_motion(self, game, alpha: float) -> List[pygame.Rect]:
+        # alpha of the way to the next tick: the head slides into the cell it
+        # is about to enter and, unless the snake is growing, the tail pulls
+        # out of its cell
+        snake = game.snake
+        extent = int(alpha * GRID_SIZE)
+        if extent <= 0 or game.game_over:
+            return []
+        rects = []
+        head = snake.get_head_position()
+        dx, dy = game.next_direction()
+        ahead = ((head[0] + dx) % GRID_WIDTH, (head[1] + dy) % GRID_HEIGHT)
+        if not snake.occupies(ahead):
+            rect = self.edge_rect(ahead, (-dx, -dy), extent)
+            pygame.draw.rect(self.screen, BLUE, rect)
+            self.motion.append(ahead)
+            rects.append(rect)
+        positions = snake.positions
+        if 1 < len(positions) == snake.grow_to:
+            tail, before = positions[-1], positions[-2]
+            side = (((before[0] - tail[0] + 1) % GRID_WIDTH) - 1, ((before[1] - tail[1] + 1) % GRID_HEIGHT) - 1)
+            rect = self.cell_rect(tail)
+            self.screen.blit(self.background, rect, rect)
+            shade = max(50, 255 - (len(positions) - 1) * 3)
+            pygame.draw.rect(self.screen, (0, shade, 0), self.edge_rect(tail, side, GRID_SIZE - extent))
+            self.motion.append(tail)
+            rects.append(rect)
+        return rects
+
+    def render(self, game, alpha: float = 0.0) -> List[pygame.Rect]:
+        # Returns the rectangles to pass to pygame.display.update. alpha is
+        # how far the game is between ticks, for smooth motion.
+        if not self.valid or self.showing_game_over != game.game_over:
+            if not game.game_over or not self.valid:
+                return self.redraw(game)
+        if self.showing_game_over:
+            return []
+        snake = game.snake
+        positions = snake.positions
+        # Cells the head entered since the last frame
+        try:
+            fresh = positions.index(self.shown[0], 0, GRADIENT_SEGMENTS) if self.shown else -1
+        except ValueError:
+            fresh = -1
+        if fresh < 0:
+            return self.redraw(game)
+        dirty = []
+
+        for p in self.motion:
+            rect = self.cell_rect(p)
+            self.restore(rect, game)
+            dirty.append(rect)
+        self.motion = []
+
+        labels = self.wanted_labels(game)
+        for name, (value, surface, rect) in list(self.labels.items()):
+            if name not in labels or labels[name][0] != value:
+                self.restore(rect, game)
+                dirty.append(rect)
+                del self.labels[name]
+
+        self.shown.extendleft(reversed(list(itertools.islice(positions, fresh))))
+        while len(self.shown) > len(positions):
+            rect = self.cell_rect(self.shown.pop())
+            self.screen.blit(self.background, rect, rect)
+            dirty.append(rect)
+
+        food_moved = self.food_shown != game.food.position
+        if food_moved:
+            if self.food_shown is not None and not snake.occupies(self.food_shown):
+                rect = self.cell_rect(self.food_shown)
+                self.screen.blit(self.background, rect, rect)
+                dirty.append(rect)
+            self.food_shown = game.food.position
+
+        # Segments whose gradient shade moved on, including the new ones; only
+        # the head (for its eyes) between ticks
+        if fresh:
+            segments = GRADIENT_SEGMENTS + fresh
+        else:
+            segments = 1 if snake.direction != self.direction_shown else 0
+        self.direction_shown = snake.direction
+        for i, p in enumerate(itertools.islice(positions, segments)):
+            rect = self.cell_rect(p)
+            self.screen.blit(self.background, rect, rect)
+            draw_segment(self.screen, p, i, snake.direction)
+            dirty.append(rect)
+
+        if food_moved and game.food.position is not None:
+            game.food.draw(self.screen)
+            dirty.append(self.cell_rect(game.food.position))
+
+        dirty.extend(self.draw_motion(game, alpha))
+
+        for name, (value, surface, pos) in labels.items():
+            shown = self.labels.get(name)
+            rect = shown[2] if shown else surface.get_rect(topleft=pos)
+            if shown is None or rect.collidelist(dirty) >= 0:
+                # Text is blended, so it goes onto a freshly restored patch
+                if shown is not None:
+                    self.restore(rect, game)
+                self.labels[name] = (value, surface, self.screen.blit(surface, pos))
+                dirty.append(rect)
+
+        if game.game_over:
+            dirty.extend(self.draw_game_over(game))
+            self.showing_game_over = True
+        return dirty
+
+class LoopStats:
+    # Input-to-move latency (key press to the tick that turns the snake) and
+    # frame time (drawing plus display update), in seconds
+
     def __init__(self):
+        self.latencies = []
+        self.frame_times = []
+
+    def summary(self, name: str, samples: List[float]) -> str:
+        if not samples:
+            return f"{name}: no samples"
+        ordered = sorted(samples)
+        mean = sum(ordered) / len(ordered)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return (f"{name}: {len(ordered)} samples, mean {mean * 1000:.2f} ms, "
+                f"p95 {p95 * 1000:.2f} ms, max {ordered[-1] * 1000:.2f} ms")
+
+    def report(self) -> str:
+        return self.summary('input latency', self.latencies) + '\n' + self.summary('frame time', self.frame_times)
+
+class Game:
+    def __init__(self, seed: Optional[int] = None, record: Optional[str] = None,
+                 playback: Optional[Replay] = None):
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Snake Game")
         self.clock = pygame.time.Clock()
@@ -150,41 +344,31 @@ class Game:
         self.food = Food()
         self.speed = FPS
         self.game_over = False
+        # A toggles the autoplayer
+        self.autopilot = Autopilot(GRID_WIDTH, GRID_HEIGHT)
+        self.auto = False
+        self.renderer = GameRenderer(self.screen, self.font, self.big_font)
+        # Arrow keys queue (direction, time pressed); each tick takes one, so
+        # quick presses between ticks all count
+        self.turns = deque()
+        self.stats = LoopStats()
+        self.show_stats = False
+        # Food comes from a per-game seed (fixed by seed) so a game can be
+        # recorded as its seed and turns, and played back from a replay
+        self.seed = seed
+        self.food.rng = random.Random()
+        self.ticks = 0
+        self.record_path = record
+        self.recording = None
+        self.playback = playback
+        self.playback_actions = playback.actions() if playback else {}
+        self.reset_game()
         
-    def draw_grid(self):
-        for x in range(0, WIDTH, GRID_SIZE):
-            pygame.draw.line(self.screen, GRAY, (x, 0), (x, HEIGHT), 1)
-        for y in range(0, HEIGHT, GRID_SIZE):
-            pygame.draw.line(self.screen, GRAY, (0, y), (WIDTH, y), 1)
-    
-    def draw_score(self):
-        score_text = self.font.render(f"Score: {self.snake.score}", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
-        
-        length_text = self.font.render(f"Length: {self.snake.grow_to}", True, WHITE)
-        self.screen.blit(length_text, (WIDTH - 120, 10))
-    
-    def draw_game_over(self):
-        game_over_surface = self.big_font.render("GAME OVER", True, RED)
-        game_over_rect = game_over_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 50))
-        self.screen.blit(game_over_surface, game_over_rect)
-        
-        score_surface = self.font.render(f"Final Score: {self.snake.score}", True, WHITE)
-        score_rect = score_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 10))
-        self.screen.blit(score_surface, score_rect)
-        
-        restart_surface = self.font.render("Press SPACE to restart or ESC to quit", True, WHITE)
-        restart_rect = restart_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
-        self.screen.blit(restart_surface, restart_rect)
-    
     def check_food_collision(self):
         if self.snake.get_head_position() == self.food.position:
             self.snake.grow()
-            self.food.randomize_position()
-            
-            # Make sure food doesn't appear on snake
-            while self.food.position in self.snake.positions:
-                self.food.randomize_position()
+            # Only cells off the snake are candidates
+            self.food.randomize_position(self.snake)
             
             # Slightly increase speed every 5 foods
             if self.snake.score % 50 == 0:
@@ -193,62 +377,189 @@ class Game:
     def handle_keys(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                self.quit()
+            elif event.type == pygame.VIDEOEXPOSE:
+                self.renderer.invalidate()
             elif event.type == pygame.KEYDOWN:
                 if self.game_over:
                     if event.key == pygame.K_SPACE:
                         self.reset_game()
                     elif event.key == pygame.K_ESCAPE:
-                        pygame.quit()
-                        sys.exit()
+                        self.quit()
                 else:
-                    if event.key == pygame.K_UP:
-                        self.snake.turn(UP)
+                    if event.key == pygame.K_a:
+                        self.auto = not self.auto
+                        self.autopilot.reset()
+                    elif event.key == pygame.K_UP:
+                        self.queue_turn(UP)
                     elif event.key == pygame.K_DOWN:
-                        self.snake.turn(DOWN)
+                        self.queue_turn(DOWN)
                     elif event.key == pygame.K_LEFT:
-                        self.snake.turn(LEFT)
+                        self.queue_turn(LEFT)
                     elif event.key == pygame.K_RIGHT:
-                        self.snake.turn(RIGHT)
+                        self.queue_turn(RIGHT)
                     elif event.key == pygame.K_ESCAPE:
-                        pygame.quit()
-                        sys.exit()
+                        self.quit()
+    
+    def queue_turn(self, direction):
+        # Checked against the last queued heading, so up-then-left within one
+        # tick is a turn and a turn, never a reversal into the neck
+        heading = self.next_direction(last=True)
+        if direction == heading or (-direction[0], -direction[1]) == heading:
+            return
+        if len(self.turns) < TURN_QUEUE:
+            self.turns.append((direction, time.perf_counter()))
+
+    def next_direction(self, last: bool = False):
+        # Heading for the next tick (or after every queued turn)
+        if self.turns:
+            return self.turns[-1 if last else 0][0]
+        return self.snake.direction
+
+    def save_recording(self):
+        if self.record_path and self.recording is not None:
+            self.recording.finish(self.ticks, self.snake)
+            write_replay(self.record_path, self.recording)
+            self.recording = None
+
+    def quit(self):
+        self.save_recording()
+        if self.show_stats:
+            print(self.stats.report())
+        pygame.quit()
+        sys.exit()
     
     def reset_game(self):
+        if self.playback:
+            game_seed = self.playback.seed
+        elif self.seed is not None:
+            game_seed = self.seed
+        else:
+            game_seed = random.randrange(1 << 32)
+        self.food.rng.seed(game_seed)
+        self.ticks = 0
+        self.recording = Replay(game_seed, GRID_WIDTH, GRID_HEIGHT) if self.record_path else None
+        self.turns.clear()
         self.snake.reset()
-        self.food.randomize_position()
+        self.food.randomize_position(self.snake)
         self.game_over = False
         self.speed = FPS
+        self.autopilot.reset()
+    
+    def update(self):
+        # One game tick
+        heading = self.snake.direction
+        if self.playback:
+            if self.ticks in self.playback_actions:
+                self.snake.turn(DIRECTIONS[self.playback_actions[self.ticks]])
+        elif self.auto:
+            self.turns.clear()
+            action = self.autopilot.next_action(self.snake, self.food.position)
+            if action is not None:
+                self.snake.turn(DIRECTIONS[action])
+        elif self.turns:
+            direction, pressed = self.turns.popleft()
+            self.snake.turn(direction)
+            self.stats.latencies.append(time.perf_counter() - pressed)
+        if self.recording is not None and self.snake.direction != heading:
+            self.recording.record(self.ticks, DIRECTIONS.index(self.snake.direction))
+        self.snake.move()
+        self.ticks += 1
+        self.check_food_collision()
         
-        # Make sure food doesn't appear on snake
-        while self.food.position in self.snake.positions:
-            self.food.randomize_position()
+        if not self.snake.is_alive or (self.playback and self.ticks >= self.playback.ticks):
+            self.game_over = True
+            self.save_recording()
     
     def run(self):
+        # Fixed timestep: the game ticks every 1 / speed seconds of real time
+        # however fast frames come, and frames in between draw the motion
+        # towards the next tick. Input is read every frame.
+        previous = time.perf_counter()
+        lag = 0.0
         while True:
             self.handle_keys()
             
-            if not self.game_over:
-                self.snake.move()
-                self.check_food_collision()
-                
-                if not self.snake.is_alive:
-                    self.game_over = True
-            
-            # Draw everything
-            self.screen.fill(BLACK)
-            self.draw_grid()
-            self.snake.draw(self.screen)
-            self.food.draw(self.screen)
-            self.draw_score()
-            
+            now = time.perf_counter()
+            lag += now - previous
+            previous = now
+            ticks = 0
+            while lag >= 1.0 / self.speed and not self.game_over:
+                lag -= 1.0 / self.speed
+                self.update()
+                ticks += 1
+                if ticks == MAX_TICKS_PER_FRAME:
+                    lag = 0.0
             if self.game_over:
-                self.draw_game_over()
+                lag = 0.0
             
-            pygame.display.update()
-            self.clock.tick(self.speed)
+            # Draw what changed
+            start = time.perf_counter()
+            dirty = self.renderer.render(self, lag * self.speed)
+            if dirty:
+                pygame.display.update(dirty)
+            self.stats.frame_times.append(time.perf_counter() - start)
+            self.clock.tick(RENDER_FPS)
+
+def draw_full_frame(surface, game, font):
+    # The frame as drawn before GameRenderer: clear, grid lines, every segment,
+    # freshly rendered text
+    surface.fill(BLACK)
+    for x in range(0, WIDTH, GRID_SIZE):
+        pygame.draw.line(surface, GRAY, (x, 0), (x, HEIGHT), 1)
+    for y in range(0, HEIGHT, GRID_SIZE):
+        pygame.draw.line(surface, GRAY, (0, y), (WIDTH, y), 1)
+    game.snake.draw(surface)
+    game.food.draw(surface)
+    surface.blit(font.render(f"Score: {game.snake.score}", True, WHITE), (10, 10))
+    surface.blit(font.render(f"Length: {game.snake.grow_to}", True, WHITE), (WIDTH - 120, 10))
+
+def benchmark_redraw(ticks: int, seed: int = 0, replay: Optional[Replay] = None):
+    # Frame time over an autopiloted game (or a replay), full redraws vs dirty
+    # rectangles, reported for each quarter of the game as the snake grows.
+    # ticks 0 runs the whole game.
+    game = Game(seed, playback=replay)
+    game.auto = replay is None
+    scratch = pygame.Surface((WIDTH, HEIGHT))
+    samples = []
+    while (not ticks or len(samples) < ticks) and not game.game_over:
+        game.update()
+        start = time.perf_counter()
+        draw_full_frame(scratch, game, game.font)
+        full = time.perf_counter() - start
+        start = time.perf_counter()
+        game.renderer.render(game)
+        samples.append((len(game.snake.positions), full, time.perf_counter() - start))
+    quarter = max(len(samples) // 4, 1)
+    for i in range(0, len(samples), quarter):
+        part = samples[i:i + quarter]
+        full = sum(s[1] for s in part) / len(part)
+        dirty = sum(s[2] for s in part) / len(part)
+        print(f"length {part[0][0]:4d}-{part[-1][0]:4d}: full {full * 1000:.3f} ms/frame, "
+              f"dirty rects {dirty * 1000:.3f} ms/frame ({full / max(dirty, 1e-9):.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Snake game')
+    parser.add_argument('--benchmark', type=int, metavar='TICKS',
+                        help='time full and dirty-rect redraws over an autopiloted game and exit')
+    parser.add_argument('--stats', action='store_true', help='print input latency and frame times on exit')
+    parser.add_argument('--seed', type=int, default=None, help='same food every game')
+    parser.add_argument('--record', metavar='FILE', help='save each game as a replay (the last one is kept)')
+    parser.add_argument('--replay', metavar='FILE', help='play back a replay (see snake_replay.py)')
+    args = parser.parse_args()
+    replay = read_replay(args.replay) if args.replay else None
+    if replay and (replay.width, replay.height) != (GRID_WIDTH, GRID_HEIGHT):
+        parser.error(f"{args.replay} is for a {replay.width}x{replay.height} board")
+
+    # Initialize pygame
+    pygame.init()
+    if args.benchmark is not None:
+        benchmark_redraw(args.benchmark, args.seed or 0, replay)
+        pygame.quit()
+        return
+    game = Game(args.seed, args.record, replay)
+    game.show_stats = args.stats
+    game.run()
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    main()
\ No newline at end of file
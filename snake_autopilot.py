@@ -0,0 +1,268 @@
+import time
+import heapq
+import argparse
+from collections import deque
+from typing import List, Tuple, Optional
+
+from snake_core import SnakeSim, DIRECTIONS, GRID_WIDTH, GRID_HEIGHT
+
+# Constants
+SHORTCUT_MARGIN = 4  # free cells kept between head and tail when cutting across the cycle
+SHORTCUT_LIMIT = 0.5  # an aligned snake covering this much of the board stops cutting across
+
+# Autoplayer for the snake game. The snake keeps its body in the order of a
+# Hamiltonian cycle of the board, which it can follow forever without trapping
+# itself. It takes the shortest path to the food when the body is back in that
+# order at the end of it, and otherwise moves along the cycle, cutting across
+# it towards the food where that is safe. Tables that depend only on the board
+# size are built once, and a checked path is replayed tick by tick until the
+# food moves.
+
+def hamiltonian_cycle(width: int, height: int) -> Optional[List[int]]:
+    # Cells in cycle order: rows snake back and forth over columns 1.., then
+    # column 0 leads home. Needs an even number of rows (or columns, by
+    # transposing); None for odd x odd boards.
+    if height % 2 == 0 and width >= 2:
+        cycle = []
+        for y in range(height):
+            xs = range(1, width) if y % 2 == 0 else range(width - 1, 0, -1)
+            cycle.extend(y * width + x for x in xs)
+        cycle.extend(y * width for y in range(height - 1, -1, -1))
+        return cycle
+    if width % 2 == 0 and height >= 2:
+        transposed = hamiltonian_cycle(height, width)
+        return [(cell % height) * width + cell // height for cell in transposed]
+    return None
+
+class Autopilot:
+    def __init__(self, width: int = GRID_WIDTH, height: int = GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        # neighbours[cell] = [(action, cell)] on the wrap-around board
+        self.neighbours = []
+        for cell in range(self.cells):
+            x, y = cell % width, cell // width
+            self.neighbours.append([(action, ((y + dy) % height) * width + (x + dx) % width)
+                                    for action, (dx, dy) in enumerate(DIRECTIONS)])
+        # Wrap-around distance along each axis, for the A* estimate
+        self.wrap_x = [min(d, width - d) for d in range(width)]
+        self.wrap_y = [min(d, height - d) for d in range(height)]
+        cycle = hamiltonian_cycle(width, height)
+        self.order = [0] * self.cells
+        if cycle is not None:
+            for index, cell in enumerate(cycle):
+                self.order[cell] = index
+        self.has_cycle = cycle is not None
+        self.plan = deque()  # (action, cell) still to play
+        self.plan_food = None
+        self.plan_head = -1  # where the head is while the plan is followed
+        self.plan_time = 0.0  # seconds spent in the last next_action call
+        self.max_plan_time = 0.0
+
+    def reset(self):
+        # Forget the plan, e.g. for a new game or after a player steered
+        self.plan.clear()
+        self.plan_head = -1
+
+    def cell(self, position: Tuple[int, int]) -> int:
+        return position[1] * self.width + position[0]
+
+    def search(self, body: List[int], grow_to: int, target: int, banned: int = -1) -> Optional[List[Tuple[int, int]]]:
+        # A* from body[0] to target, returning [(action, cell)]; banned is a
+        # first action Snake.turn would refuse (a reversal). Segment k
+        # leaves the body after grow_to - k more moves (Snake.move checks
+        # before the tail moves), so a cell first reached too early is left
+        # unvisited for a later, longer path to claim.
+        free_after = [0] * self.cells
+        for k in range(1, len(body)):
+            free_after[body[k]] = grow_to - k
+        width, wrap_x, wrap_y = self.width, self.wrap_x, self.wrap_y
+        tx, ty = target % width, target // width
+        head = body[0]
+        parent = {head: None}
+        # (estimate, -moves, cell): ties go to the deepest node
+        frontier = [(0, 0, head)]
+        while frontier:
+            _, dist, cell = heapq.heappop(frontier)
+            dist = 1 - dist
+            for action, nxt in self.neighbours[cell]:
+                if nxt in parent or dist <= free_after[nxt]:
+                    continue
+                if cell == head and action == banned:
+                    continue
+                parent[nxt] = (cell, action)
+                if nxt == target:
+                    path = []
+                    while nxt != head:
+                        cell, action = parent[nxt]
+                        path.append((action, nxt))
+                        nxt = cell
+                    path.reverse()
+                    return path
+                estimate = dist + wrap_x[abs(nxt % width - tx)] + wrap_y[abs(nxt // width - ty)]
+                heapq.heappush(frontier, (estimate, -dist, nxt))
+        return None
+
+    def safe(self, body: List[int], grow_to: int) -> bool:
+        # Can the head still follow its tail around?
+        if len(body) < 3:
+            return True
+        return self.search(body, grow_to, body[-1]) is not None
+
+    def advance(self, body: List[int], grow_to: int, cells: List[int]) -> List[int]:
+        # The body after moving along cells (no collision checks)
+        moved = cells[::-1] + body
+        return moved[:min(len(body) + len(cells), grow_to)]
+
+    def next_action(self, snake, food: Optional[Tuple[int, int]]) -> Optional[int]:
+        start = time.perf_counter()
+        action = self.choose(snake, food)
+        self.plan_time = time.perf_counter() - start
+        self.max_plan_time = max(self.max_plan_time, self.plan_time)
+        return action
+
+    def choose(self, snake, food: Optional[Tuple[int, int]]) -> Optional[int]:
+        if not snake.is_alive:
+            return None
+        head = self.cell(snake.get_head_position())
+
+        # Replay the checked path while the food stays put
+        if self.plan and self.plan_food == food and self.plan_head == head:
+            action, self.plan_head = self.plan.popleft()
+            return action
+        self.plan.clear()
+
+        body = [self.cell(p) for p in snake.positions]
+        grow_to = snake.grow_to
+        reverse = (DIRECTIONS.index(snake.direction) + 2) % 4
+        aligned = self.has_cycle and self.aligned(body)
+        # Cuts leave cells behind the head that only the tail can bring back
+        # into play, which a long snake cannot afford
+        shortcuts = not aligned or len(body) < self.cells * SHORTCUT_LIMIT
+        if food is not None and shortcuts:
+            path = self.search(body, grow_to, self.cell(food), reverse)
+            if path is not None:
+                moved = self.advance(body, grow_to, [c for _, c in path])
+                # An aligned snake only leaves the cycle order for a path that
+                # restores it with room to spare
+                if aligned:
+                    ok = self.aligned(moved) and self.gap(moved) > grow_to + 1 - len(moved) + SHORTCUT_MARGIN
+                else:
+                    ok = self.safe(moved, grow_to + 1)
+                if ok:
+                    self.plan.extend(path)
+                    self.plan_food = food
+                    action, self.plan_head = self.plan.popleft()
+                    return action
+        if aligned:
+            action = self.cycle_move(snake, body, food, reverse, shortcuts)
+            if action is not None:
+                return action
+
+        # Not on the cycle (no cycle on odd x odd boards, or a player just
+        # handed over): safe single steps, the one the cycle or the board
+        # brings closest to the food first
+        goal = self.cell(food) if food is not None else head
+        if self.has_cycle:
+            goal = self.order[goal] + (food is None)
+        best = None
+        backup = None
+        for action, nxt in self.neighbours[head]:
+            if action == reverse:
+                continue
+            if snake.occupies((nxt % self.width, nxt // self.width)):
+                continue
+            moved = self.advance(body, grow_to, [nxt])
+            if self.safe(moved, grow_to):
+                if self.has_cycle:
+                    rank = (goal - self.order[nxt]) % self.cells
+                else:
+                    dx = abs(nxt % self.width - goal % self.width)
+                    dy = abs(nxt // self.width - goal // self.width)
+                    rank = min(dx, self.width - dx) + min(dy, self.height - dy)
+                if best is None or rank < best[0]:
+                    best = (rank, action)
+            elif backup is None:
+                backup = action
+        if best is not None:
+            return best[1]
+        return backup
+
+    def gap(self, body: List[int]) -> int:
+        # Cycle steps from the head forward to the tail (all of them for a
+        # one-cell snake)
+        if len(body) == 1:
+            return self.cells
+        return (self.order[body[-1]] - self.order[body[0]]) % self.cells
+
+    def aligned(self, body: List[int]) -> bool:
+        # Does the body run forwards along the cycle from tail to head?
+        order = self.order
+        base = order[body[-1]]
+        previous = -1
+        for cell in reversed(body):
+            ahead = (order[cell] - base) % self.cells
+            if ahead <= previous:
+                return False
+            previous = ahead
+        return True
+
+    def cycle_move(self, snake, body: List[int], food: Optional[Tuple[int, int]], reverse: int,
+                   shortcuts: bool = True) -> Optional[int]:
+        # With the body aligned, any free cell between the head and the tail in
+        # cycle order keeps it aligned, so the snake can never trap itself.
+        # Take the one furthest along without passing the food, and only jump
+        # ahead while the tail stays well clear of the head.
+        order = self.order
+        head = body[0]
+        gap = self.gap(body)
+        room = gap - (snake.grow_to - len(body)) - SHORTCUT_MARGIN
+        limit = (order[self.cell(food)] - order[head]) % self.cells if food is not None else 1
+        best = None
+        for action, nxt in self.neighbours[head]:
+            if action == reverse or snake.occupies((nxt % self.width, nxt // self.width)):
+                continue
+            ahead = (order[nxt] - order[head]) % self.cells
+            if ahead >= gap or ahead > limit or (ahead > 1 and (not shortcuts or ahead >= room)):
+                continue
+            if best is None or ahead > best[0]:
+                best = (ahead, action)
+        return best[1] if best is not None else None
+
+def play(seed: Optional[int], max_ticks: int, width: int = GRID_WIDTH, height: int = GRID_HEIGHT,
+         pilot: Optional[Autopilot] = None) -> Tuple[SnakeSim, float]:
+    # One autopiloted game; returns the finished sim and the planning seconds
+    sim = SnakeSim(width, height, seed)
+    pilot = pilot or Autopilot(width, height)
+    pilot.reset()
+    planning = 0.0
+    while sim.alive and sim.ticks < max_ticks and sim.food.position is not None:
+        action = pilot.next_action(sim.snake, sim.food.position)
+        planning += pilot.plan_time
+        sim.step(action)
+    return sim, planning
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless snake autopilot benchmark')
+    parser.add_argument('--games', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--width', type=int, default=GRID_WIDTH)
+    parser.add_argument('--height', type=int, default=GRID_HEIGHT)
+    parser.add_argument('--max-ticks', type=int, default=100000)
+    args = parser.parse_args()
+    pilot = Autopilot(args.width, args.height)
+    ticks = 0
+    planning = 0.0
+    for game in range(args.games):
+        sim, spent = play(args.seed + game, args.max_ticks, args.width, args.height, pilot)
+        ticks += sim.ticks
+        planning += spent
+        result = 'dead' if not sim.alive else 'full' if sim.food.position is None else 'timeout'
+        print(f"seed {args.seed + game}: length {len(sim.snake.positions)} score {sim.snake.score} "
+              f"in {sim.ticks} ticks ({result})")
+    print(f"{ticks} ticks, {1000 * planning / max(ticks, 1):.3f} ms mean / "
+          f"{1000 * pilot.max_plan_time:.3f} ms max planning per tick")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import random
+import time
+import argparse
+from collections import deque
+from typing import Tuple, Optional
+
+try:
+    import numpy as np
+except ImportError:  # only VectorSnakeSim needs it
+    np = None
+
+# Snake rules and a headless simulator, importable without pygame or a display.
+# "snake game.py" draws this state; bots and balancing runs use SnakeSim or,
+# with numpy installed, VectorSnakeSim to advance thousands of games at once.
+
+# Constants
+GRID_WIDTH = 30
+GRID_HEIGHT = 30
+START_LENGTH = 3
+FOOD_SCORE = 10
+
+# Directions, indexed by action: turning to (action + 2) % 4 is a reversal
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = (UP, RIGHT, DOWN, LEFT)
+
+class Snake:
+    def __init__(self, width: int = GRID_WIDTH, height: int = GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.reset()
+
+    def reset(self):
+        self.length = 3
+        self.positions = deque()
+        # occupied[y * width + x] is 1 under the body. free_cells lists the
+        # other cells and free_slot[cell] is a cell's index in it (-1 if taken),
+        # so both sides change in O(1) by swapping with the last free cell.
+        self.occupied = bytearray(self.width * self.height)
+        self.free_cells = list(range(self.width * self.height))
+        self.free_slot = list(range(self.width * self.height))
+        self.add_head((self.width // 2, self.height // 2))
+        self.direction = RIGHT
+        self.score = 0
+        self.grow_to = START_LENGTH  # Initial length
+        self.is_alive = True
+
+    def add_head(self, position: Tuple[int, int]):
+        cell = position[1] * self.width + position[0]
+        self.positions.appendleft(position)
+        self.occupied[cell] = 1
+        slot = self.free_slot[cell]
+        last = self.free_cells.pop()
+        if last != cell:
+            self.free_cells[slot] = last
+            self.free_slot[last] = slot
+        self.free_slot[cell] = -1
+
+    def remove_tail(self):
+        position = self.positions.pop()
+        cell = position[1] * self.width + position[0]
+        self.occupied[cell] = 0
+        self.free_slot[cell] = len(self.free_cells)
+        self.free_cells.append(cell)
+
+    def occupies(self, position: Tuple[int, int]) -> bool:
+        return self.occupied[position[1] * self.width + position[0]] == 1
+
+    def get_head_position(self) -> Tuple[int, int]:
+        return self.positions[0]
+
+    def turn(self, point: Tuple[int, int]):
+        # Prevent snake from turning directly back on itself
+        if self.length > 1 and (point[0] * -1, point[1] * -1) == self.direction:
+            return
+        else:
+            self.direction = point
+
+    def move(self):
+        if not self.is_alive:
+            return
+
+        head = self.get_head_position()
+        x, y = self.direction
+        new_x = (head[0] + x) % self.width
+        new_y = (head[1] + y) % self.height
+        new_position = (new_x, new_y)
+
+        # Check for collision with self (the tail counts: it has not moved yet)
+        if self.occupies(new_position):
+            self.is_alive = False
+            return
+
+        self.add_head(new_position)
+
+        # Grow snake if needed
+        if len(self.positions) > self.grow_to:
+            self.remove_tail()
+
+    def grow(self):
+        self.grow_to += 1
+        self.score += FOOD_SCORE
+
+class Food:
+    def __init__(self, width: int = GRID_WIDTH, height: int = GRID_HEIGHT, rng: Optional[random.Random] = None):
+        self.width = width
+        self.height = height
+        # Pass a seeded random.Random for reproducible food; the random module
+        # itself offers the same methods and is the default
+        self.rng = rng if rng is not None else random
+        self.position = (0, 0)
+        self.randomize_position()
+
+    def randomize_position(self, snake: Optional[Snake] = None):
+        # With a snake, pick uniformly among the cells it leaves free; None
+        # when the snake fills the board
+        if snake is None:
+            self.position = (self.rng.randint(0, self.width - 1), self.rng.randint(0, self.height - 1))
+        elif snake.free_cells:
+            cell = self.rng.choice(snake.free_cells)
+            self.position = (cell % self.width, cell // self.width)
+        else:
+            self.position = None
+
+class SnakeSim:
+    # One game advanced a tick per step(), with the same rules as the window:
+    # turn, move, then eat. Everything random comes from the seed.
+
+    def __init__(self, width: int = GRID_WIDTH, height: int = GRID_HEIGHT, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.snake = Snake(width, height)
+        self.food = Food(width, height, self.rng)
+        self.ticks = 0
+        self.reset(seed)
+
+    def reset(self, seed: Optional[int] = None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.snake.reset()
+        self.food.randomize_position(self.snake)
+        self.ticks = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.snake.is_alive
+
+    def step(self, action: Optional[int] = None) -> Tuple[bool, bool]:
+        # action indexes DIRECTIONS, None keeps the heading. Returns (ate, alive);
+        # a dead game ignores further steps.
+        snake = self.snake
+        if not snake.is_alive:
+            return False, False
+        if action is not None:
+            snake.turn(DIRECTIONS[action])
+        snake.move()
+        self.ticks += 1
+        if snake.is_alive and snake.get_head_position() == self.food.position:
+            snake.grow()
+            self.food.randomize_position(snake)
+            return True, True
+        return False, snake.is_alive
+
+class VectorSnakeSim:
+    # Many independent games as numpy arrays, advanced together by step().
+    # A snake is not stored as a list of cells: stamp[g, cell] is the game tick
+    # at which the head entered the cell, and the cell is under the body while
+    # tick - stamp < length. length follows len(Snake.positions): one more per
+    # move until it reaches grow_to, so a meal delays the next tail pop.
+
+    def __init__(self, games: int, width: int = GRID_WIDTH, height: int = GRID_HEIGHT, seed: Optional[int] = None):
+        if np is None:
+            raise ImportError("VectorSnakeSim needs numpy")
+        self.games = games
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.rng = np.random.default_rng(seed)
+        self.dx = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+        self.dy = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+        self.stamp = np.empty((games, self.cells), dtype=np.int32)
+        self.tick = np.zeros(games, dtype=np.int32)
+        self.head = np.zeros(games, dtype=np.int32)
+        self.direction = np.zeros(games, dtype=np.int8)
+        self.length = np.zeros(games, dtype=np.int32)
+        self.grow_to = np.zeros(games, dtype=np.int32)
+        self.score = np.zeros(games, dtype=np.int32)
+        self.food = np.zeros(games, dtype=np.int32)
+        self.alive = np.zeros(games, dtype=bool)
+        self.reset()
+
+    def reset(self, games=None):
+        # Restart the given games (a boolean mask or indices), all by default
+        if games is None:
+            games = np.arange(self.games)
+        elif games.dtype == bool:
+            games = np.flatnonzero(games)
+        start = (self.height // 2) * self.width + self.width // 2
+        self.stamp[games] = -(1 << 30)
+        self.stamp[games, start] = 0
+        self.tick[games] = 0
+        self.head[games] = start
+        self.direction[games] = DIRECTIONS.index(RIGHT)
+        self.length[games] = 1
+        self.grow_to[games] = START_LENGTH
+        self.score[games] = 0
+        self.alive[games] = True
+        self.place_food(games)
+
+    def body_mask(self, games):
+        return (self.tick[games, None] - self.stamp[games]) < self.length[games, None]
+
+    def place_food(self, games):
+        # Uniform over free cells: the largest random key among them wins
+        keys = self.rng.random((len(games), self.cells))
+        free = ~self.body_mask(games)
+        keys[~free] = -1.0
+        self.food[games] = np.where(free.any(axis=1), keys.argmax(axis=1), -1)
+
+    def step(self, actions=None, auto_reset: bool = False):
+        # actions holds a DIRECTIONS index per game, -1 (or None for all) keeps
+        # the heading. Returns (ate, alive) masks; dead games stay frozen unless
+        # auto_reset restarts them at the end of the step.
+        live = np.flatnonzero(self.alive)
+        direction = self.direction[live]
+        if actions is not None:
+            wanted = np.asarray(actions)[live]
+            turn = (wanted >= 0) & (wanted != (direction + 2) % 4)
+            direction = np.where(turn, wanted, direction).astype(np.int8)
+            self.direction[live] = direction
+        head = self.head[live]
+        x = (head % self.width + self.dx[direction]) % self.width
+        y = (head // self.width + self.dy[direction]) % self.height
+        new = y * self.width + x
+
+        tick = self.tick[live]
+        hit = (tick - self.stamp[live, new]) < self.length[live]
+        self.alive[live[hit]] = False
+        live, new, tick = live[~hit], new[~hit], tick[~hit] + 1
+        self.tick[live] = tick
+        self.stamp[live, new] = tick
+        self.head[live] = new
+        self.length[live] = np.minimum(self.length[live] + 1, self.grow_to[live])
+
+        ate = np.zeros(self.games, dtype=bool)
+        eaters = live[new == self.food[live]]
+        ate[eaters] = True
+        self.grow_to[eaters] += 1
+        self.score[eaters] += FOOD_SCORE
+        if len(eaters):
+            self.place_food(eaters)
+        alive = self.alive.copy()
+        if auto_reset and not alive.all():
+            self.reset(~alive)
+        return ate, alive
+
+def benchmark(steps: int, games: int = 1, seed: Optional[int] = None, vector: bool = False) -> float:
+    # Random turns, restarting dead games; returns game ticks per second
+    rng = random.Random(seed)
+    deaths = 0
+    if vector:
+        sim = VectorSnakeSim(games, seed=seed)
+        actions = np.random.default_rng(seed).integers(-1, 4, size=(steps, games))
+        start = time.perf_counter()
+        for row in actions:
+            _, alive = sim.step(row, auto_reset=True)
+            deaths += games - int(alive.sum())
+        total = steps * games
+    else:
+        sims = [SnakeSim(seed=rng.randrange(1 << 30)) for _ in range(games)]
+        actions = [rng.choice((None, 0, 1, 2, 3)) for _ in range(4096)]
+        start = time.perf_counter()
+        for i in range(steps):
+            action = actions[i & 4095]
+            for sim in sims:
+                if not sim.step(action)[1]:
+                    deaths += 1
+                    sim.reset()
+        total = steps * games
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"{'vector' if vector else 'scalar'}: {total} steps over {games} games, "
+          f"{deaths} deaths in {elapsed:.2f}s ({rate:.0f} steps/s)")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless snake simulator benchmark')
+    parser.add_argument('--steps', type=int, default=10000, help='ticks per game')
+    parser.add_argument('--games', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--vector', action='store_true', help='advance all games as numpy arrays')
+    args = parser.parse_args()
+    if args.vector and np is None:
+        parser.error('--vector needs numpy')
+    benchmark(args.steps, args.games, args.seed, args.vector)
+
+if __name__ == "__main__":
+    main()
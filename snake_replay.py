@@ -0,0 +1,173 @@
+import sys
+import time
+import zlib
+import struct
+import random
+import argparse
+from typing import List, Tuple, Optional
+
+from snake_core import SnakeSim, DIRECTIONS, GRID_WIDTH, GRID_HEIGHT
+from snake_autopilot import Autopilot
+
+# Snake replays: the food seed plus every tick on which the heading changed is
+# enough to re-run a game exactly (see SnakeSim). The header also keeps how the
+# game ended, so re-simulating a replay doubles as a regression test of the
+# rules, and a folder of replays as a rendering benchmark ("snake game.py"
+# --replay FILE --benchmark 0).
+#
+# File layout: HEADER, then one unsigned LEB128 varint per turn holding
+# (ticks since the previous turn << 2) | DIRECTIONS index.
+
+MAGIC = b'SNKR'
+VERSION = 1
+# magic, version, width, height, seed, ticks, score, length, body crc32, alive
+HEADER = struct.Struct('<4sHBBQIIIIB3x')
+
+def body_checksum(positions) -> int:
+    return zlib.crc32(bytes(c for p in positions for c in p))
+
+class Replay:
+    def __init__(self, seed: int, width: int = GRID_WIDTH, height: int = GRID_HEIGHT):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.events = []  # (tick, action) in tick order
+        # How the game ended, filled in by finish()
+        self.ticks = 0
+        self.score = 0
+        self.length = 0
+        self.checksum = 0
+        self.alive = True
+
+    def record(self, tick: int, action: int):
+        self.events.append((tick, action))
+
+    def finish(self, ticks: int, snake):
+        self.ticks = ticks
+        self.score = snake.score
+        self.length = len(snake.positions)
+        self.checksum = body_checksum(snake.positions)
+        self.alive = snake.is_alive
+
+    def actions(self) -> dict:
+        return dict(self.events)
+
+    def outcome(self) -> Tuple[int, int, int, int, bool]:
+        return self.ticks, self.score, self.length, self.checksum, self.alive
+
+def write_replay(path: str, replay: Replay):
+    out = bytearray(HEADER.pack(MAGIC, VERSION, replay.width, replay.height, replay.seed, replay.ticks,
+                                replay.score, replay.length, replay.checksum, replay.alive))
+    previous = 0
+    for tick, action in replay.events:
+        value = (tick - previous) << 2 | action
+        previous = tick
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+def read_replay(path: str) -> Replay:
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: too short for a replay")
+    magic, version, width, height, seed, ticks, score, length, checksum, alive = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a version {VERSION} snake replay")
+    replay = Replay(seed, width, height)
+    replay.ticks, replay.score, replay.length = ticks, score, length
+    replay.checksum, replay.alive = checksum, bool(alive)
+    tick = 0
+    value = shift = 0
+    for byte in data[HEADER.size:]:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            tick += value >> 2
+            replay.record(tick, value & 3)
+            value = shift = 0
+    if shift:
+        raise ValueError(f"{path}: truncated turn")
+    return replay
+
+def simulate(replay: Replay) -> SnakeSim:
+    # Re-run the game headlessly, as fast as the rules go
+    sim = SnakeSim(replay.width, replay.height, replay.seed)
+    actions = replay.actions()
+    while sim.ticks < replay.ticks and sim.alive:
+        sim.step(actions.get(sim.ticks))
+    return sim
+
+def record_autopilot(seed: int, max_ticks: int, width: int = GRID_WIDTH, height: int = GRID_HEIGHT) -> Replay:
+    # An autopiloted game as a replay, for building regression and benchmark sets
+    sim = SnakeSim(width, height, seed)
+    pilot = Autopilot(width, height)
+    replay = Replay(seed, width, height)
+    while sim.alive and sim.ticks < max_ticks and sim.food.position is not None:
+        action = pilot.next_action(sim.snake, sim.food.position)
+        heading = sim.snake.direction
+        tick = sim.ticks
+        sim.step(action)
+        if sim.snake.direction != heading:
+            replay.record(tick, DIRECTIONS.index(sim.snake.direction))
+    replay.finish(sim.ticks, sim.snake)
+    return replay
+
+def verify(paths: List[str]) -> int:
+    # Re-simulate each replay and compare the ending; returns the failures
+    failures = 0
+    ticks = 0
+    start = time.perf_counter()
+    for path in paths:
+        replay = read_replay(path)
+        sim = simulate(replay)
+        got = (sim.ticks, sim.snake.score, len(sim.snake.positions), body_checksum(sim.snake.positions),
+               sim.alive)
+        ticks += sim.ticks
+        if got != replay.outcome():
+            failures += 1
+            print(f"{path}: FAIL expected {replay.outcome()}, got {got}")
+        else:
+            print(f"{path}: ok, {replay.ticks} ticks, score {replay.score}, {len(replay.events)} turns")
+    elapsed = time.perf_counter() - start
+    rate = ticks / elapsed if elapsed > 0 else 0.0
+    print(f"{len(paths) - failures}/{len(paths)} replays match, {ticks} ticks in {elapsed:.2f}s "
+          f"({rate:.0f} ticks/s)", file=sys.stderr)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Snake replays')
+    commands = parser.add_subparsers(dest='command', required=True)
+    check = commands.add_parser('verify', help='re-simulate replays and compare their endings')
+    check.add_argument('replays', nargs='+')
+    make = commands.add_parser('record', help='record autopiloted games')
+    make.add_argument('output', help='file name, or a prefix when --games is above 1')
+    make.add_argument('--games', type=int, default=1)
+    make.add_argument('--seed', type=int, default=None)
+    make.add_argument('--max-ticks', type=int, default=20000)
+    show = commands.add_parser('info', help='print replay headers')
+    show.add_argument('replays', nargs='+')
+    args = parser.parse_args()
+
+    if args.command == 'verify':
+        sys.exit(1 if verify(args.replays) else 0)
+    elif args.command == 'record':
+        rng = random.Random(args.seed)
+        for game in range(args.games):
+            replay = record_autopilot(rng.randrange(1 << 32), args.max_ticks)
+            path = args.output if args.games == 1 else f"{args.output}{game:03d}.snkr"
+            write_replay(path, replay)
+            print(f"{path}: seed {replay.seed}, {replay.ticks} ticks, score {replay.score}, "
+                  f"{len(replay.events)} turns")
+    else:
+        for path in args.replays:
+            replay = read_replay(path)
+            print(f"{path}: {replay.width}x{replay.height} seed {replay.seed}, {replay.ticks} ticks, "
+                  f"score {replay.score}, length {replay.length}, {'alive' if replay.alive else 'dead'}, "
+                  f"{len(replay.events)} turns")
+
+if __name__ == "__main__":
+    main()